@@ -0,0 +1,533 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks of the hot paths of the solvers.
+
+Every benchmark performs a fixed amount of work from fixed seeds, is repeated
+`--repetitions` times and reports its best throughput. Results are written as
+JSON to `--output`; given a `--baseline` written by an earlier run, every
+benchmark slower than the baseline by more than `--tolerance` is reported and
+the program exits with status 1.
+
+Example:
+  python felix_benchmark.py --output=/tmp/bench.json
+  python felix_benchmark.py --baseline=/tmp/bench.json --benchmarks=reservoir
+
+The cfr/time_to_* benchmarks instead report the best training time, excluding
+evaluations, of each tabular CFR variant to reach an exploitability threshold
+on Kuhn and Leduc poker. Compared to a baseline, all benchmarks are reported as
+speedups.
+
+The startup benchmarks time a fresh interpreter importing the solvers, and
+fail if the import pulls in matplotlib.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+import tensorflow.compat.v1 as tf
+
+from open_spiel.python.algorithms import cfr
+from open_spiel.python.algorithms import felix_cfr
+from open_spiel.python.algorithms import felix_checkpoint
+from open_spiel.python.algorithms import felix_deep_cfr as deep_cfr
+from open_spiel.python.algorithms import felix_exploitability
+from open_spiel.python.algorithms import felix_game_index
+from open_spiel.python.algorithms import felix_parallel_mccfr
+import pyspiel
+
+# Temporarily disable TF2 behavior until we update the code.
+tf.disable_v2_behavior()
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("output", None, "JSON file to which results are written")
+flags.DEFINE_string("baseline", None,
+                    "JSON results of an earlier run to compare against")
+flags.DEFINE_float(
+    "tolerance", 0.2,
+    "Relative slowdown with respect to the baseline reported as a regression")
+flags.DEFINE_list("benchmarks", [],
+                  "Prefixes of the benchmarks to run; all if empty")
+flags.DEFINE_integer("repetitions", 3, "Repetitions of each benchmark")
+flags.DEFINE_integer("seed", 1234, "Seed of every repetition")
+flags.DEFINE_list("traversal_games",
+                  ["kuhn_poker", "leduc_poker", "liars_dice"],
+                  "Games whose Deep CFR traversals are benchmarked")
+flags.DEFINE_list("mccfr_workers", ["1", "2", "4"],
+                  "Numbers of workers of the parallel MCCFR benchmarks")
+
+_Element = collections.namedtuple("_Element", "value")
+
+# Registered benchmarks: name -> (unit, function). A function performs the
+# work of one repetition and returns `(amount_of_work, seconds)`. The value of
+# a benchmark is its best `amount_of_work / seconds`, or its best `seconds`
+# if its unit is `_SECONDS`, in which case `seconds` is infinite when the work
+# could not be done.
+_BENCHMARKS = collections.OrderedDict()
+_SECONDS = "s"
+
+# Exploitability thresholds of the time-to-threshold benchmarks, and the
+# maximum number of iterations to reach them.
+_THRESHOLDS = (("kuhn_poker", 1e-3, 20000), ("leduc_poker", 1e-2, 5000))
+
+
+def _benchmark(name, unit):
+  def register(fn):
+    _BENCHMARKS[name] = (unit, fn)
+    return fn
+  return register
+
+
+def _seed():
+  random.seed(FLAGS.seed)
+  np.random.seed(FLAGS.seed)
+
+
+def _timed(fn, *args):
+  start = time.perf_counter()
+  fn(*args)
+  return time.perf_counter() - start
+
+
+def _register_reservoir_benchmarks():
+  """Registers add and sample benchmarks for several buffer capacities."""
+  num_adds, num_samples, batch_size = 100000, 1000, 128
+  for capacity in (1000, 100000, 1000000):
+
+    def legacy_add(capacity=capacity):
+      buffer = deep_cfr.ReservoirBuffer(capacity)
+      return num_adds, _timed(lambda: [buffer.add(i) for i in range(num_adds)])
+
+    def legacy_sample(capacity=capacity):
+      buffer = deep_cfr.ReservoirBuffer(capacity)
+      for i in range(capacity):
+        buffer.add(i)
+      return num_samples, _timed(
+          lambda: [buffer.sample(batch_size) for _ in range(num_samples)])
+
+    def columnar_add(capacity=capacity):
+      buffer = deep_cfr.ColumnarReservoirBuffer(capacity, _Element,
+                                                {"value": ((), np.int64)})
+      return num_adds, _timed(
+          lambda: [buffer.add(_Element(i)) for i in range(num_adds)])
+
+    def columnar_add_batch(capacity=capacity):
+      buffer = deep_cfr.ColumnarReservoirBuffer(capacity, _Element,
+                                                {"value": ((), np.int64)})
+      values = np.arange(10 * num_adds)
+      return len(values), _timed(
+          lambda: [buffer.add_batch(_Element(values[i:i + 1000]))
+                   for i in range(0, len(values), 1000)])
+
+    def columnar_sample(capacity=capacity):
+      buffer = deep_cfr.ColumnarReservoirBuffer(capacity, _Element,
+                                                {"value": ((), np.int64)})
+      buffer.add_batch(_Element(np.arange(capacity)))
+      return num_samples, _timed(
+          lambda: [buffer.sample(batch_size) for _ in range(num_samples)])
+
+    def memmap_add_batch(capacity=capacity):
+      directory = tempfile.mkdtemp()
+      try:
+        buffer = deep_cfr.ColumnarReservoirBuffer(
+            capacity, _Element, {"value": ((), np.int64)}, directory)
+        values = np.arange(10 * num_adds)
+
+        def add_and_flush():
+          for i in range(0, len(values), 1000):
+            buffer.add_batch(_Element(values[i:i + 1000]))
+          buffer.flush()
+
+        return len(values), _timed(add_and_flush)
+      finally:
+        shutil.rmtree(directory)
+
+    def memmap_sample(capacity=capacity):
+      directory = tempfile.mkdtemp()
+      try:
+        buffer = deep_cfr.ColumnarReservoirBuffer(
+            capacity, _Element, {"value": ((), np.int64)}, directory)
+        buffer.add_batch(_Element(np.arange(capacity)))
+        buffer.flush()
+        return num_samples, _timed(
+            lambda: [buffer.sample(batch_size) for _ in range(num_samples)])
+      finally:
+        shutil.rmtree(directory)
+
+    for name, fn, unit in (
+        ("reservoir/add/{}", legacy_add, "adds/s"),
+        ("reservoir/sample/{}", legacy_sample, "batches/s"),
+        ("reservoir/columnar_add/{}", columnar_add, "adds/s"),
+        ("reservoir/columnar_add_batch/{}", columnar_add_batch, "adds/s"),
+        ("reservoir/columnar_sample/{}", columnar_sample, "batches/s"),
+        ("reservoir/memmap_add_batch/{}", memmap_add_batch, "adds/s"),
+        ("reservoir/memmap_sample/{}", memmap_sample, "batches/s"),
+    ):
+      _benchmark(name.format(capacity), unit)(fn)
+
+
+def _deep_cfr_solver(session, game, **kwargs):
+  return deep_cfr.DeepCFRSolver(
+      session,
+      game,
+      policy_network_layers=(64, 64),
+      advantage_network_layers=(64, 64),
+      memory_capacity=100000,
+      batch_size_advantage=128,
+      batch_size_strategy=128,
+      **kwargs)
+
+
+def _register_deep_cfr_benchmarks():
+  """Registers traversal, training and evaluation benchmarks of Deep CFR."""
+  num_traversals, num_train_steps = 20, 50
+
+  def traversals(game_name, batch_traversals, undo=True):
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _deep_cfr_solver(
+          sess, pyspiel.load_game(game_name),
+          batch_traversals=batch_traversals)
+      sess.run(tf.global_variables_initializer())
+      solver._undo_supported &= undo  # pylint: disable=protected-access
+      seconds = _timed(solver._run_traversals, 0, num_traversals)  # pylint: disable=protected-access
+      return solver._num_nodes_visited, seconds  # pylint: disable=protected-access
+
+  def training(learn, prefetch_batches):
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _deep_cfr_solver(
+          sess, pyspiel.load_game("leduc_poker"),
+          advantage_network_train_steps=num_train_steps,
+          policy_network_train_steps=num_train_steps,
+          prefetch_batches=prefetch_batches)
+      sess.run(tf.global_variables_initializer())
+      solver._run_traversals(0, 100)  # pylint: disable=protected-access
+      return num_train_steps, _timed(learn, solver)
+
+  for game_name in FLAGS.traversal_games:
+    for mode, batch_traversals in (("recursive", False), ("batched", True)):
+      _benchmark("deep_cfr/traversal/{}/{}".format(mode, game_name),
+                 "nodes/s")(lambda game_name=game_name, batch=batch_traversals:
+                            traversals(game_name, batch))
+  # Unbatched traversals cloning every child, or undoing actions instead, on
+  # games implementing `undo_action`.
+  for game_name in ("kuhn_poker", "sheriff"):
+    for mode, undo in (("clone", False), ("undo", True)):
+      _benchmark("deep_cfr/traversal/{}/{}".format(mode, game_name),
+                 "nodes/s")(lambda game_name=game_name, undo=undo:
+                            traversals(game_name, False, undo))
+  # Batches sampled synchronously, or by a thread ahead of the training steps.
+  for prefetch_batches in (0, 4):
+    _benchmark("deep_cfr/advantage_training/prefetch_{}/leduc_poker".format(
+        prefetch_batches), "steps/s")(
+            lambda prefetch_batches=prefetch_batches: training(
+                lambda solver: solver._learn_advantage_network(0),  # pylint: disable=protected-access
+                prefetch_batches))
+    _benchmark("deep_cfr/strategy_training/prefetch_{}/leduc_poker".format(
+        prefetch_batches), "steps/s")(
+            lambda prefetch_batches=prefetch_batches: training(
+                lambda solver: solver._learn_strategy_network(),  # pylint: disable=protected-access
+                prefetch_batches))
+
+  def regret_matching(batch_size):
+    game = pyspiel.load_game("liars_dice")
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _deep_cfr_solver(sess, game)
+    num_states = 256 * 20
+    # 12 of the 13 actions are legal, as at most nodes of Liar's Dice.
+    advantages = np.random.randn(num_states, game.num_distinct_actions())
+    legal_actions_mask = np.ones_like(advantages, dtype=int)
+    legal_actions_mask[:, 0] = 0
+    return num_states, _timed(lambda: [
+        solver._regret_matching(advantages[i:i + batch_size],  # pylint: disable=protected-access
+                                legal_actions_mask[i:i + batch_size])
+        for i in range(0, num_states, batch_size)
+    ])
+
+  # One information state per call, as in the unbatched traversals, or a
+  # depth of the batched traversals at once.
+  for batch_size in (1, 256):
+    _benchmark("deep_cfr/regret_matching/batch_{}/liars_dice".format(
+        batch_size), "states/s")(
+            lambda batch_size=batch_size: regret_matching(batch_size))
+
+  def tabular_policy():
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _deep_cfr_solver(sess, pyspiel.load_game("leduc_poker"))
+      sess.run(tf.global_variables_initializer())
+      solver.tabular_policy()  # Builds the game index and the template.
+      return 10, _timed(lambda: [solver.tabular_policy() for _ in range(10)])
+
+  _benchmark("deep_cfr/tabular_policy/leduc_poker", "calls/s")(tabular_policy)
+
+
+def _register_evaluation_benchmarks():
+  """Registers exploitability and NashConv evaluation benchmarks."""
+  for game_name in ("kuhn_poker", "leduc_poker"):
+
+    def evaluate(game_name=game_name):
+      game = pyspiel.load_game(game_name)
+      game_index = felix_game_index.get_game_index(game)
+      probs = game_index.legal_actions_mask / np.sum(
+          game_index.legal_actions_mask, axis=1, keepdims=True)
+      return 100, _timed(lambda: [
+          felix_exploitability.evaluate(game, probs, game_index=game_index)
+          for _ in range(100)
+      ])
+
+    def build_index(game_name=game_name):
+      game = pyspiel.load_game(game_name)
+      return 1, _timed(felix_game_index.GameIndex.build, game)
+
+    _benchmark("evaluation/evaluate/" + game_name, "calls/s")(evaluate)
+    _benchmark("evaluation/build_index/" + game_name, "calls/s")(build_index)
+
+
+def _register_mccfr_benchmarks():
+  """Registers the pyspiel MCCFR iteration rates."""
+  num_iterations = 1000
+  for game_name in ("kuhn_poker", "leduc_poker"):
+    for sampling in ("external", "outcome"):
+
+      def iterations(game_name=game_name, sampling=sampling):
+        game = pyspiel.load_game(game_name)
+        if sampling == "external":
+          solver = pyspiel.ExternalSamplingMCCFRSolver(
+              game, seed=FLAGS.seed, avg_type=pyspiel.MCCFRAverageType.FULL)
+        else:
+          solver = pyspiel.OutcomeSamplingMCCFRSolver(game, seed=FLAGS.seed)
+        return num_iterations, _timed(
+            lambda: [solver.run_iteration() for _ in range(num_iterations)])
+
+      _benchmark("mccfr/{}/{}".format(sampling, game_name),
+                 "iterations/s")(iterations)
+
+  # Each worker runs the same rounds whatever the number of workers, so that
+  # iterations/s scales with the workers as long as there are cores for them.
+  # A first untimed round starts the workers and fills the tables.
+  num_rounds = 3
+  for game_name in ("leduc_poker", "liars_dice"):
+    for sampling in ("external", "outcome"):
+      for num_workers in FLAGS.mccfr_workers:
+
+        def parallel_iterations(game_name=game_name, sampling=sampling,
+                                num_workers=int(num_workers)):
+          with felix_parallel_mccfr.ParallelMCCFRSolver(
+              pyspiel.load_game(game_name), num_workers, sampling=sampling,
+              seed=FLAGS.seed) as solver:
+            solver.run_iterations(solver.round_iterations)
+            num_iterations = num_rounds * solver.round_iterations
+            return num_iterations, _timed(solver.run_iterations,
+                                          num_iterations)
+
+        _benchmark(
+            "mccfr/parallel/{}/{}/{}".format(num_workers, sampling, game_name),
+            "iterations/s")(parallel_iterations)
+
+
+def _register_checkpoint_benchmarks():
+  """Registers the cost of checkpointing and restoring MCCFR solvers."""
+  num_checkpoints = 5
+  # External sampling iterations run before checkpointing, enough to visit
+  # most information states.
+  for game_name, num_iterations in (("leduc_poker", 100), ("liars_dice", 2)):
+
+    def solver_state(game_name=game_name, num_iterations=num_iterations):
+      solver = pyspiel.ExternalSamplingMCCFRSolver(
+          pyspiel.load_game(game_name), seed=FLAGS.seed,
+          avg_type=pyspiel.MCCFRAverageType.FULL)
+      for _ in range(num_iterations):
+        solver.run_iteration()
+      return solver
+
+    def save(solver_state=solver_state):
+      solver = solver_state()
+      directory = tempfile.mkdtemp()
+      try:
+        checkpointer = felix_checkpoint.Checkpointer(directory, keep=2)
+        return num_checkpoints, _timed(lambda: [
+            checkpointer.save(i, solver.__getstate__)
+            for i in range(num_checkpoints)
+        ])
+      finally:
+        shutil.rmtree(directory)
+
+    def restore(solver_state=solver_state):
+      solver = solver_state()
+      directory = tempfile.mkdtemp()
+      try:
+        checkpointer = felix_checkpoint.Checkpointer(directory)
+        checkpointer.save(0, solver.__getstate__())
+
+        def restore_solver():
+          _, state = checkpointer.restore()
+          restored = type(solver).__new__(type(solver))
+          restored.__setstate__(state)
+
+        return num_checkpoints, _timed(
+            lambda: [restore_solver() for _ in range(num_checkpoints)])
+      finally:
+        shutil.rmtree(directory)
+
+    _benchmark("checkpoint/save/" + game_name, "saves/s")(save)
+    _benchmark("checkpoint/restore/" + game_name, "restores/s")(restore)
+
+
+def _register_cfr_benchmarks():
+  """Registers the iteration rates of the Python and vectorized CFR."""
+  for game_name, num_iterations in (("kuhn_poker", 100), ("leduc_poker", 10)):
+    for name, solver_class in (("python", cfr.CFRSolver),
+                               ("vectorized", felix_cfr.CFRSolver)):
+
+      def iterations(game_name=game_name, num_iterations=num_iterations,
+                     solver_class=solver_class):
+        game = pyspiel.load_game(game_name)
+        felix_game_index.get_game_index(game)  # Not part of the iterations.
+        solver = solver_class(game)
+        return num_iterations, _timed(lambda: [
+            solver.evaluate_and_update_policy() for _ in range(num_iterations)
+        ])
+
+      _benchmark("cfr/{}/{}".format(name, game_name),
+                 "iterations/s")(iterations)
+
+  for game_name, threshold, max_iterations in _THRESHOLDS:
+    for mode, solver_class in sorted(felix_cfr.SOLVERS.items()):
+
+      def time_to_threshold(game_name=game_name, threshold=threshold,
+                            max_iterations=max_iterations,
+                            solver_class=solver_class):
+        """Returns the iterations and training time to reach `threshold`."""
+        game = pyspiel.load_game(game_name)
+        game_index = felix_game_index.get_game_index(game)
+        solver = solver_class(game, game_index)
+        seconds = 0.
+        for iteration in range(1, max_iterations + 1):
+          seconds += _timed(solver.evaluate_and_update_policy)
+          # Evaluated after every iteration, outside of the timed training.
+          if felix_exploitability.exploitability(
+              game, solver.average_policy_array(),
+              game_index=game_index) <= threshold:
+            return iteration, seconds
+        return max_iterations, float("inf")
+
+      _benchmark("cfr/time_to_{:g}/{}/{}".format(threshold, mode, game_name),
+                 _SECONDS)(time_to_threshold)
+
+
+def _register_startup_benchmarks():
+  """Registers the time to start Python and import the solvers."""
+  for module in ("felix_experiments", "felix_deep_cfr"):
+
+    def startup(module=module):
+      # Fails the benchmark if the import pulls in matplotlib.
+      command = ("import sys; "
+                 "from open_spiel.python.algorithms import {}; "
+                 "sys.exit('matplotlib' in sys.modules)").format(module)
+      return 1, _timed(subprocess.check_call, [sys.executable, "-c", command])
+
+    _benchmark("startup/" + module, "starts/s")(startup)
+
+
+def run_benchmarks(prefixes, repetitions):
+  """Returns the best throughput of each benchmark matching `prefixes`."""
+  results = collections.OrderedDict()
+  for name, (unit, fn) in _BENCHMARKS.items():
+    if prefixes and not any(name.startswith(prefix) for prefix in prefixes):
+      continue
+    values = []
+    for _ in range(repetitions):
+      _seed()
+      work, seconds = fn()
+      values.append((seconds, work) if unit == _SECONDS else
+                    (work / seconds, work))
+    if unit == _SECONDS:
+      value, work = min(values)
+      if value == float("inf"):
+        value = None
+      results[name] = {"value": value, "unit": unit, "work": work}
+      print("{:<60} {:>14} {} ({} iterations)".format(
+          name, "not reached" if value is None else "{:.4f}".format(value),
+          unit, work))
+    else:
+      value, _ = max(values)
+      results[name] = {"value": value, "unit": unit}
+      print("{:<60} {:>14.1f} {}".format(name, value, unit))
+  return results
+
+
+def compare(results, baseline, tolerance):
+  """Returns the names of the benchmarks slower than `baseline`."""
+  regressions = []
+  for name, result in results.items():
+    if name not in baseline or baseline[name]["value"] is None:
+      continue
+    if result["value"] is None:
+      ratio = 0.
+    elif result["unit"] == _SECONDS:
+      ratio = baseline[name]["value"] / result["value"]
+    else:
+      ratio = result["value"] / baseline[name]["value"]
+    print("{:<60} {:>8.2f}x baseline".format(name, ratio))
+    if ratio < 1 - tolerance:
+      regressions.append(name)
+  return regressions
+
+
+def main(unused_argv):
+  _register_reservoir_benchmarks()
+  _register_deep_cfr_benchmarks()
+  _register_evaluation_benchmarks()
+  _register_mccfr_benchmarks()
+  _register_checkpoint_benchmarks()
+  _register_cfr_benchmarks()
+  _register_startup_benchmarks()
+  results = run_benchmarks(FLAGS.benchmarks, FLAGS.repetitions)
+  if FLAGS.output:
+    with open(FLAGS.output, "w") as f:
+      json.dump({
+          "environment": {
+              "python": platform.python_version(),
+              "machine": platform.machine(),
+              "processor": platform.processor(),
+              "seed": FLAGS.seed,
+          },
+          "benchmarks": results,
+      }, f, indent=2)
+  if FLAGS.baseline:
+    with open(FLAGS.baseline) as f:
+      baseline = json.load(f)["benchmarks"]
+    regressions = compare(results, baseline, FLAGS.tolerance)
+    if regressions:
+      print("Regressions beyond {:.0%}: {}".format(FLAGS.tolerance,
+                                                   ", ".join(regressions)))
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  app.run(main)
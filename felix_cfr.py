@@ -0,0 +1,309 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tabular CFR variants vectorized over the flat game tree of a game index.
+
+The solvers compute the same iterates as their open_spiel counterparts, with
+alternating updates:
+
+  * `CFRSolver`: `cfr.CFRSolver`, regret matching and uniform averaging.
+  * `CFRPlusSolver`: `cfr.CFRPlusSolver`, regret matching+ and linear
+    averaging.
+  * `LinearCFRSolver`: `discounted_cfr.LCFRSolver`, regrets and policies
+    weighted by the iteration.
+  * `DCFRSolver`: `discounted_cfr.DCFRSolver`, positive and negative regrets
+    discounted by `t^alpha / (t^alpha + 1)` and `t^beta / (t^beta + 1)` after
+    iteration `t`, whose policy is weighted by `t^gamma`.
+
+But the game is compiled once into the flat arrays of a
+`felix_game_index.GameIndex`, and regrets and policies are
+`[num_info_states, num_distinct_actions]` arrays indexed by its rows. Each
+update of a player is then one forward pass computing reach probabilities and
+one backward pass computing values, one depth at a time, and the regrets and
+average policy sums are scattered to the information states with
+`np.bincount`. All variants share this update, and differ only in how it
+discounts the regrets and weights the policies.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+
+import numpy as np
+
+from open_spiel.python.algorithms import felix_game_index
+
+
+def _regret_matching(cumulative_regret, legal_actions_mask):
+  """Returns the regret matching policy of every information state.
+
+  Args:
+    cumulative_regret: `[num_info_states, num_distinct_actions]` regrets.
+    legal_actions_mask: Array of the same shape, 1 for the legal actions.
+
+  Returns:
+    An array of the same shape, proportional to the positive regrets of each
+    row, or uniform over its legal actions if none is positive.
+  """
+  positive_regret = np.maximum(cumulative_regret, 0.) * legal_actions_mask
+  regret_sum = positive_regret.sum(axis=1, keepdims=True)
+  uniform = legal_actions_mask / legal_actions_mask.sum(axis=1, keepdims=True)
+  return np.where(regret_sum > 0,
+                  positive_regret / np.where(regret_sum > 0, regret_sum, 1.),
+                  uniform)
+
+
+class _CFRSolver(object):
+  """Vectorized counterfactual regret minimization with alternating updates.
+
+  Usage is that of `cfr.CFRSolver`:
+
+    solver = CFRSolver(game)
+    for _ in range(num_iterations):
+      solver.evaluate_and_update_policy()
+    average_policy = solver.average_policy()
+  """
+
+  def __init__(self,
+               game,
+               game_index=None,
+               regret_matching_plus=False,
+               alpha=None,
+               beta=None,
+               gamma=0.):
+    """Initializes the solver.
+
+    Args:
+      game: OpenSpiel game.
+      game_index: `GameIndex` of `game`. Defaults to
+        `felix_game_index.get_game_index(game)`.
+      regret_matching_plus: (bool) Whether to reset negative regrets to 0.
+      alpha: (float or None) Exponent of the discount of positive regrets
+        after each iteration, or None not to discount them.
+      beta: (float or None) Exponent of the discount of negative regrets
+        after each iteration, or None not to discount them.
+      gamma: (float) The policy of iteration `t` is averaged with weight
+        `t^gamma`.
+    """
+    self._regret_matching_plus = regret_matching_plus
+    self._alpha = alpha
+    self._beta = beta
+    self._gamma = gamma
+    self._game = game
+    self._game_index = game_index or felix_game_index.get_game_index(game)
+    index = self._game_index
+    self._legal_actions_mask = index.legal_actions_mask.astype(np.float64)
+    num_actions = self._legal_actions_mask.shape[1]
+    self._cumulative_regret = np.zeros_like(self._legal_actions_mask)
+    self._cumulative_policy = np.zeros_like(self._legal_actions_mask)
+    self._current_policy = _regret_matching(self._cumulative_regret,
+                                            self._legal_actions_mask)
+    self._iteration = 0
+    self._tabular_policy_template = None
+
+    # (start, end) of the nodes of each depth, from the children of the root.
+    self._levels = list(zip(index.level_starts[1:-1], index.level_starts[2:]))
+    self._parent_levels = list(
+        zip(index.level_starts[:-2], index.level_starts[1:-1]))
+    parents = index.node_parent
+    parent_rows = np.full(index.num_nodes, -1)
+    parent_rows[1:] = index.node_info_state[parents[1:]]
+    self._decision_edges = np.nonzero(parent_rows >= 0)[0]
+    self._decision_edge_cells = (parent_rows[self._decision_edges] * num_actions
+                                 + index.node_action[self._decision_edges])
+    self._parent_player = np.full(index.num_nodes, -1, dtype=np.int32)
+    self._parent_player[1:] = index.node_player[parents[1:]]
+
+    # Per player, the slice of its rows, which are ordered by player, its
+    # decision nodes and their rows, and the children of these nodes and the
+    # cells of the actions leading to them.
+    self._player_rows = []
+    self._player_nodes = []
+    self._player_node_rows = []
+    self._player_children = []
+    self._player_child_cells = []
+    decision_edge_cells = np.full(index.num_nodes, -1)
+    decision_edge_cells[self._decision_edges] = self._decision_edge_cells
+    for player in range(game.num_players()):
+      nodes = np.nonzero(index.node_player == player)[0]
+      children = np.nonzero(self._parent_player == player)[0]
+      self._player_rows.append(slice(*np.searchsorted(
+          index.info_state_player, [player, player + 1])))
+      self._player_nodes.append(nodes)
+      self._player_node_rows.append(index.node_info_state[nodes])
+      self._player_children.append(children)
+      self._player_child_cells.append(decision_edge_cells[children])
+
+  @property
+  def game_index(self):
+    return self._game_index
+
+  @property
+  def iteration(self):
+    return self._iteration
+
+  def _edge_probabilities(self):
+    """Returns the probability of the action leading to each node."""
+    probs = self._game_index.node_chance_prob.copy()
+    probs[self._decision_edges] = self._current_policy.ravel()[
+        self._decision_edge_cells]
+    return probs
+
+  def _update_player(self, player):
+    """Accumulates the regrets and average policy of `player` and updates."""
+    index = self._game_index
+    parents = index.node_parent
+    probs = self._edge_probabilities()
+    own_edges = self._parent_player == player
+    own_probs = np.where(own_edges, probs, 1.)
+    others_probs = np.where(own_edges, 1., probs)
+
+    # Reach probabilities due to `player`, and to chance and the others.
+    own_reach = np.ones(index.num_nodes)
+    others_reach = np.ones(index.num_nodes)
+    for start, end in self._levels:
+      level_parents = parents[start:end]
+      own_reach[start:end] = own_reach[level_parents] * own_probs[start:end]
+      others_reach[start:end] = (
+          others_reach[level_parents] * others_probs[start:end])
+
+    # Expected value of every node for `player` under the current policy.
+    values = index.node_returns[:, player].copy()
+    weighted_values = np.empty_like(values)
+    for (start, end), (parent_start, parent_end) in zip(
+        reversed(self._levels), reversed(self._parent_levels)):
+      weighted_values[start:end] = probs[start:end] * values[start:end]
+      values[parent_start:parent_end] += np.bincount(
+          parents[start:end] - parent_start,
+          weights=weighted_values[start:end],
+          minlength=parent_end - parent_start)
+
+    shape = self._legal_actions_mask.shape
+    nodes = self._player_nodes[player]
+    rows = self._player_node_rows[player]
+    children = self._player_children[player]
+    action_values = np.bincount(
+        self._player_child_cells[player],
+        weights=others_reach[parents[children]] * values[children],
+        minlength=shape[0] * shape[1]).reshape(shape)
+    state_values = np.bincount(
+        rows, weights=others_reach[nodes] * values[nodes], minlength=shape[0])
+    self._cumulative_regret += (
+        action_values - state_values[:, np.newaxis]) * self._legal_actions_mask
+    own_reach_sums = np.bincount(
+        rows, weights=own_reach[nodes], minlength=shape[0])
+    self._cumulative_policy += (
+        own_reach_sums[:, np.newaxis] * self._current_policy *
+        self._iteration**self._gamma)
+    self._discount_regrets(self._player_rows[player])
+    self._current_policy = _regret_matching(self._cumulative_regret,
+                                            self._legal_actions_mask)
+
+  def _discount_regrets(self, rows):
+    """Discounts or resets the cumulative regrets of `rows`."""
+    regrets = self._cumulative_regret[rows]
+    if self._alpha is not None or self._beta is not None:
+      t = float(self._iteration)
+      positive_discount = 1.
+      if self._alpha is not None:
+        positive_discount = t**self._alpha / (t**self._alpha + 1)
+      negative_discount = 1.
+      if self._beta is not None:
+        negative_discount = t**self._beta / (t**self._beta + 1)
+      regrets *= np.where(regrets >= 0, positive_discount, negative_discount)
+    if self._regret_matching_plus:
+      np.maximum(regrets, 0., out=regrets)
+
+  def evaluate_and_update_policy(self):
+    """Performs a single step of policy evaluation and policy improvement."""
+    self._iteration += 1
+    for player in range(self._game.num_players()):
+      self._update_player(player)
+
+  def current_policy_array(self):
+    """Returns the current policy, indexed by the rows of the game index."""
+    return self._current_policy.copy()
+
+  def average_policy_array(self):
+    """Returns the average policy, indexed by the rows of the game index."""
+    policy_sum = self._cumulative_policy.sum(axis=1, keepdims=True)
+    uniform = self._legal_actions_mask / self._legal_actions_mask.sum(
+        axis=1, keepdims=True)
+    return np.where(
+        policy_sum > 0,
+        self._cumulative_policy / np.where(policy_sum > 0, policy_sum, 1.),
+        uniform)
+
+  def _tabular_policy(self, action_probability_array):
+    if self._tabular_policy_template is None:
+      self._tabular_policy_template = self._game_index.tabular_policy()
+    tabular_policy = copy.copy(self._tabular_policy_template)
+    tabular_policy.action_probability_array = action_probability_array
+    return tabular_policy
+
+  def current_policy(self):
+    """Returns the current policy as a `policy.TabularPolicy`."""
+    return self._tabular_policy(self.current_policy_array())
+
+  def average_policy(self):
+    """Returns the average of all policies iterated.
+
+    This average policy converges to a Nash policy as the number of iterations
+    increases. Information states never reached keep a uniform policy.
+
+    Returns:
+      A `policy.TabularPolicy`.
+    """
+    return self._tabular_policy(self.average_policy_array())
+
+
+class CFRSolver(_CFRSolver):
+  """Vectorized `cfr.CFRSolver`."""
+
+  def __init__(self, game, game_index=None):
+    super(CFRSolver, self).__init__(game, game_index)
+
+
+class CFRPlusSolver(_CFRSolver):
+  """Vectorized `cfr.CFRPlusSolver`."""
+
+  def __init__(self, game, game_index=None):
+    super(CFRPlusSolver, self).__init__(
+        game, game_index, regret_matching_plus=True, gamma=1.)
+
+
+class LinearCFRSolver(_CFRSolver):
+  """Vectorized `discounted_cfr.LCFRSolver`."""
+
+  def __init__(self, game, game_index=None):
+    super(LinearCFRSolver, self).__init__(
+        game, game_index, alpha=1., beta=1., gamma=1.)
+
+
+class DCFRSolver(_CFRSolver):
+  """Vectorized `discounted_cfr.DCFRSolver`."""
+
+  def __init__(self, game, game_index=None, alpha=1.5, beta=0., gamma=2.):
+    super(DCFRSolver, self).__init__(
+        game, game_index, alpha=alpha, beta=beta, gamma=gamma)
+
+
+SOLVERS = {
+    "cfr": CFRSolver,
+    "cfr_plus": CFRPlusSolver,
+    "linear": LinearCFRSolver,
+    "dcfr": DCFRSolver,
+}
@@ -18,14 +18,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import sys
+
 from absl import app
 from absl import flags
 
-from open_spiel.python.algorithms import cfr
-from open_spiel.python.algorithms import exploitability
-import pyspiel
-from matplotlib import pyplot as plt
-import numpy as np
+from open_spiel.python.algorithms import felix_experiments
 
 FLAGS = flags.FLAGS
 
@@ -33,59 +31,53 @@ flags.DEFINE_integer("iterations", 2, "Number of iterations")
 flags.DEFINE_string("kuhn_game", "kuhn_poker", "Name of the game")
 flags.DEFINE_string("leduc_game", "leduc_poker", "Name of the game")
 flags.DEFINE_integer("players", 2, "Number of players")
-flags.DEFINE_integer("print_freq", 10, "How often to print the exploitability")
+flags.DEFINE_integer("print_freq", None,
+                     "How often to print the exploitability; shorthand for "
+                     "--eval_schedule=linear:<print_freq>")
+flags.DEFINE_enum(
+    "mode", "cfr", ["cfr", "cfr_plus", "linear", "dcfr"],
+    "Regret and averaging scheme: vanilla CFR, CFR+ (regret matching+ and "
+    "linear averaging), Linear CFR or Discounted CFR")
+flags.DEFINE_float("dcfr_alpha", 1.5, "Discount exponent of positive regrets")
+flags.DEFINE_float("dcfr_beta", 0., "Discount exponent of negative regrets")
+flags.DEFINE_float("dcfr_gamma", 2., "Exponent of the policy weights")
+flags.DEFINE_string("game_index_dir", "/tmp/game_index",
+                    "Directory in which the game indices are cached")
+flags.DEFINE_string("eval_schedule", None,
+                    "When to evaluate: linear:<every>, log:<factor>, "
+                    "time:<seconds> or budget:<fraction of the wall time>. "
+                    "Defaults to every `print_freq` iterations if it is set, "
+                    "else to log:1.2")
+flags.DEFINE_boolean("async_eval", True,
+                     "Whether to evaluate in a separate process")
+flags.DEFINE_string("results", "/tmp/cfr_results.jsonl",
+                    "JSONL file to which the evaluations are written; they "
+                    "are also written, for felix_plot.py, to the .npz file "
+                    "of the same name")
+flags.DEFINE_integer("num_workers", None,
+                     "Number of games solved in parallel; one per core if "
+                     "unset")
 
 
 def main(_):
-  game = pyspiel.load_game(FLAGS.kuhn_game,
-                           {"players": pyspiel.GameParameter(FLAGS.players)})
-  cfr_solver = cfr.CFRSolver(game) 
-  expl_kuhn = []
-  nash_kuhn = []
-  x_kuhn = []
-  for i in range(FLAGS.iterations):
-    print(i)
-    cfr_solver.evaluate_and_update_policy()
-    expl = exploitability.exploitability(game, cfr_solver.average_policy())
-    expl_kuhn.append(expl)
-    conv = exploitability.nash_conv(game, cfr_solver.average_policy())
-    nash_kuhn.append(conv)
-    x_kuhn.append(i)
-    
-  game = pyspiel.load_game(FLAGS.leduc_game,
-                           {"players": pyspiel.GameParameter(FLAGS.players)})
-  cfr_solver = cfr.CFRSolver(game) 
-  expl_leduc = []
-  nash_leduc = []
-  for i in range(FLAGS.iterations):
-    print(i)
-    cfr_solver.evaluate_and_update_policy()
-    expl = exploitability.exploitability(game, cfr_solver.average_policy())
-    expl_leduc.append(expl)
-    conv = exploitability.nash_conv(game, cfr_solver.average_policy())
-    nash_leduc.append(conv)  
-    
-
-  nash_kuhn = np.array(nash_kuhn)  
-  expl_kuhn = np.array(expl_kuhn)
-  x_kuhn = np.array(x_kuhn) 
-  expl_leduc = np.array(expl_leduc) 
-  nash_leduc = np.array(nash_leduc)
-  
-
-  x_leduc = np.array(x_kuhn)
-  fig=plt.figure()
-  plt.xlabel("Iteration")
-  plt.ylabel("NashConv")
-  plt.title('NashConv of rcfr for Kuhn and Leduc Poker')
-  
-  ax=fig.add_subplot(111)
-  ax.plot(x_kuhn,expl_kuhn,label='Exploitability Kuhn Poker')
-  ax.plot(x_leduc,expl_leduc,label='Exploitability Leduc Poker')
-  ax.plot(x_kuhn,nash_kuhn,label='NashConv Kuhn Poker', linestyle='dashed')
-  ax.plot(x_leduc,nash_leduc,label='NashConv Leduc Poker', linestyle='dashed')
-  plt.legend(loc=2)
-  plt.show()
+  params = {"mode": FLAGS.mode}
+  if FLAGS.mode == "dcfr":
+    params.update(alpha=FLAGS.dcfr_alpha, beta=FLAGS.dcfr_beta,
+                  gamma=FLAGS.dcfr_gamma)
+  specs = felix_experiments.expand_sweep({
+      "algorithm": "cfr",
+      "game": [FLAGS.kuhn_game, FLAGS.leduc_game],
+      "iterations": FLAGS.iterations,
+      "params": params,
+      "eval_schedule": (FLAGS.eval_schedule or
+                        ("linear:{}".format(FLAGS.print_freq)
+                         if FLAGS.print_freq else "log:1.2")),
+      "game_params": {"players": FLAGS.players},
+      "game_index_dir": FLAGS.game_index_dir,
+      "async_eval": FLAGS.async_eval,
+  })
+  if felix_experiments.run_sweep(specs, FLAGS.results, FLAGS.num_workers):
+    sys.exit(1)
 
 
 if __name__ == "__main__":
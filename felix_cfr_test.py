@@ -0,0 +1,66 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_cfr."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import numpy as np
+
+from open_spiel.python.algorithms import cfr
+from open_spiel.python.algorithms import discounted_cfr
+from open_spiel.python.algorithms import felix_cfr
+from open_spiel.python.algorithms import felix_game_index
+import pyspiel
+
+
+_EXPECTED_SOLVERS = {
+    "cfr": cfr.CFRSolver,
+    "cfr_plus": cfr.CFRPlusSolver,
+    "linear": discounted_cfr.LCFRSolver,
+    "dcfr": discounted_cfr.DCFRSolver,
+}
+
+
+class CFRSolverTest(parameterized.TestCase):
+
+  @parameterized.product(
+      game_and_iterations=[("kuhn_poker", 20), ("kuhn_poker(players=3)", 5),
+                           ("leduc_poker", 2)],
+      mode=sorted(_EXPECTED_SOLVERS))
+  def test_matches_python_solvers(self, game_and_iterations, mode):
+    game_name, num_iterations = game_and_iterations
+    game = pyspiel.load_game(game_name)
+    game_index = felix_game_index.get_game_index(game)
+    expected_solver = _EXPECTED_SOLVERS[mode](game)
+    solver = felix_cfr.SOLVERS[mode](game, game_index)
+    for _ in range(num_iterations):
+      expected_solver.evaluate_and_update_policy()
+      solver.evaluate_and_update_policy()
+    np.testing.assert_allclose(
+        solver.average_policy().action_probability_array,
+        game_index.action_probability_array(expected_solver.average_policy()),
+        atol=1e-10)
+    np.testing.assert_allclose(
+        solver.current_policy_array(),
+        game_index.action_probability_array(expected_solver.current_policy()),
+        atol=1e-10)
+
+
+if __name__ == "__main__":
+  absltest.main()
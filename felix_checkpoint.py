@@ -0,0 +1,184 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Periodic, crash-safe checkpoints of serialized solver states.
+
+A `Checkpointer` writes the serialized state of a solver, such as the
+`Serialize()` text of a pyspiel MCCFR solver, with a JSON dict of metadata,
+to `<directory>/checkpoint-<iteration>` every given number of iterations or
+seconds. Each checkpoint is written to a temporary file, synced to disk and
+renamed, and the directory is synced after the rename, so that a crash or a
+power failure leaves either the previous checkpoints or the new one. Only the
+last `keep` checkpoints are kept.
+
+The time and size of every save, serialization included, are kept in `saves`
+and logged, to tune the checkpointing period against the cost of a save.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import os
+import re
+import time
+
+from absl import logging
+
+_PREFIX = "checkpoint-"
+_CHECKPOINT_PATTERN = re.compile(r"^checkpoint-(\d+)$")
+_TEMPORARY_SUFFIX = ".tmp"
+
+# Iteration, wall time in seconds and size in bytes of a save.
+CheckpointSave = collections.namedtuple("CheckpointSave",
+                                        ["iteration", "seconds", "bytes"])
+
+
+class Checkpointer(object):
+  """Writes and rotates the checkpoints of one run in a directory.
+
+  Usage:
+
+    checkpointer = Checkpointer(directory, every=1000, keep=3)
+    restored = checkpointer.restore() if resume else None
+    for i in range(start, num_iterations):
+      solver.run_iteration()
+      if checkpointer.due(i):
+        checkpointer.save(i + 1, solver.__getstate__)
+
+  Attributes:
+    saves: (list[CheckpointSave]) Cost of each save.
+  """
+
+  def __init__(self, directory, every=None, seconds=None, keep=3):
+    """Initializes the checkpointer.
+
+    Args:
+      directory: (str) Directory of the checkpoints, created if needed.
+      every: (int or None) Number of iterations between checkpoints.
+      seconds: (float or None) Wall time in seconds between checkpoints.
+        A checkpoint is due when either period has elapsed.
+      keep: (int) Number of most recent checkpoints kept.
+    """
+    if keep < 1:
+      raise ValueError("At least one checkpoint must be kept, not {}".format(
+          keep))
+    self._directory = directory
+    self._every = every
+    self._seconds = seconds
+    self._keep = keep
+    self._last_time = time.time()
+    self.saves = []
+
+  @property
+  def directory(self):
+    return self._directory
+
+  @property
+  def every(self):
+    return self._every
+
+  @property
+  def seconds(self):
+    return self._seconds
+
+  def _path(self, iteration):
+    return os.path.join(self._directory, "{}{:010d}".format(_PREFIX, iteration))
+
+  def iterations(self):
+    """Returns the iterations of the complete checkpoints, in order."""
+    if not os.path.isdir(self._directory):
+      return []
+    matches = [_CHECKPOINT_PATTERN.match(filename)
+               for filename in os.listdir(self._directory)]
+    return sorted(int(match.group(1)) for match in matches if match)
+
+  def due(self, iteration):
+    """Returns whether a checkpoint is due after iteration `iteration`."""
+    if self._every is not None and (iteration + 1) % self._every == 0:
+      return True
+    return (self._seconds is not None and
+            time.time() - self._last_time >= self._seconds)
+
+  def save(self, iteration, state, metadata=None):
+    """Writes a checkpoint and deletes those beyond the last `keep`.
+
+    Args:
+      iteration: (int) Number of iterations run, which names the checkpoint.
+      state: (str or callable) Serialized solver state, or a function
+        returning it, whose call then counts in the time of the save.
+      metadata: (dict or None) JSON-serializable data restored with `state`.
+
+    Returns:
+      The `CheckpointSave` of the checkpoint.
+    """
+    start = time.perf_counter()
+    if callable(state):
+      state = state()
+    if not os.path.exists(self._directory):
+      os.makedirs(self._directory)
+    for filename in os.listdir(self._directory):
+      # Left by a save that was interrupted.
+      if filename.startswith(_PREFIX) and filename.endswith(_TEMPORARY_SUFFIX):
+        os.remove(os.path.join(self._directory, filename))
+    path = self._path(iteration)
+    header = dict(metadata or {}, iteration=iteration)
+    with open(path + _TEMPORARY_SUFFIX, "w") as f:
+      f.write(json.dumps(header) + "\n")
+      f.write(state)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(path + _TEMPORARY_SUFFIX, path)
+    # The rename is only durable once the directory itself is synced.
+    directory_fd = os.open(self._directory, os.O_RDONLY)
+    try:
+      os.fsync(directory_fd)
+    finally:
+      os.close(directory_fd)
+    for old_iteration in self.iterations()[:-self._keep]:
+      os.remove(self._path(old_iteration))
+    checkpoint_save = CheckpointSave(iteration, time.perf_counter() - start,
+                                     os.path.getsize(path))
+    self.saves.append(checkpoint_save)
+    self._last_time = time.time()
+    logging.info("Checkpoint %s written in %.3fs, %d bytes", path,
+                 checkpoint_save.seconds, checkpoint_save.bytes)
+    return checkpoint_save
+
+  def restore(self):
+    """Returns the `(metadata, state)` of the last checkpoint, or None.
+
+    `metadata` holds the `iteration` of the checkpoint.
+    """
+    iterations = self.iterations()
+    if not iterations:
+      return None
+    with open(self._path(iterations[-1])) as f:
+      metadata = json.loads(f.readline())
+      state = f.read()
+    self._last_time = time.time()
+    return metadata, state
+
+  def summary(self):
+    """Returns a line describing the number and mean cost of the saves."""
+    if not self.saves:
+      return "no checkpoint written"
+    return "{} checkpoints written, {:.3f}s and {:.0f} bytes on average".format(
+        len(self.saves),
+        sum(checkpoint_save.seconds for checkpoint_save in self.saves) /
+        len(self.saves),
+        sum(checkpoint_save.bytes for checkpoint_save in self.saves) /
+        len(self.saves))
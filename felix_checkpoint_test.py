@@ -0,0 +1,84 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_checkpoint."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+from absl.testing import absltest
+
+from open_spiel.python.algorithms import felix_checkpoint
+import pyspiel
+
+
+def _values_table(state):
+  """Returns the values of each information state of a serialized solver."""
+  items = state.split("[SolverValuesTable]\n")[1].rstrip("\n").split("<~>")
+  return dict(zip(items[0::2], items[1::2]))
+
+
+class CheckpointerTest(absltest.TestCase):
+
+  def test_last_checkpoints_are_kept(self):
+    directory = self.create_tempdir().full_path
+    checkpointer = felix_checkpoint.Checkpointer(directory, every=2, keep=2)
+    self.assertIsNone(checkpointer.restore())
+    for i in range(10):
+      if checkpointer.due(i):
+        checkpointer.save(i + 1, "state {}\nof two lines".format(i + 1),
+                          {"time": float(i)})
+    self.assertEqual(checkpointer.iterations(), [8, 10])
+    self.assertLen(os.listdir(directory), 2)
+    self.assertLen(checkpointer.saves, 5)
+    metadata, state = checkpointer.restore()
+    self.assertEqual(metadata, {"iteration": 10, "time": 9.})
+    self.assertEqual(state, "state 10\nof two lines")
+
+  def test_interrupted_save_is_ignored(self):
+    directory = self.create_tempdir().full_path
+    checkpointer = felix_checkpoint.Checkpointer(directory)
+    checkpointer.save(1, "complete")
+    with open(os.path.join(directory, "checkpoint-0000000002.tmp"), "w") as f:
+      f.write("{\"iteration\": 2}\ntrunc")
+    self.assertEqual(checkpointer.restore()[1], "complete")
+    checkpointer.save(3, "next")
+    self.assertCountEqual(os.listdir(directory),
+                          ["checkpoint-0000000001", "checkpoint-0000000003"])
+
+  def test_solver_resumes_exactly(self):
+    game = pyspiel.load_game("kuhn_poker")
+    solver = pyspiel.ExternalSamplingMCCFRSolver(game, seed=3)
+    checkpointer = felix_checkpoint.Checkpointer(
+        self.create_tempdir().full_path)
+    for _ in range(5):
+      solver.run_iteration()
+    checkpointer.save(5, solver.__getstate__())
+    _, state = checkpointer.restore()
+    restored = pyspiel.ExternalSamplingMCCFRSolver.__new__(
+        pyspiel.ExternalSamplingMCCFRSolver)
+    restored.__setstate__(state)
+    for _ in range(5):
+      solver.run_iteration()
+      restored.run_iteration()
+    # The values table is a hash map, whose order changes when deserialized.
+    self.assertEqual(_values_table(restored.__getstate__()),
+                     _values_table(solver.__getstate__()))
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -29,13 +29,22 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import contextlib
+import copy
+import json
+import multiprocessing
+import os
+import queue
 import random
+import threading
 import numpy as np
 import tensorflow.compat.v1 as tf
 
 from open_spiel.python import policy
 from open_spiel.python import simple_nets
-from open_spiel.python.algorithms import exploitability
+from open_spiel.python.algorithms import felix_evaluation
+from open_spiel.python.algorithms import felix_game_index
+from open_spiel.python.algorithms import felix_metrics
 
 import pyspiel
 
@@ -106,6 +115,506 @@ class ReservoirBuffer(object):
     return iter(self._data)
 
 
+class ColumnarReservoirBuffer(object):
+  """Reservoir buffer storing the fields of a namedtuple in NumPy columns.
+
+  Each field of `element_type` is backed by an array preallocated for the whole
+  capacity, so no Python object is kept per stored element. `sample` returns an
+  `element_type` whose fields are batched arrays, ready to be fed to a network.
+
+  Once the buffer is full, replacements are scheduled with Algorithm L (Li,
+  "Reservoir-Sampling Algorithms of Time Complexity O(n(1 + log(N/n)))", 1994):
+  the number of elements to skip before the next replacement is drawn directly,
+  so random numbers are only drawn for elements that are actually stored.
+
+  When a `directory` is given, the columns are `.npy` files memory-mapped from
+  that directory, so the capacity is bounded by disk rather than RAM. Calling
+  `flush` persists the columns together with the sampling state, and a buffer
+  created later on the same directory resumes from that state. The state is
+  marked dirty before the first row written after a flush, so that a buffer is
+  never resumed from rows newer than its sampling state.
+  """
+
+  _STATE_FILENAME = "reservoir.json"
+  _SAVE_CHUNK_SIZE = 65536
+
+  def __init__(self,
+               reservoir_buffer_capacity,
+               element_type,
+               column_specs,
+               directory=None):
+    """Initializes the columns of the buffer.
+
+    Args:
+      reservoir_buffer_capacity: Number of elements that can be stored.
+      element_type: namedtuple class of the stored elements.
+      column_specs: `dict` mapping each field of `element_type` to a
+        `(shape, dtype)` pair describing a single element of that field.
+      directory: (str or None) Directory holding the memory-mapped columns. If
+        `None`, the columns are kept in memory.
+
+    Raises:
+      ValueError: If `directory` holds columns of a different shape or dtype,
+        or rows written after its last `flush`.
+    """
+    self._reservoir_buffer_capacity = int(reservoir_buffer_capacity)
+    self._element_type = element_type
+    self._directory = directory
+    self._size = 0
+    self._add_calls = 0
+    self._skip_weight = None
+    self._next_replacement = None
+    # Whether rows were written to `directory` since the last flush.
+    self._dirty = False
+    state = None
+    if directory is not None:
+      if not os.path.exists(directory):
+        os.makedirs(directory)
+      state_path = os.path.join(directory, self._STATE_FILENAME)
+      if os.path.exists(state_path):
+        with open(state_path) as f:
+          state = json.load(f)
+        if state.get("dirty"):
+          raise ValueError(
+              "{} holds rows written after its last flush, so its sampling "
+              "state cannot be resumed".format(directory))
+    self._columns = collections.OrderedDict()
+    for name in element_type._fields:
+      shape, dtype = column_specs[name]
+      shape = (self._reservoir_buffer_capacity,) + tuple(shape)
+      if directory is None:
+        self._columns[name] = np.zeros(shape, dtype=dtype)
+        continue
+      column = np.lib.format.open_memmap(
+          os.path.join(directory, name + ".npy"),
+          mode="r+" if state else "w+",
+          dtype=dtype,
+          shape=shape)
+      if column.shape != shape or column.dtype != np.dtype(dtype):
+        raise ValueError("Column '{}' in {} has shape {} and dtype {}, "
+                         "expected {} and {}".format(name, directory,
+                                                     column.shape, column.dtype,
+                                                     shape, np.dtype(dtype)))
+      self._columns[name] = column
+    if state:
+      self._size = state["size"]
+      self._add_calls = state["add_calls"]
+      self._skip_weight = state["skip_weight"]
+      self._next_replacement = state["next_replacement"]
+
+  def _schedule_next_replacement(self):
+    """Advances `_next_replacement` to the next stream position to store."""
+    if self._skip_weight is None:
+      self._skip_weight = 1.
+      self._next_replacement = self._reservoir_buffer_capacity - 1
+    self._skip_weight *= np.exp(
+        np.log(1. - np.random.random()) / self._reservoir_buffer_capacity)
+    skip = np.floor(
+        np.log(1. - np.random.random()) / np.log1p(-self._skip_weight))
+    self._next_replacement += int(min(skip, np.iinfo(np.int64).max // 2)) + 1
+
+  def add(self, element):
+    """Potentially adds `element` to the reservoir buffer.
+
+    Args:
+      element: `element_type` instance to be added to the reservoir buffer.
+    """
+    if self._size < self._reservoir_buffer_capacity:
+      idx = self._size
+      self._size += 1
+      if self._size == self._reservoir_buffer_capacity:
+        self._schedule_next_replacement()
+    elif self._add_calls == self._next_replacement:
+      idx = np.random.randint(0, self._reservoir_buffer_capacity)
+      self._schedule_next_replacement()
+    else:
+      idx = None
+    if idx is not None:
+      self._mark_dirty()
+      for name, column in self._columns.items():
+        column[idx] = getattr(element, name)
+    self._add_calls += 1
+
+  def add_batch(self, elements):
+    """Potentially adds each row of `elements` to the reservoir buffer.
+
+    This is equivalent to calling `add` on every row in order, but the rows
+    are copied into the columns with a single vectorized assignment.
+
+    Args:
+      elements: `element_type` whose fields hold arrays with one row per
+        element to be added.
+    """
+    num_elements = len(elements[0])
+    num_free = min(num_elements, self._reservoir_buffer_capacity - self._size)
+    if num_free > 0:
+      self._mark_dirty()
+      for name, column in self._columns.items():
+        column[self._size:self._size + num_free] = (
+            getattr(elements, name)[:num_free])
+      self._size += num_free
+      if self._size == self._reservoir_buffer_capacity:
+        self._schedule_next_replacement()
+    # Later rows of the batch overwrite earlier ones sharing the same slot.
+    replacements = collections.OrderedDict()
+    end = self._add_calls + num_elements
+    while (self._next_replacement is not None and
+           self._next_replacement < end):
+      row = self._next_replacement - self._add_calls
+      replacements[np.random.randint(0, self._reservoir_buffer_capacity)] = row
+      self._schedule_next_replacement()
+    if replacements:
+      self._mark_dirty()
+      slots = np.fromiter(replacements.keys(), dtype=np.int64)
+      rows = np.fromiter(replacements.values(), dtype=np.int64)
+      for name, column in self._columns.items():
+        column[slots] = np.asarray(getattr(elements, name))[rows]
+    self._add_calls = end
+
+  def sample(self, num_samples):
+    """Returns `num_samples` uniformly sampled from the buffer.
+
+    Args:
+      num_samples: `int`, number of samples to draw.
+
+    Returns:
+      An `element_type` whose fields hold arrays of `num_samples` rows.
+
+    Raises:
+      ValueError: If there are less than `num_samples` elements in the buffer
+    """
+    if self._size < num_samples:
+      raise ValueError("{} elements could not be sampled from size {}".format(
+          num_samples, self._size))
+    # Sorted indices keep reads of memory-mapped columns mostly sequential.
+    return self._gather(np.sort(random.sample(range(self._size), num_samples)))
+
+  def shuffled_batches(self, batch_size):
+    """Yields every stored element once, in random batches.
+
+    Args:
+      batch_size: `int`, number of elements per batch. The last batch holds
+        the remainder.
+
+    Yields:
+      `element_type` instances whose fields hold arrays of up to `batch_size`
+      rows.
+    """
+    permutation = np.random.permutation(self._size)
+    for start in range(0, self._size, batch_size):
+      yield self._gather(np.sort(permutation[start:start + batch_size]))
+
+  def _gather(self, indices):
+    return self._element_type(
+        *[column[indices] for column in self._columns.values()])
+
+  def as_batch(self):
+    """Returns all stored elements as an `element_type` of array views."""
+    return self._element_type(
+        *[column[:self._size] for column in self._columns.values()])
+
+  def _write_state(self, directory, dirty=False):
+    state_path = os.path.join(directory, self._STATE_FILENAME)
+    with open(state_path + ".tmp", "w") as f:
+      json.dump({
+          "size": self._size,
+          "add_calls": self._add_calls,
+          "skip_weight": self._skip_weight,
+          "next_replacement": self._next_replacement,
+          "dirty": dirty,
+      }, f)
+    os.replace(state_path + ".tmp", state_path)
+
+  def _mark_dirty(self):
+    """Marks the state in `directory` dirty before rows are written there."""
+    if self._directory is None or self._dirty:
+      return
+    self._write_state(self._directory, dirty=True)
+    self._dirty = True
+
+  def flush(self):
+    """Persists the columns and the sampling state to `directory`, if any."""
+    if self._directory is None:
+      return
+    for column in self._columns.values():
+      column.flush()
+    self._write_state(self._directory)
+    self._dirty = False
+
+  def save(self, directory):
+    """Writes the stored elements and the sampling state to `directory`.
+
+    Each column is written as a `.npy` file holding only the stored rows,
+    copied in chunks of `_SAVE_CHUNK_SIZE` rows so that saving needs no
+    temporary copy of the column. The sampling state is written last, so a
+    directory without it holds no complete snapshot.
+
+    Args:
+      directory: (str) Directory in which to write the buffer.
+
+    Raises:
+      ValueError: If `directory` is the directory of the memory-mapped columns.
+    """
+    if (self._directory is not None and
+        os.path.abspath(directory) == os.path.abspath(self._directory)):
+      raise ValueError("A buffer cannot be saved to its own directory {}, use "
+                       "`flush` instead".format(directory))
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+    state_path = os.path.join(directory, self._STATE_FILENAME)
+    if os.path.exists(state_path):
+      os.remove(state_path)
+    for name, column in self._columns.items():
+      saved = np.lib.format.open_memmap(
+          os.path.join(directory, name + ".npy"),
+          mode="w+",
+          dtype=column.dtype,
+          shape=(self._size,) + column.shape[1:])
+      for start in range(0, self._size, self._SAVE_CHUNK_SIZE):
+        end = min(start + self._SAVE_CHUNK_SIZE, self._size)
+        saved[start:end] = column[start:end]
+      saved.flush()
+      del saved
+    self._write_state(directory)
+
+  def restore(self, directory):
+    """Replaces the content of the buffer by the one saved in `directory`.
+
+    Raises:
+      ValueError: If the saved buffer does not fit in this buffer.
+    """
+    with open(os.path.join(directory, self._STATE_FILENAME)) as f:
+      state = json.load(f)
+    if state["size"] > self._reservoir_buffer_capacity:
+      raise ValueError("{} holds {} elements, more than the capacity {}".format(
+          directory, state["size"], self._reservoir_buffer_capacity))
+    self._mark_dirty()
+    for name, column in self._columns.items():
+      saved = np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+      if saved.shape != (state["size"],) + column.shape[1:]:
+        raise ValueError("Column '{}' in {} has shape {}, expected {}".format(
+            name, directory, saved.shape,
+            (state["size"],) + column.shape[1:]))
+      column[:state["size"]] = saved
+      del saved
+    self._size = state["size"]
+    self._add_calls = state["add_calls"]
+    self._skip_weight = state["skip_weight"]
+    self._next_replacement = state["next_replacement"]
+
+  def clear(self):
+    self._size = 0
+    self._add_calls = 0
+    self._skip_weight = None
+    self._next_replacement = None
+
+  @property
+  def capacity(self):
+    return self._reservoir_buffer_capacity
+
+  @property
+  def add_calls(self):
+    """Number of elements offered to the buffer since it was last cleared."""
+    return self._add_calls
+
+  def __len__(self):
+    return self._size
+
+  def __iter__(self):
+    for i in range(self._size):
+      yield self._element_type(
+          *[column[i] for column in self._columns.values()])
+
+
+class _SampleCollector(object):
+  """Accumulates elements to be returned as a single batch of arrays."""
+
+  def __init__(self, element_type):
+    self._element_type = element_type
+    self._fields = [[] for _ in element_type._fields]
+
+  def add(self, element):
+    for field, value in zip(self._fields, element):
+      field.append(value)
+
+  def as_batch(self):
+    return self._element_type(*[np.array(field) for field in self._fields])
+
+
+class _BatchPrefetcher(object):
+  """Samples training batches from a buffer in a background thread.
+
+  Up to `num_prefetch` batches are prepared ahead of the consumer, so that
+  sampling overlaps with the training step using the previous batch. Errors
+  raised while sampling are re-raised in the consumer.
+  """
+
+  def __init__(self, buffer, batch_size, num_batches, num_prefetch):
+    self._buffer = buffer
+    self._batch_size = batch_size
+    self._num_batches = num_batches
+    self._queue = queue.Queue(maxsize=num_prefetch)
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._produce)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _put(self, item):
+    while not self._stopped.is_set():
+      try:
+        self._queue.put(item, timeout=0.1)
+        return
+      except queue.Full:
+        continue
+
+  def _produce(self):
+    try:
+      for _ in range(self._num_batches):
+        if self._stopped.is_set():
+          return
+        self._put(self._buffer.sample(self._batch_size))
+    except Exception as e:  # pylint: disable=broad-except
+      self._put(e)
+
+  def __iter__(self):
+    try:
+      for _ in range(self._num_batches):
+        batch = self._queue.get()
+        if isinstance(batch, Exception):
+          raise batch
+        yield batch
+    finally:
+      self._stopped.set()
+
+
+def _mlp_variables(network):
+  """Returns the `(weights, bias)` variables of each layer of `network`."""
+  return [(layer._weights, layer._bias) for layer in network._layers]  # pylint: disable=protected-access
+
+
+def _mlp_forward(layers, inputs):
+  """Evaluates a `simple_nets.MLP` from its `(weights, bias)` per layer."""
+  outputs = inputs
+  for i, (weights, bias) in enumerate(layers):
+    outputs = np.dot(outputs, weights) + bias
+    if i < len(layers) - 1:
+      outputs = np.maximum(outputs, 0.)
+  return outputs
+
+
+def _softmax(logits):
+  exp_logits = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+  return exp_logits / np.sum(exp_logits, axis=-1, keepdims=True)
+
+
+# Solver inherited by the forked traversal worker processes.
+_worker_solver = None
+
+
+def _init_traversal_worker(solver):
+  global _worker_solver
+  _worker_solver = solver
+
+
+def _run_traversal_worker(args):
+  return _worker_solver._collect_traversals(*args)  # pylint: disable=protected-access
+
+
+class _TraversalFrame(object):
+  """A node on the explicit stack of `DeepCFRSolver._traverse_game_tree`."""
+
+  __slots__ = ("actor", "actions", "strategy", "state", "payoffs")
+
+  def __init__(self, actor, actions, strategy, state):
+    self.actor = actor
+    self.actions = actions
+    self.strategy = strategy
+    # Copy of the node to return to, when the game cannot undo actions.
+    self.state = state
+    # Payoffs of the children already traversed, in `actions` order.
+    self.payoffs = []
+
+
+# Whether the states of a game type implement `undo_action`, keyed by game
+# short name.
+_undo_support = {}
+
+
+def _supports_undo(game):
+  """Returns whether states of `game` implement `undo_action`.
+
+  The probe runs once per game type, as pyspiel logs the error raised by
+  games that do not implement `undo_action`.
+  """
+  key = game.get_type().short_name
+  if key in _undo_support:
+    return _undo_support[key]
+  state = game.new_initial_state()
+  history = state.history_str()
+  actor = state.current_player()
+  action = state.legal_actions()[0]
+  state.apply_action(action)
+  try:
+    state.undo_action(actor, action)
+    supported = state.history_str() == history
+  except pyspiel.SpielError:
+    supported = False
+  _undo_support[key] = supported
+  return supported
+
+
+class StrategyCache(object):
+  """Bounded least-recently-used cache of regret-matched strategies.
+
+  Keys are information state strings. A `capacity` of 0 disables caching.
+  `hits` and `misses` count lookups since construction and survive `clear`.
+  """
+
+  def __init__(self, capacity):
+    self._capacity = int(capacity)
+    self._data = collections.OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key):
+    """Returns the value cached for `key`, or `None`."""
+    value = self._data.get(key)
+    if value is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+      self._data.move_to_end(key)
+    return value
+
+  def put(self, key, value):
+    if self._capacity <= 0:
+      return
+    self._data[key] = value
+    self._data.move_to_end(key)
+    if len(self._data) > self._capacity:
+      self._data.popitem(last=False)
+
+  @property
+  def hit_rate(self):
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.
+
+  def clear(self):
+    self._data.clear()
+
+  def __len__(self):
+    return len(self._data)
+
+
+# Solver state written last by `DeepCFRSolver.save`.
+_CHECKPOINT_STATE_FILENAME = "solver.json"
+
+
+def checkpoint_exists(path):
+  """Returns whether `path` holds a complete `DeepCFRSolver` checkpoint."""
+  return os.path.exists(os.path.join(path, _CHECKPOINT_STATE_FILENAME))
+
+
 class DeepCFRSolver(policy.Policy):
   """Implements a solver for the Deep CFR Algorithm.
 
@@ -115,9 +624,10 @@ class DeepCFRSolver(policy.Policy):
   steps. Initialize the game state and algorithmic variables.
 
   Note: batch sizes default to `None` implying that training over the full
-        dataset in memory is done by default.  To sample from the memories you
-        may set these values to something less than the full capacity of the
-        memory.
+        dataset in memory is done by default: each training step is then an
+        epoch over the memory, in shuffled chunks of `epoch_chunk_size`
+        samples.  To sample from the memories you may set these values to
+        something less than the full capacity of the memory.
   """
 
   def __init__(self,
@@ -133,7 +643,19 @@ class DeepCFRSolver(policy.Policy):
                memory_capacity: int = int(1e6),
                policy_network_train_steps: int = 1,
                advantage_network_train_steps: int = 1,
-               reinitialize_advantage_networks: bool = True):
+               reinitialize_advantage_networks: bool = True,
+               memory_directory=None,
+               batch_traversals: bool = True,
+               strategy_cache_size: int = 100000,
+               num_traversal_workers: int = 1,
+               prefetch_batches: int = 4,
+               epoch_chunk_size: int = 4096,
+               game_index=None,
+               eval_schedule="linear:10",
+               async_evaluation: bool = False,
+               checkpoint_directory=None,
+               checkpoint_every: int = 10,
+               metrics=None):
     """Initialize the Deep CFR algorithm.
 
     Args:
@@ -145,9 +667,9 @@ class DeepCFRSolver(policy.Policy):
       num_traversals: Number of traversals per iteration.
       learning_rate: Learning rate.
       batch_size_advantage: (int or None) Batch size to sample from advantage
-        memories.
+        memories. If `None`, each training step is an epoch over the memory.
       batch_size_strategy: (int or None) Batch size to sample from strategy
-        memories.
+        memories. If `None`, each training step is an epoch over the memory.
       memory_capacity: Number of samples that can be stored in memory.
       policy_network_train_steps: Number of policy network training steps (per
         iteration).
@@ -155,11 +677,54 @@ class DeepCFRSolver(policy.Policy):
         (per iteration).
       reinitialize_advantage_networks: Whether to re-initialize the
         advantage network before training on each iteration.
+      memory_directory: (str or None) If set, the advantage and strategy
+        memories are memory-mapped from sub-directories of this directory
+        instead of being held in RAM, and are flushed after every iteration.
+      batch_traversals: Whether to run the traversals of an iteration
+        together, depth by depth, evaluating the advantage networks once per
+        depth instead of once per visited decision node. The batched
+        traversals keep every state of a depth for their backward pass, so
+        they clone each child; only the unbatched traversals move a single
+        state with `apply_action` and `undo_action`. Batching pays off when
+        network evaluations dominate, as in Liar's Dice, while the unbatched
+        traversals need less memory and run about as fast on games with few
+        nodes per depth, such as Leduc poker (see the deep_cfr/traversal
+        benchmarks of `felix_benchmark.py`).
+      strategy_cache_size: Number of regret-matched strategies cached per
+        player, keyed by information state. The cache of a player is cleared
+        whenever its advantage network changes. 0 disables caching.
+      num_traversal_workers: Number of processes among which the traversals
+        of each iteration are split. Workers are forked from the solver and
+        evaluate a NumPy copy of the advantage networks; their samples are
+        merged into the memories in worker order, so runs are reproducible
+        for a given `np.random` seed and number of workers.
+      prefetch_batches: Number of training batches sampled ahead of the
+        training step by a background thread. 0 samples them synchronously.
+      epoch_chunk_size: Number of samples per network update when training
+        over whole epochs, i.e. when a batch size is `None`.
+      game_index: (`felix_game_index.GameIndex` or None) Index of `game` used
+        to build and evaluate `tabular_policy`. Defaults to the shared index
+        returned by `felix_game_index.get_game_index`, built on first use.
+      eval_schedule: (str or schedule) When to train the policy network and
+        evaluate its exploitability and NashConv during `solve`, as accepted
+        by `felix_evaluation.make_schedule`. The last iteration is always
+        evaluated.
+      async_evaluation: Whether to evaluate policy snapshots in a separate
+        process while training continues, instead of inline.
+      checkpoint_directory: (str or None) If set, `solve` writes a checkpoint
+        to this directory with `save` every `checkpoint_every` iterations and
+        after the last one. `restore` it to resume an interrupted run.
+      checkpoint_every: Number of iterations between checkpoints.
+      metrics: (`felix_metrics.Metrics` or None) If set, `solve` records in it
+        the wall time of each phase of every iteration, the number of nodes
+        visited, samples added and `session.run` calls, and the fill level of
+        the memories.
     """
     all_players = list(range(game.num_players()))
     super(DeepCFRSolver, self).__init__(game, all_players)
     self._nash_convs = []
     self._expl = []
+    self._evaluation_iterations = []
     self._game = game
     if game.get_type().dynamics == pyspiel.GameType.Dynamics.SIMULTANEOUS:
       # `_traverse_game_tree` does not take into account this option.
@@ -176,8 +741,37 @@ class DeepCFRSolver(policy.Policy):
     self._num_iterations = num_iterations
     self._num_traversals = num_traversals
     self._reinitialize_advantage_networks = reinitialize_advantage_networks
+    self._batch_traversals = batch_traversals
+    self._undo_supported = _supports_undo(game)
+    self._strategy_caches = [
+        StrategyCache(strategy_cache_size) for _ in range(self._num_players)
+    ]
+    self._num_traversal_workers = num_traversal_workers
+    self._prefetch_batches = prefetch_batches
+    self._epoch_chunk_size = epoch_chunk_size
+    # NumPy copies of the network weights, used for every forward pass outside
+    # of training. They are exported lazily and dropped whenever the network
+    # changes.
+    self._advantage_weights = [None] * self._num_players
+    self._policy_weights = None
+    # Uniform `TabularPolicy` over all the info states of the game, built from
+    # the game index on first use by `tabular_policy`.
+    self._game_index = game_index
+    if isinstance(eval_schedule, str):
+      eval_schedule = felix_evaluation.make_schedule(eval_schedule)
+    self._eval_schedule = eval_schedule
+    self._async_evaluation = async_evaluation
+    self._checkpoint_directory = checkpoint_directory
+    self._checkpoint_every = checkpoint_every
+    self._metrics = felix_metrics.NULL_METRICS if metrics is None else metrics
+    self._metrics.add_rate("nodes_per_second", "nodes_visited", "traversal")
+    self._metrics.add_rate("samples_per_second", "samples_added", "traversal")
+    # Number of game tree nodes visited by the traversals of this process.
+    self._num_nodes_visited = 0
+    self._tabular_policy_template = None
     self._num_actions = game.num_distinct_actions()
     self._iteration = 1
+    self._memory_directory = memory_directory
 
     # Create required TensorFlow placeholders to perform the Q-network updates.
     self._info_state_ph = tf.placeholder(
@@ -203,7 +797,14 @@ class DeepCFRSolver(policy.Policy):
               name="advantage_ph_" + str(p)))
 
     # Define strategy network, loss & memory.
-    self._strategy_memories = ReservoirBuffer(memory_capacity)
+    self._strategy_memories = ColumnarReservoirBuffer(
+        memory_capacity,
+        StrategyMemory, {
+            "info_state": ((self._embedding_size,), np.float32),
+            "iteration": ((), np.int32),
+            "strategy_action_probs": ((self._num_actions,), np.float32),
+        },
+        directory=self._memory_path("strategy"))
     self._policy_network = simple_nets.MLP(self._embedding_size,
                                            list(policy_network_layers),
                                            self._num_actions)
@@ -220,7 +821,16 @@ class DeepCFRSolver(policy.Policy):
 
     # Define advantage network, loss & memory. (One per player)
     self._advantage_memories = [
-        ReservoirBuffer(memory_capacity) for _ in range(self._num_players)
+        ColumnarReservoirBuffer(
+            memory_capacity,
+            AdvantageMemory, {
+                "info_state": ((self._embedding_size,), np.float32),
+                "iteration": ((), np.int32),
+                "advantage": ((self._num_actions,), np.float32),
+                "action": ((), np.int32),
+            },
+            directory=self._memory_path("advantage_" + str(p)))
+        for p in range(self._num_players)
     ]
     self._advantage_networks = [
         simple_nets.MLP(self._embedding_size, list(advantage_network_layers),
@@ -245,6 +855,21 @@ class DeepCFRSolver(policy.Policy):
       self._learn_step_advantages.append(self._optimizer_advantages[p].minimize(
           self._loss_advantages[p]))
 
+    # Saves the networks together with the Adam slots and step counters.
+    saved_variables = (
+        list(self._policy_network.variables) +
+        self._optimizer_policy.variables())
+    for p in range(self._num_players):
+      saved_variables += (
+          list(self._advantage_networks[p].variables) +
+          self._optimizer_advantages[p].variables())
+    self._saver = tf.train.Saver(saved_variables, max_to_keep=None)
+
+  def _memory_path(self, name):
+    if self._memory_directory is None:
+      return None
+    return os.path.join(self._memory_directory, name)
+
   @property
   def advantage_buffers(self):
     return self._advantage_memories
@@ -253,16 +878,104 @@ class DeepCFRSolver(policy.Policy):
   def strategy_buffer(self):
     return self._strategy_memories
 
+  @property
+  def strategy_caches(self):
+    return self._strategy_caches
+
+  @property
+  def evaluation_iterations(self):
+    """Iterations of the NashConv and exploitability returned by `solve`."""
+    return self._evaluation_iterations
+
+  @property
+  def metrics(self):
+    return self._metrics
+
+  @property
+  def game_index(self):
+    if self._game_index is None:
+      self._game_index = felix_game_index.get_game_index(self._game)
+    return self._game_index
+
   def clear_advantage_buffers(self):
     for p in range(self._num_players):
       self._advantage_memories[p].clear()
 
+  def flush_buffers(self):
+    """Persists memory-mapped advantage and strategy memories to disk."""
+    for p in range(self._num_players):
+      self._advantage_memories[p].flush()
+    self._strategy_memories.flush()
+
+  def save(self, path):
+    """Writes a checkpoint of the solver to directory `path`.
+
+    The checkpoint holds the network variables and optimizer slots, the
+    iteration counter, the evaluation histories and the advantage and
+    strategy memories, so that `restore` resumes `solve` where it stopped.
+    The solver state is written last: a directory without it holds no
+    complete checkpoint.
+
+    Args:
+      path: (str) Directory in which to write the checkpoint.
+    """
+    if not os.path.exists(path):
+      os.makedirs(path)
+    state_path = os.path.join(path, _CHECKPOINT_STATE_FILENAME)
+    if os.path.exists(state_path):
+      os.remove(state_path)
+    self._saver.save(
+        self._session,
+        os.path.join(path, "variables"),
+        write_meta_graph=False,
+        write_state=False)
+    for p in range(self._num_players):
+      self._advantage_memories[p].save(
+          os.path.join(path, "advantage_" + str(p)))
+    self._strategy_memories.save(os.path.join(path, "strategy"))
+    with open(state_path + ".tmp", "w") as f:
+      json.dump({
+          "iteration": self._iteration,
+          "nash_convs": [float(conv) for conv in self._nash_convs],
+          "expl": [float(expl) for expl in self._expl],
+          "evaluation_iterations": [
+              int(iteration) for iteration in self._evaluation_iterations
+          ],
+      }, f)
+    os.replace(state_path + ".tmp", state_path)
+
+  def restore(self, path):
+    """Restores the solver from a checkpoint written by `save`.
+
+    Args:
+      path: (str) Directory holding the checkpoint.
+
+    Raises:
+      ValueError: If `path` holds no complete checkpoint.
+    """
+    if not checkpoint_exists(path):
+      raise ValueError("No Deep CFR checkpoint in {}".format(path))
+    with open(os.path.join(path, _CHECKPOINT_STATE_FILENAME)) as f:
+      state = json.load(f)
+    self._saver.restore(self._session, os.path.join(path, "variables"))
+    for p in range(self._num_players):
+      self._advantage_memories[p].restore(
+          os.path.join(path, "advantage_" + str(p)))
+      self._advantage_network_changed(p)
+    self._strategy_memories.restore(os.path.join(path, "strategy"))
+    self._policy_weights = None
+    self._iteration = state["iteration"]
+    self._nash_convs = state["nash_convs"]
+    self._expl = state["expl"]
+    self._evaluation_iterations = state["evaluation_iterations"]
+
   def reinitialize_advantage_networks(self):
     for p in range(self._num_players):
       self.reinitialize_advantage_network(p)
 
   def reinitialize_advantage_network(self, player):
-    self._session.run(
+    self._advantage_network_changed(player)
+    self._run_session(
         tf.group(*[
             var.initializer
             for var in self._advantage_networks[player].variables
@@ -271,75 +984,418 @@ class DeepCFRSolver(policy.Policy):
   def solve(self):
     """Solution logic for Deep CFR."""
     advantage_losses = collections.defaultdict(list)
-    for _ in range(self._num_iterations):
-      for p in range(self._num_players):
-        for _ in range(self._num_traversals):
-          self._traverse_game_tree(self._root_node, p)
-        if self._reinitialize_advantage_networks:
-          # Re-initialize advantage network for player and train from scratch.
-          self.reinitialize_advantage_network(p)
-        advantage_losses[p].append(self._learn_advantage_network(p))
-      if self._iteration + 1 == self._num_iterations or self._iteration % 10 == 0:
-        self._learn_strategy_network()
-        average_policy = policy.tabular_policy_from_callable(self._game,self.action_probabilities)
-        expl = exploitability.exploitability(self._game, average_policy)
-        self._expl.append(expl)
-        conv = exploitability.nash_conv(self._game, average_policy)
-        self._nash_convs.append(conv)
-      self._iteration += 1
+    metrics = self._metrics
+    evaluator = felix_evaluation.make_evaluator(
+        self._game, self.game_index, asynchronous=self._async_evaluation)
+    if hasattr(self._eval_schedule, "attach"):
+      # Budget schedules measure the evaluations of the evaluator.
+      self._eval_schedule.attach(evaluator)
+    with evaluator, self._traversal_workers() as pool:
+      # Iterations are counted from 1, and a restored solver resumes after the
+      # last iteration it saved.
+      while self._iteration <= self._num_iterations:
+        for p in range(self._num_players):
+          num_nodes_visited = self._num_nodes_visited
+          num_samples_added = self._num_samples_added(p)
+          with metrics.phase("traversal"):
+            if pool is None:
+              self._run_traversals(p, self._num_traversals)
+            else:
+              self._run_parallel_traversals(pool, p)
+          metrics.increment("nodes_visited",
+                            self._num_nodes_visited - num_nodes_visited)
+          metrics.increment("samples_added",
+                            self._num_samples_added(p) - num_samples_added)
+          with metrics.phase("advantage_training"):
+            if self._reinitialize_advantage_networks:
+              # Re-initialize advantage network for player and train from
+              # scratch.
+              self.reinitialize_advantage_network(p)
+            advantage_losses[p].append(self._learn_advantage_network(p))
+        if (self._iteration == self._num_iterations or
+            self._eval_schedule.should_evaluate(self._iteration)):
+          with metrics.phase("strategy_training"):
+            self._learn_strategy_network()
+          with metrics.phase("evaluation"):
+            # The rows of `tabular_policy` are those of the game index, so its
+            # array is evaluated directly.
+            evaluator.submit(self._iteration,
+                             self.tabular_policy().action_probability_array)
+        with metrics.phase("evaluation"):
+          self._record_evaluations(evaluator.poll())
+        self._iteration += 1
+        with metrics.phase("flush"):
+          self.flush_buffers()
+        if self._checkpoint_directory is not None and (
+            self._iteration > self._num_iterations or
+            (self._iteration - 1) % self._checkpoint_every == 0):
+          with metrics.phase("evaluation"):
+            self._record_evaluations(evaluator.join())
+          with metrics.phase("checkpoint"):
+            self.save(self._checkpoint_directory)
+        self._record_memory_fill()
+        metrics.end_iteration(self._iteration - 1)
+      self._record_evaluations(evaluator.join())
     # Train policy network.
     policy_loss = self._learn_strategy_network()
     return self._policy_network, advantage_losses, policy_loss, self._nash_convs, self._expl
 
+  def _num_samples_added(self, player):
+    return (self._advantage_memories[player].add_calls +
+            self._strategy_memories.add_calls)
+
+  def _record_memory_fill(self):
+    for p in range(self._num_players):
+      memory = self._advantage_memories[p]
+      self._metrics.gauge("advantage_fill_" + str(p),
+                          len(memory) / memory.capacity)
+    self._metrics.gauge(
+        "strategy_fill",
+        len(self._strategy_memories) / self._strategy_memories.capacity)
+
+  def _record_evaluations(self, evaluations):
+    for iteration, evaluation in evaluations:
+      self._evaluation_iterations.append(iteration)
+      self._expl.append(evaluation.exploitability)
+      self._nash_convs.append(evaluation.nash_conv)
+
+  def _traversal_workers(self):
+    """Returns a context managing the pool of traversal workers, if any."""
+    if self._num_traversal_workers <= 1:
+      return contextlib.nullcontext()
+    # Forking (rather than spawning) lets the workers inherit the solver; they
+    # never touch the TensorFlow session they inherit with it.
+    return multiprocessing.get_context("fork").Pool(
+        self._num_traversal_workers,
+        initializer=_init_traversal_worker,
+        initargs=(self,))
+
+  def _run_traversals(self, player, num_traversals):
+    if self._batch_traversals:
+      self._traverse_game_trees(player, num_traversals)
+    else:
+      for _ in range(num_traversals):
+        self._traverse_game_tree(self._root_node, player)
+
+  def _run_parallel_traversals(self, pool, player):
+    """Splits the traversals of `player` among `pool` and stores the samples.
+
+    Args:
+      pool: `multiprocessing.Pool` started by `_traversal_workers`.
+      player: (int) Player index for these traversals.
+    """
+    weights = [
+        self._advantage_network_weights(p) for p in range(self._num_players)
+    ]
+    num_workers = self._num_traversal_workers
+    shares = [
+        self._num_traversals // num_workers +
+        (1 if i < self._num_traversals % num_workers else 0)
+        for i in range(num_workers)
+    ]
+    seeds = np.random.randint(np.iinfo(np.int32).max, size=num_workers)
+    results = pool.map(_run_traversal_worker, [
+        (player, share, self._iteration, seed, weights)
+        for share, seed in zip(shares, seeds)
+    ])
+    for advantages, strategies, num_nodes_visited in results:
+      self._advantage_memories[player].add_batch(advantages)
+      self._strategy_memories.add_batch(strategies)
+      self._num_nodes_visited += num_nodes_visited
+
+  def _collect_traversals(self, player, num_traversals, iteration, seed,
+                          weights):
+    """Runs traversals in a worker process and returns the sampled memories.
+
+    Args:
+      player: (int) Player index for these traversals.
+      num_traversals: (int) Number of traversals to perform.
+      iteration: (int) Current iteration of the solver.
+      seed: (int) Seed of the worker's `np.random` state.
+      weights: `(weights, bias)` pairs per layer of each advantage network.
+    Returns:
+      An `AdvantageMemory` and a `StrategyMemory` batch of the samples, and
+      the number of nodes visited.
+    """
+    np.random.seed(seed)
+    self._iteration = iteration
+    self._advantage_weights = weights
+    for cache in self._strategy_caches:
+      cache.clear()
+    self._advantage_memories[player] = _SampleCollector(AdvantageMemory)
+    self._strategy_memories = _SampleCollector(StrategyMemory)
+    self._num_nodes_visited = 0
+    self._run_traversals(player, num_traversals)
+    return (self._advantage_memories[player].as_batch(),
+            self._strategy_memories.as_batch(), self._num_nodes_visited)
+
+  def _run_session(self, fetches, feed_dict=None):
+    self._metrics.increment("session_runs")
+    return self._session.run(fetches, feed_dict=feed_dict)
+
+  def _advantage_network_changed(self, player):
+    """Drops what was derived from the advantage network of `player`."""
+    self._strategy_caches[player].clear()
+    self._advantage_weights[player] = None
+
+  def _advantage_network_weights(self, player):
+    """Returns the NumPy weights of the advantage network of `player`."""
+    if self._advantage_weights[player] is None:
+      self._advantage_weights[player] = self._run_session(
+          _mlp_variables(self._advantage_networks[player]))
+    return self._advantage_weights[player]
+
+  def _evaluate_advantage_networks(self, players, info_states):
+    """Returns the advantage network output of each of `players`.
+
+    The networks are evaluated in NumPy; TensorFlow is only used to train them.
+
+    Args:
+      players: (list[int]) Players whose advantage networks to evaluate.
+      info_states: Array of information state tensors, one per row.
+    Returns:
+      A list with, for each player, an array of advantages per row.
+    """
+    return [
+        _mlp_forward(self._advantage_network_weights(p), info_states)
+        for p in players
+    ]
+
+  def _evaluate_policy_network(self, info_states):
+    """Returns the policy network action probabilities for `info_states`."""
+    if self._policy_weights is None:
+      self._policy_weights = self._run_session(
+          _mlp_variables(self._policy_network))
+    return _softmax(_mlp_forward(self._policy_weights, info_states))
+
   def _traverse_game_tree(self, state, player):
     """Performs a traversal of the game tree.
 
     Over a traversal the advantage and strategy memories are populated with
     computed advantage values and matched regrets respectively.
+
+    The tree is walked depth-first with an explicit stack. When the game
+    implements `undo_action`, a single copy of `state` is moved down and up the
+    tree; otherwise every child is cloned.
     Args:
       state: Current OpenSpiel game state.
       player: (int) Player index for this traversal.
     Returns:
-      Recursively returns expected payoffs for each action.
+      The payoff of `player` backed up to `state`.
     """
-    expected_payoff = collections.defaultdict(float)
-    if state.is_terminal():
-      # Terminal state get returns.
-      return state.returns()[player]
-    elif state.is_chance_node():
-      # If this is a chance node, sample an action
-      action = np.random.choice([i[0] for i in state.chance_outcomes()])
-      return self._traverse_game_tree(state.child(action), player)
-    elif state.current_player() == player:
-      sampled_regret = collections.defaultdict(float)
-      # Update the policy over the info set & actions via regret matching.
-      _, strategy = self._sample_action_from_advantage(state, player)
-      for action in state.legal_actions():
-        expected_payoff[action] = self._traverse_game_tree(
-            state.child(action), player)
-      for action in state.legal_actions():
-        sampled_regret[action] = expected_payoff[action]
-        for a_ in state.legal_actions():
-          sampled_regret[action] -= strategy[a_] * expected_payoff[a_]
-      sampled_regret_arr = [0] * self._num_actions
-      for action in sampled_regret:
-        sampled_regret_arr[action] = sampled_regret[action]
+    if self._undo_supported:
+      state = state.clone()
+    stack = []
+    value = None
+    while True:
+      if value is None:
+        # Entering `state`: either get its value or push it and descend.
+        self._num_nodes_visited += 1
+        if state.is_terminal():
+          # Terminal state get returns.
+          value = state.returns()[player]
+          continue
+        elif state.is_chance_node():
+          # If this is a chance node, sample an action
+          actions = [
+              np.random.choice(
+                  [outcome[0] for outcome in state.chance_outcomes()])
+          ]
+          strategy = None
+        elif state.current_player() == player:
+          # Update the policy over the info set & actions via regret matching.
+          _, strategy = self._sample_action_from_advantage(state, player)
+          actions = state.legal_actions()
+        else:
+          other_player = state.current_player()
+          _, strategy = self._sample_action_from_advantage(state, other_player)
+          # Recompute distribution dor numerical errors.
+          probs = np.array(strategy)
+          probs /= probs.sum()
+          actions = [np.random.choice(range(self._num_actions), p=probs)]
+          self._strategy_memories.add(
+              StrategyMemory(
+                  state.information_state_tensor(other_player),
+                  self._iteration, strategy))
+        frame = _TraversalFrame(state.current_player(), actions, strategy,
+                                None if self._undo_supported else state)
+        stack.append(frame)
+        state = self._descend(frame, state)
+        continue
+
+      # `value` is the payoff of the subtree just left: move back to its parent.
+      if not stack:
+        return value
+      frame = stack[-1]
+      if self._undo_supported:
+        state.undo_action(frame.actor, frame.actions[len(frame.payoffs)])
+      else:
+        state = frame.state
+      if frame.actor != player:
+        # Chance and opponent nodes have a single sampled child.
+        stack.pop()
+        continue
+      frame.payoffs.append(value)
+      if len(frame.payoffs) < len(frame.actions):
+        state = self._descend(frame, state)
+        value = None
+        continue
+      stack.pop()
       self._advantage_memories[player].add(
-          AdvantageMemory(state.information_state_tensor(), self._iteration,
-                          sampled_regret_arr, action))
-      return max(expected_payoff.values())
-    else:
-      other_player = state.current_player()
-      _, strategy = self._sample_action_from_advantage(state, other_player)
-      # Recompute distribution dor numerical errors.
-      probs = np.array(strategy)
-      probs /= probs.sum()
-      sampled_action = np.random.choice(range(self._num_actions), p=probs)
-      self._strategy_memories.add(
-          StrategyMemory(
-              state.information_state_tensor(other_player), self._iteration,
-              strategy))
-      return self._traverse_game_tree(state.child(sampled_action), player)
+          AdvantageMemory(
+              state.information_state_tensor(), self._iteration,
+              self._sampled_regret(state, frame.strategy, frame.actions,
+                                   frame.payoffs), frame.actions[-1]))
+      value = max(frame.payoffs)
+
+  def _sampled_regret(self, state, strategy, actions, payoffs):
+    """Returns the sampled regret of every action at a traverser node.
+
+    Args:
+      state: Traverser decision state.
+      strategy: Regret-matched policy at `state`, indexed by action.
+      actions: (list) Traversed actions.
+      payoffs: Payoff of the traverser after each of `actions`.
+    Returns:
+      An array indexed by action, 0 for illegal actions.
+    """
+    expected_payoff = np.zeros(self._num_actions)
+    expected_payoff[actions] = payoffs
+    legal = np.array(state.legal_actions_mask(), dtype=bool)
+    return np.where(legal, expected_payoff - np.dot(strategy, expected_payoff),
+                    0.)
+
+  def _descend(self, frame, state):
+    """Returns the child of `state` reached by the next action of `frame`."""
+    action = frame.actions[len(frame.payoffs)]
+    if self._undo_supported:
+      state.apply_action(action)
+      return state
+    return state.child(action)
+
+  def _traverse_game_trees(self, player, num_traversals):
+    """Performs `num_traversals` traversals of the game tree together.
+
+    The traversals are expanded breadth-first, so that the advantage networks
+    are evaluated once for all the decision nodes at a given depth. Sampling
+    and memory updates follow `_traverse_game_tree`, of which this is a batched
+    equivalent.
+
+    Args:
+      player: (int) Player index for these traversals.
+      num_traversals: (int) Number of traversals to perform.
+    """
+    # Forward pass: expand the frontier depth by depth. For each depth, keep the
+    # states and, per state, the `(action, child index)` pairs expanded.
+    levels = []
+    states = [self._root_node] * num_traversals
+    while states:
+      self._num_nodes_visited += len(states)
+      decision_nodes = [
+          i for i, state in enumerate(states)
+          if not state.is_terminal() and not state.is_chance_node()
+      ]
+      strategies = dict(
+          zip(decision_nodes,
+              self._sample_actions_from_advantages(
+                  [states[i] for i in decision_nodes])))
+      children = [[] for _ in states]
+      next_states = []
+      for i, state in enumerate(states):
+        if state.is_terminal():
+          continue
+        elif state.is_chance_node():
+          actions = [
+              np.random.choice(
+                  [outcome[0] for outcome in state.chance_outcomes()])
+          ]
+        elif state.current_player() == player:
+          actions = state.legal_actions()
+        else:
+          other_player = state.current_player()
+          # Recompute distribution dor numerical errors.
+          probs = np.array(strategies[i])
+          probs /= probs.sum()
+          actions = [np.random.choice(range(self._num_actions), p=probs)]
+          self._strategy_memories.add(
+              StrategyMemory(
+                  state.information_state_tensor(other_player),
+                  self._iteration, strategies[i]))
+        for action in actions:
+          children[i].append((action, len(next_states)))
+          next_states.append(state.child(action))
+      levels.append((states, children, strategies))
+      states = next_states
+
+    # Backward pass: propagate payoffs up and compute the sampled regrets.
+    values = None
+    for states, children, strategies in reversed(levels):
+      level_values = np.zeros(len(states))
+      for i, state in enumerate(states):
+        if state.is_terminal():
+          level_values[i] = state.returns()[player]
+        elif state.is_chance_node() or state.current_player() != player:
+          level_values[i] = values[children[i][0][1]]
+        else:
+          actions = [action for action, _ in children[i]]
+          payoffs = values[[j for _, j in children[i]]]
+          self._advantage_memories[player].add(
+              AdvantageMemory(
+                  state.information_state_tensor(), self._iteration,
+                  self._sampled_regret(state, strategies[i], actions,
+                                       payoffs), actions[-1]))
+          level_values[i] = np.max(payoffs)
+      values = level_values
+
+  def _sample_actions_from_advantages(self, states):
+    """Returns the regret-matched policy of each of `states`.
+
+    The advantage networks of all the players acting in `states` are evaluated
+    in a single `session.run` call.
+
+    Args:
+      states: (list) OpenSpiel decision states.
+    Returns:
+      A list with, for each state, the matched regrets of its current player
+      as returned by `_sample_action_from_advantage`.
+    """
+    strategies = [None] * len(states)
+    # Indices of the states missing from the caches, grouped by info state so
+    # that each distinct info state is evaluated once.
+    misses = collections.OrderedDict()
+    for i, state in enumerate(states):
+      player = state.current_player()
+      key = (player, state.information_state_string(player))
+      if key in misses:
+        misses[key].append(i)
+        continue
+      cached = self._strategy_caches[player].get(key[1])
+      if cached is None:
+        misses[key] = [i]
+      else:
+        strategies[i] = cached[1]
+    if not misses:
+      return strategies
+    players = sorted(set(player for player, _ in misses))
+    info_states = np.array([
+        states[indices[0]].information_state_tensor()
+        for indices in misses.values()
+    ])
+    legal_actions_masks = np.array([
+        states[indices[0]].legal_actions_mask() for indices in misses.values()
+    ])
+    matched = {
+        p: self._regret_matching(outputs, legal_actions_masks)
+        for p, outputs in zip(
+            players, self._evaluate_advantage_networks(players, info_states))
+    }
+    for row, ((player, key), indices) in enumerate(misses.items()):
+      advantages, matched_regrets = matched[player]
+      result = (advantages[row], matched_regrets[row])
+      self._strategy_caches[player].put(key, result)
+      for i in indices:
+        strategies[i] = result[1]
+    return strategies
 
   def _sample_action_from_advantage(self, state, player):
     """Returns an info state policy by applying regret-matching.
@@ -348,22 +1404,41 @@ class DeepCFRSolver(policy.Policy):
       state: Current OpenSpiel game state.
       player: (int) Player index over which to compute regrets.
     Returns:
-      1. (list) Advantage values for info state actions indexed by action.
-      2. (list) Matched regrets, prob for actions indexed by action.
+      1. (array) Positive advantages, indexed by action.
+      2. (array) Matched regrets, prob for actions indexed by action.
     """
+    key = state.information_state_string(player)
+    cached = self._strategy_caches[player].get(key)
+    if cached is not None:
+      return cached
     info_state = state.information_state_tensor(player)
-    legal_actions = state.legal_actions(player)
-    advantages = self._session.run(
-        self._advantage_outputs[player],
-        feed_dict={self._info_state_ph: np.expand_dims(info_state, axis=0)})[0]
-    advantages = [max(0., advantage) for advantage in advantages]
-    cumulative_regret = np.sum([advantages[action] for action in legal_actions])
-    matched_regrets = np.array([0.] * self._num_actions)
-    for action in legal_actions:
-      if cumulative_regret > 0.:
-        matched_regrets[action] = advantages[action] / cumulative_regret
-      else:
-        matched_regrets[action] = 1 / self._num_actions
+    advantages = self._evaluate_advantage_networks(
+        [player], np.expand_dims(info_state, axis=0))[0][0]
+    result = self._regret_matching(advantages,
+                                   state.legal_actions_mask(player))
+    self._strategy_caches[player].put(key, result)
+    return result
+
+  def _regret_matching(self, advantages, legal_actions_mask):
+    """Returns the positive advantages and the policy they match to.
+
+    Args:
+      advantages: Array of advantages, indexed by action along the last axis.
+        Leading axes, if any, index independent information states.
+      legal_actions_mask: Array of the same shape as `advantages`, 1 for legal
+        actions and 0 otherwise.
+    Returns:
+      1. (array) Positive part of `advantages`.
+      2. (array) Matched regrets, prob for actions indexed by action.
+    """
+    advantages = np.maximum(advantages, 0.)
+    legal = np.asarray(legal_actions_mask, dtype=bool)
+    legal_advantages = np.where(legal, advantages, 0.)
+    cumulative_regret = np.sum(legal_advantages, axis=-1, keepdims=True)
+    positive = cumulative_regret > 0.
+    matched_regrets = np.where(
+        positive, legal_advantages / np.where(positive, cumulative_regret, 1.),
+        legal / self._num_actions)
     return advantages, matched_regrets
 
   def action_probabilities(self, state):
@@ -373,10 +1448,49 @@ class DeepCFRSolver(policy.Policy):
     info_state_vector = np.array(state.information_state_tensor())
     if len(info_state_vector.shape) == 1:
       info_state_vector = np.expand_dims(info_state_vector, axis=0)
-    probs = self._session.run(
-        self._action_probs, feed_dict={self._info_state_ph: info_state_vector})
+    probs = self._evaluate_policy_network(info_state_vector)
     return {action: probs[0][action] for action in legal_actions}
 
+  def _training_batches(self, memory, batch_size, num_steps):
+    """Returns the batches of `memory` to train on for `num_steps` steps.
+
+    Args:
+      memory: `ColumnarReservoirBuffer` to train on.
+      batch_size: (int or None) Size of the sampled batches. If `None`, every
+        step is an epoch over the whole memory, in shuffled chunks of
+        `epoch_chunk_size` samples.
+      num_steps: (int) Number of training steps.
+    Returns:
+      An iterable over `num_steps` iterables of batches, one network update
+      per batch, or `None` if `memory` holds fewer than `batch_size` elements.
+    """
+    if not batch_size:
+      return (memory.shuffled_batches(self._epoch_chunk_size)
+              for _ in range(num_steps))
+    if batch_size > len(memory):
+      return None
+    if self._prefetch_batches > 0:
+      batches = _BatchPrefetcher(memory, batch_size, num_steps,
+                                 self._prefetch_batches)
+    else:
+      batches = (memory.sample(batch_size) for _ in range(num_steps))
+    return ([batch] for batch in batches)
+
+  def tabular_policy(self):
+    """Returns the policy network as a `policy.TabularPolicy`.
+
+    This is equivalent to `policy.tabular_policy_from_callable(game,
+    self.action_probabilities)`, but the info states of the game are read from
+    the game index and evaluated in a single forward pass.
+    """
+    if self._tabular_policy_template is None:
+      self._tabular_policy_template = self.game_index.tabular_policy()
+    tabular_policy = copy.copy(self._tabular_policy_template)
+    tabular_policy.action_probability_array = (
+        self._evaluate_policy_network(self.game_index.info_state_tensors) *
+        tabular_policy.legal_actions_mask)
+    return tabular_policy
+
   def _learn_advantage_network(self, player):
     """Compute the loss on sampled transitions and perform a Q-network update.
 
@@ -388,33 +1502,33 @@ class DeepCFRSolver(policy.Policy):
     Returns:
       The average loss over the advantage network.
     """
-    for _ in range(self._advantage_network_train_steps):
-      if self._batch_size_advantage:
-        if self._batch_size_advantage > len(self._advantage_memories[player]):
-          ## Skip if there aren't enough samples
-          return None
-        samples = self._advantage_memories[player].sample(
-            self._batch_size_advantage)
-      else:
-        samples = self._advantage_memories[player]
-      info_states = []
-      advantages = []
-      iterations = []
-      for s in samples:
-        info_states.append(s.info_state)
-        advantages.append(s.advantage)
-        iterations.append([s.iteration])
+    self._advantage_network_changed(player)
+    batches = self._training_batches(self._advantage_memories[player],
+                                     self._batch_size_advantage,
+                                     self._advantage_network_train_steps)
+    if batches is None:
+      ## Skip if there aren't enough samples
+      return None
+    for step_batches in batches:
+      total_loss = 0.
+      num_samples = 0
+      for samples in step_batches:
+        loss, _ = self._run_session(
+            [
+                self._loss_advantages[player],
+                self._learn_step_advantages[player]
+            ],
+            feed_dict={
+                self._info_state_ph: samples.info_state,
+                self._advantage_ph[player]: samples.advantage,
+                self._iter_ph: samples.iteration[:, np.newaxis],
+            })
+        total_loss += loss * len(samples.info_state)
+        num_samples += len(samples.info_state)
       # Ensure some samples have been gathered.
-      if not info_states:
+      if not num_samples:
         return None
-
-      loss_advantages, _ = self._session.run(
-          [self._loss_advantages[player], self._learn_step_advantages[player]],
-          feed_dict={
-              self._info_state_ph: np.array(info_states),
-              self._advantage_ph[player]: np.array(advantages),
-              self._iter_ph: np.array(iterations),
-          })
+      loss_advantages = total_loss / num_samples
     return loss_advantages
 
   def _learn_strategy_network(self):
@@ -423,27 +1537,27 @@ class DeepCFRSolver(policy.Policy):
     Returns:
       The average loss obtained on this batch of transitions or `None`.
     """
-    for _ in range(self._policy_network_train_steps):
-      if self._batch_size_strategy:
-        if self._batch_size_strategy > len(self._strategy_memories):
-          ## Skip if there aren't enough samples
-          return None
-        samples = self._strategy_memories.sample(self._batch_size_strategy)
-      else:
-        samples = self._strategy_memories
-      info_states = []
-      action_probs = []
-      iterations = []
-      for s in samples:
-        info_states.append(s.info_state)
-        action_probs.append(s.strategy_action_probs)
-        iterations.append([s.iteration])
-
-      loss_strategy, _ = self._session.run(
-          [self._loss_policy, self._learn_step_policy],
-          feed_dict={
-              self._info_state_ph: np.array(info_states),
-              self._action_probs_ph: np.array(np.squeeze(action_probs)),
-              self._iter_ph: np.array(iterations),
-          })
+    self._policy_weights = None
+    batches = self._training_batches(self._strategy_memories,
+                                     self._batch_size_strategy,
+                                     self._policy_network_train_steps)
+    if batches is None:
+      ## Skip if there aren't enough samples
+      return None
+    for step_batches in batches:
+      total_loss = 0.
+      num_samples = 0
+      for samples in step_batches:
+        loss, _ = self._run_session(
+            [self._loss_policy, self._learn_step_policy],
+            feed_dict={
+                self._info_state_ph: samples.info_state,
+                self._action_probs_ph: samples.strategy_action_probs,
+                self._iter_ph: samples.iteration[:, np.newaxis],
+            })
+        total_loss += loss * len(samples.info_state)
+        num_samples += len(samples.info_state)
+      if not num_samples:
+        return None
+      loss_strategy = total_loss / num_samples
     return loss_strategy
@@ -0,0 +1,498 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_deep_cfr."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+from absl.testing import absltest
+import numpy as np
+import tensorflow.compat.v1 as tf
+
+from open_spiel.python import policy
+from open_spiel.python.algorithms import felix_deep_cfr as deep_cfr
+import pyspiel
+
+# Temporarily disable TF2 behavior until we update the code.
+tf.disable_v2_behavior()
+
+_Element = collections.namedtuple("_Element", "value")
+
+# Critical values of the chi-squared distribution with 49 and 11 degrees of
+# freedom at p = 0.001.
+_CHI2_49_CRITICAL_VALUE = 85.35
+_CHI2_11_CRITICAL_VALUE = 31.26
+
+
+def _column_buffer(capacity, directory=None):
+  return deep_cfr.ColumnarReservoirBuffer(capacity, _Element,
+                                          {"value": ((), np.int64)}, directory)
+
+
+def _info_state_visits(solver, player):
+  """Counts the stored samples of each information state."""
+  info_states = np.concatenate([
+      solver.advantage_buffers[player].as_batch().info_state,
+      solver.strategy_buffer.as_batch().info_state
+  ])
+  return collections.Counter(map(tuple, info_states))
+
+
+def _reference_regret_matching(advantages, legal_actions, num_actions):
+  """Regret matching of a single information state, action by action."""
+  advantages = [max(0., advantage) for advantage in advantages]
+  cumulative_regret = np.sum([advantages[action] for action in legal_actions])
+  matched_regrets = np.zeros(num_actions)
+  for action in legal_actions:
+    if cumulative_regret > 0.:
+      matched_regrets[action] = advantages[action] / cumulative_regret
+    else:
+      matched_regrets[action] = 1 / num_actions
+  return advantages, matched_regrets
+
+
+class ColumnarReservoirBufferTest(absltest.TestCase):
+
+  def test_add_batch_fills_then_keeps_capacity(self):
+    buffer = _column_buffer(10)
+    buffer.add_batch(_Element(np.arange(4)))
+    self.assertLen(buffer, 4)
+    buffer.add_batch(_Element(np.arange(4, 100)))
+    self.assertLen(buffer, 10)
+    values = buffer.as_batch().value
+    self.assertLen(set(values), 10)
+    self.assertTrue(np.all((values >= 0) & (values < 100)))
+
+  def test_sample_returns_batched_columns(self):
+    buffer = _column_buffer(10)
+    for i in range(10):
+      buffer.add(_Element(i))
+    batch = buffer.sample(4)
+    self.assertEqual(batch.value.shape, (4,))
+    self.assertLen(set(batch.value), 4)
+    with self.assertRaises(ValueError):
+      buffer.sample(11)
+
+  def test_inclusion_is_uniform(self):
+    np.random.seed(0)
+    capacity, stream_length, num_trials = 10, 50, 20000
+    counts = np.zeros(stream_length)
+    for _ in range(num_trials):
+      buffer = _column_buffer(capacity)
+      # Mix single and bulk insertions, crossing the capacity boundary.
+      buffer.add_batch(_Element(np.arange(7)))
+      for i in range(7, 13):
+        buffer.add(_Element(i))
+      buffer.add_batch(_Element(np.arange(13, stream_length)))
+      counts[buffer.as_batch().value] += 1
+    expected = num_trials * capacity / stream_length
+    chi2 = np.sum((counts - expected)**2 / expected)
+    self.assertLess(chi2, _CHI2_49_CRITICAL_VALUE)
+
+  def test_flushed_directory_resumes(self):
+    directory = self.create_tempdir().full_path
+    np.random.seed(0)
+    buffer = _column_buffer(100, directory)
+    buffer.add_batch(_Element(np.arange(120)))
+    buffer.flush()
+    del buffer
+    buffer = _column_buffer(100, directory)
+    self.assertEqual(buffer.add_calls, 120)
+    buffer.add_batch(_Element(np.arange(120, 300)))
+    np.random.seed(0)
+    in_memory = _column_buffer(100)
+    in_memory.add_batch(_Element(np.arange(120)))
+    in_memory.add_batch(_Element(np.arange(120, 300)))
+    self.assertEqual(buffer.add_calls, in_memory.add_calls)
+    np.testing.assert_array_equal(buffer.as_batch().value,
+                                  in_memory.as_batch().value)
+
+  def test_unflushed_directory_is_not_resumed(self):
+    directory = self.create_tempdir().full_path
+    buffer = _column_buffer(100, directory)
+    buffer.add_batch(_Element(np.arange(120)))
+    buffer.flush()
+    buffer.add_batch(_Element(np.arange(120, 300)))
+    del buffer
+    with self.assertRaisesRegex(ValueError, "after its last flush"):
+      _column_buffer(100, directory)
+
+
+class StrategyCacheTest(absltest.TestCase):
+
+  def test_least_recently_used_is_evicted(self):
+    cache = deep_cfr.StrategyCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    self.assertEqual(cache.get("a"), 1)
+    cache.put("c", 3)
+    self.assertLen(cache, 2)
+    self.assertIsNone(cache.get("b"))
+    self.assertEqual(cache.get("a"), 1)
+    self.assertEqual(cache.get("c"), 3)
+
+  def test_hit_rate_counts_lookups(self):
+    cache = deep_cfr.StrategyCache(10)
+    self.assertEqual(cache.hit_rate, 0.)
+    cache.get("a")
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    self.assertEqual((cache.hits, cache.misses), (2, 2))
+    self.assertEqual(cache.hit_rate, 0.5)
+    cache.clear()
+    self.assertEmpty(cache)
+    self.assertIsNone(cache.get("a"))
+    self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+  def test_zero_capacity_disables_caching(self):
+    cache = deep_cfr.StrategyCache(0)
+    cache.put("a", 1)
+    self.assertEmpty(cache)
+    self.assertIsNone(cache.get("a"))
+
+
+class _CountingBuffer(object):
+  """Buffer whose samples number the calls to `sample`."""
+
+  def __init__(self, fail_after=None):
+    self.num_samples = 0
+    self._fail_after = fail_after
+
+  def sample(self, batch_size):
+    if self.num_samples == self._fail_after:
+      raise ValueError("Sampling failed")
+    self.num_samples += 1
+    return [self.num_samples - 1] * batch_size
+
+
+class BatchPrefetcherTest(absltest.TestCase):
+
+  def test_batches_are_yielded_in_order(self):
+    buffer = _CountingBuffer()
+    batches = list(deep_cfr._BatchPrefetcher(buffer, 2, 10, 3))
+    self.assertEqual(batches, [[i, i] for i in range(10)])
+    self.assertEqual(buffer.num_samples, 10)
+
+  def test_sampling_errors_are_raised(self):
+    batches = []
+    with self.assertRaisesRegex(ValueError, "Sampling failed"):
+      for batch in deep_cfr._BatchPrefetcher(
+          _CountingBuffer(fail_after=3), 1, 10, 2):
+        batches.append(batch)
+    self.assertEqual(batches, [[0], [1], [2]])
+
+  def test_sampling_stops_when_consumer_stops(self):
+    buffer = _CountingBuffer()
+    prefetcher = deep_cfr._BatchPrefetcher(buffer, 1, 1000, 2)
+    batches = iter(prefetcher)
+    for _ in range(3):
+      next(batches)
+    batches.close()
+    prefetcher._thread.join(timeout=10)
+    self.assertFalse(prefetcher._thread.is_alive())
+    # The 3 consumed batches, at most 2 queued and 1 being put.
+    self.assertLessEqual(buffer.num_samples, 6)
+
+
+class DeepCFRTest(absltest.TestCase):
+
+  def test_numpy_inference_matches_tensorflow(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8, 4),
+          advantage_network_layers=(8,),
+          num_iterations=2,
+          num_traversals=4,
+          learning_rate=1e-3,
+          memory_capacity=1000)
+      sess.run(tf.global_variables_initializer())
+      solver.solve()
+      states = policy.TabularPolicy(game).states
+      info_states = np.array(
+          [state.information_state_tensor() for state in states])
+      feed_dict = {solver._info_state_ph: info_states}
+      for player in range(game.num_players()):
+        np.testing.assert_allclose(
+            solver._evaluate_advantage_networks([player], info_states)[0],
+            sess.run(solver._advantage_outputs[player], feed_dict=feed_dict),
+            rtol=1e-5,
+            atol=1e-6)
+      tf_probs = sess.run(solver._action_probs, feed_dict=feed_dict)
+      for state, probs in zip(states, tf_probs):
+        for action, prob in solver.action_probabilities(state).items():
+          self.assertAlmostEqual(prob, probs[action], places=5)
+
+  def test_tabular_policy_matches_callable_policy(self):
+    game = pyspiel.load_game("leduc_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=1000)
+      sess.run(tf.global_variables_initializer())
+      np.testing.assert_allclose(
+          solver.tabular_policy().action_probability_array,
+          policy.tabular_policy_from_callable(
+              game, solver.action_probabilities).action_probability_array,
+          rtol=1e-6)
+
+  def test_restore_resumes_from_checkpoint(self):
+    game = pyspiel.load_game("kuhn_poker")
+    checkpoint_dir = self.create_tempdir().full_path
+
+    def _solver(sess, num_iterations):
+      return deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          num_iterations=num_iterations,
+          num_traversals=4,
+          memory_capacity=1000,
+          eval_schedule="linear:1")
+
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _solver(sess, num_iterations=2)
+      sess.run(tf.global_variables_initializer())
+      solver.solve()
+      solver.save(checkpoint_dir)
+      probs = solver.tabular_policy().action_probability_array
+      buffer_sizes = [len(buffer) for buffer in solver.advantage_buffers]
+    self.assertTrue(deep_cfr.checkpoint_exists(checkpoint_dir))
+
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = _solver(sess, num_iterations=3)
+      sess.run(tf.global_variables_initializer())
+      solver.restore(checkpoint_dir)
+      np.testing.assert_allclose(
+          solver.tabular_policy().action_probability_array, probs)
+      self.assertEqual([len(buffer) for buffer in solver.advantage_buffers],
+                       buffer_sizes)
+      self.assertEqual(solver.evaluation_iterations, [1, 2])
+      solver.solve()
+      self.assertEqual(solver.evaluation_iterations, [1, 2, 3])
+
+  def test_batched_traversals_sample_like_recursive_traversals(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=100000,
+          batch_traversals=False)
+      sess.run(tf.global_variables_initializer())
+      np.random.seed(0)
+      solver._run_traversals(0, 2000)
+      recursive = _info_state_visits(solver, 0)
+      solver.clear_advantage_buffers()
+      solver.strategy_buffer.clear()
+      solver._batch_traversals = True
+      solver._run_traversals(0, 2000)
+      batched = _info_state_visits(solver, 0)
+    # Chi-squared test of homogeneity of the two visit distributions over the
+    # at most 12 information states of Kuhn poker; the untrained networks may
+    # never sample some actions. The critical value for 11 degrees of freedom
+    # bounds those for fewer.
+    keys = sorted(set(recursive) | set(batched))
+    self.assertBetween(len(keys), 2, 12)
+    counts = np.array([[recursive[key] for key in keys],
+                       [batched[key] for key in keys]])
+    expected = np.outer(counts.sum(axis=1), counts.sum(axis=0)) / counts.sum()
+    chi2 = np.sum((counts - expected)**2 / expected)
+    self.assertLess(chi2, _CHI2_11_CRITICAL_VALUE)
+
+  def test_undo_and_clone_traversals_store_same_samples(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=1000,
+          batch_traversals=False)
+      sess.run(tf.global_variables_initializer())
+      self.assertTrue(solver._undo_supported)
+      samples = []
+      for undo_supported in (True, False):
+        solver._undo_supported = undo_supported
+        solver._num_nodes_visited = 0
+        solver.clear_advantage_buffers()
+        solver.strategy_buffer.clear()
+        np.random.seed(0)
+        solver._run_traversals(0, 50)
+        samples.append((solver._num_nodes_visited,
+                        solver.advantage_buffers[0].as_batch(),
+                        solver.strategy_buffer.as_batch()))
+    (undo_nodes, undo_advantages, undo_strategies), (
+        clone_nodes, clone_advantages, clone_strategies) = samples
+    self.assertEqual(undo_nodes, clone_nodes)
+    for undo_column, clone_column in zip(undo_advantages + undo_strategies,
+                                         clone_advantages + clone_strategies):
+      np.testing.assert_array_equal(undo_column, clone_column)
+
+  def test_parallel_traversals_merge_reproducible_samples(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          num_traversals=10,
+          memory_capacity=1000,
+          num_traversal_workers=2)
+      sess.run(tf.global_variables_initializer())
+
+      def samples():
+        return (solver.advantage_buffers[0].as_batch() +
+                solver.strategy_buffer.as_batch())
+
+      def clear():
+        solver.clear_advantage_buffers()
+        solver.strategy_buffer.clear()
+
+      runs = []
+      for _ in range(2):
+        clear()
+        np.random.seed(0)
+        with solver._traversal_workers() as pool:
+          solver._run_parallel_traversals(pool, 0)
+        runs.append(samples())
+      # The workers' shares of the traversals, run in this process from the
+      # same seeds and merged in worker order.
+      clear()
+      np.random.seed(0)
+      for seed in np.random.randint(np.iinfo(np.int32).max, size=2):
+        np.random.seed(seed)
+        solver._run_traversals(0, 5)
+      runs.append(samples())
+    self.assertGreater(len(runs[0][0]), 0)
+    for run in runs[1:]:
+      for column, expected_column in zip(run, runs[0]):
+        np.testing.assert_array_equal(column, expected_column)
+
+  def test_epochs_visit_every_sample_once_in_chunks(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=1000,
+          epoch_chunk_size=10)
+      memory = _column_buffer(100)
+      memory.add_batch(_Element(np.arange(25)))
+      epochs = [list(epoch) for epoch in solver._training_batches(
+          memory, None, 3)]
+    self.assertLen(epochs, 3)
+    for epoch in epochs:
+      self.assertEqual([len(batch.value) for batch in epoch], [10, 10, 5])
+      self.assertCountEqual(
+          np.concatenate([batch.value for batch in epoch]), range(25))
+
+  def test_strategy_caches_are_cleared_when_networks_change(self):
+    game = pyspiel.load_game("kuhn_poker")
+    checkpoint_dir = self.create_tempdir().full_path
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=1000,
+          batch_size_advantage=4,
+          advantage_network_train_steps=2)
+      sess.run(tf.global_variables_initializer())
+      solver.save(checkpoint_dir)
+      solver._run_traversals(0, 10)
+      self.assertNotEmpty(solver.strategy_caches[0])
+      self.assertNotEmpty(solver.strategy_caches[1])
+      solver._learn_advantage_network(0)
+      self.assertEmpty(solver.strategy_caches[0])
+      self.assertNotEmpty(solver.strategy_caches[1])
+      solver._run_traversals(0, 10)
+      solver.restore(checkpoint_dir)
+      self.assertEmpty(solver.strategy_caches[0])
+      self.assertEmpty(solver.strategy_caches[1])
+
+  def test_regret_matching_matches_reference(self):
+    game = pyspiel.load_game("leduc_poker")
+    with tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          memory_capacity=1000)
+    num_actions = game.num_distinct_actions()
+    rng = np.random.RandomState(0)
+    advantages = np.concatenate([
+        rng.randn(20, num_actions),
+        # All negative.
+        -rng.rand(2, num_actions),
+        # Only the illegal action is positive.
+        [[1., -1., -2.], [0., 0., 3.]],
+    ])
+    legal_actions_mask = np.concatenate([
+        rng.randint(2, size=(20, num_actions)) | np.eye(num_actions)[
+            rng.randint(num_actions, size=20)].astype(int),
+        np.ones((2, num_actions), dtype=int),
+        [[0, 1, 1], [1, 1, 0]],
+    ])
+    positive, matched = solver._regret_matching(advantages, legal_actions_mask)
+    for row in range(len(advantages)):
+      expected_positive, expected_matched = _reference_regret_matching(
+          advantages[row], np.flatnonzero(legal_actions_mask[row]),
+          num_actions)
+      np.testing.assert_allclose(positive[row], expected_positive)
+      np.testing.assert_allclose(matched[row], expected_matched)
+      single_positive, single_matched = solver._regret_matching(
+          advantages[row], legal_actions_mask[row])
+      np.testing.assert_allclose(single_positive, expected_positive)
+      np.testing.assert_allclose(single_matched, expected_matched)
+
+  def test_last_iteration_is_evaluated(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with tf.Graph().as_default(), tf.Session() as sess:
+      solver = deep_cfr.DeepCFRSolver(
+          sess,
+          game,
+          policy_network_layers=(8,),
+          advantage_network_layers=(8,),
+          num_iterations=3,
+          num_traversals=4,
+          memory_capacity=1000,
+          eval_schedule="linear:10")
+      sess.run(tf.global_variables_initializer())
+      solver.solve()
+      self.assertEqual(solver.evaluation_iterations, [3])
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,366 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Evaluation schedules and evaluators of policy snapshots.
+
+A schedule decides at which iterations a training loop evaluates its policy:
+every `n` iterations (`"linear:n"`), at log-spaced iterations growing by a
+factor (`"log:factor"`), at most once every `s` seconds (`"time:s"`), or as
+often as evaluations fit in a fraction `f` of the wall time
+(`"budget:f"`), measured by the evaluator the schedule is attached to.
+
+An evaluator computes the exploitability and NashConv of policy snapshots
+with `felix_exploitability.evaluate`. `AsyncEvaluator` does so in a separate
+process, so training continues while earlier snapshots are evaluated, and
+`Evaluator` does so inline. Both return `(iteration, PolicyEvaluation)` pairs
+in submission order, and count the snapshots evaluated and the time spent
+evaluating them.
+
+A snapshot is one of:
+  * an array of action probabilities indexed by the rows of the game index,
+  * a policy accepted by `felix_exploitability.evaluate`,
+  * a solver exposing `average_policy()`, such as a pyspiel MCCFR solver.
+Snapshots sent to `AsyncEvaluator` must be picklable; the average policy of a
+solver is then built in the evaluation process.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import math
+import multiprocessing
+import pickle
+import queue
+import time
+
+from open_spiel.python.algorithms import felix_exploitability
+from open_spiel.python.algorithms import felix_game_index
+
+# Sent to the evaluation process to make it exit.
+_STOP = None
+# Period in seconds at which waiting for a result checks that the evaluation
+# process is still alive.
+_LIVENESS_CHECK_SECONDS = 1.
+
+
+class LinearSchedule(object):
+  """Evaluates every `every` iterations."""
+
+  def __init__(self, every):
+    if every < 1:
+      raise ValueError("Evaluation period must be positive, not {}".format(
+          every))
+    self._every = every
+
+  def should_evaluate(self, iteration):
+    return iteration % self._every == 0
+
+
+class LogSchedule(object):
+  """Evaluates at iterations growing geometrically by `factor`.
+
+  Iterations 0 and 1 are always evaluated, then each evaluated iteration is at
+  least `factor` times the previous one, so that evaluations are evenly spaced
+  on a log-scaled convergence plot.
+  """
+
+  def __init__(self, factor):
+    if factor <= 1:
+      raise ValueError("Log schedule factor must exceed 1, not {}".format(
+          factor))
+    self._factor = factor
+    self._next_iteration = 0
+
+  def should_evaluate(self, iteration):
+    if iteration < self._next_iteration:
+      return False
+    self._next_iteration = max(iteration + 1,
+                               int(math.ceil(iteration * self._factor)))
+    return True
+
+
+class TimeSchedule(object):
+  """Evaluates at most once every `seconds` of wall-clock time."""
+
+  def __init__(self, seconds):
+    self._seconds = seconds
+    self._last_time = None
+
+  def should_evaluate(self, iteration):
+    del iteration  # Unused.
+    now = time.time()
+    if self._last_time is not None and now - self._last_time < self._seconds:
+      return False
+    self._last_time = now
+    return True
+
+
+class BudgetSchedule(object):
+  """Evaluates as often as evaluations fit in `fraction` of the wall time.
+
+  An iteration is evaluated if the time spent evaluating, counting the
+  evaluations still pending at the mean duration of the finished ones, plus
+  one more evaluation, stays within `fraction` of the wall time since the
+  first evaluation. Then with an `AsyncEvaluator` evaluations take at most
+  `fraction` of a core, and never pile up. The first iteration is always
+  evaluated, and the next ones only once it has been.
+  """
+
+  def __init__(self, fraction, evaluator=None):
+    """Initializes the schedule.
+
+    Args:
+      fraction: (float) Fraction of the wall time in (0, 1].
+      evaluator: (Evaluator or None) Evaluator of the snapshots, which can
+        instead be attached later.
+    """
+    if not 0 < fraction <= 1:
+      raise ValueError("Evaluation budget must be in (0, 1], not {}".format(
+          fraction))
+    self._fraction = fraction
+    self._evaluator = evaluator
+    self._start = None
+
+  def attach(self, evaluator):
+    """Measures the evaluations of `evaluator`."""
+    self._evaluator = evaluator
+
+  def should_evaluate(self, iteration):
+    del iteration  # Unused.
+    if self._evaluator is None:
+      raise ValueError("A budget schedule must be attached to an evaluator")
+    now = time.perf_counter()
+    if self._start is None:
+      self._start = now
+      return True
+    num_evaluated = self._evaluator.num_evaluated
+    if not num_evaluated:
+      return False
+    seconds = self._evaluator.evaluation_seconds
+    num_remaining = self._evaluator.num_submitted - num_evaluated + 1
+    return (seconds * (1 + num_remaining / num_evaluated) <=
+            self._fraction * (now - self._start))
+
+
+_SCHEDULES = {
+    "linear": lambda value: LinearSchedule(int(value)),
+    "log": lambda value: LogSchedule(float(value)),
+    "time": lambda value: TimeSchedule(float(value)),
+    "budget": lambda value: BudgetSchedule(float(value)),
+}
+
+
+def make_schedule(spec, evaluator=None):
+  """Returns the schedule described by `spec`.
+
+  Args:
+    spec: (str) `"linear:<every>"`, `"log:<factor>"`, `"time:<seconds>"` or
+      `"budget:<fraction>"`.
+    evaluator: (Evaluator or None) Evaluator of the snapshots, which budget
+      schedules measure. Otherwise they must be attached to it later.
+
+  Raises:
+    ValueError: If `spec` does not describe a schedule.
+  """
+  kind, _, value = spec.partition(":")
+  if kind not in _SCHEDULES or not value:
+    raise ValueError("Unknown evaluation schedule '{}', expected one of "
+                     "linear:<every>, log:<factor>, time:<seconds> or "
+                     "budget:<fraction>".format(spec))
+  schedule = _SCHEDULES[kind](value)
+  if evaluator is not None and hasattr(schedule, "attach"):
+    schedule.attach(evaluator)
+  return schedule
+
+
+def _evaluate_snapshot(game, game_index, snapshot):
+  policy = snapshot
+  if hasattr(snapshot, "average_policy"):
+    # The average policy of a pyspiel solver reads the tables of the solver,
+    # which must outlive it: `snapshot` keeps a reference until evaluated.
+    policy = snapshot.average_policy()
+  return felix_exploitability.evaluate(game, policy, game_index=game_index)
+
+
+def _evaluation_worker(game, game_index, requests, results, seconds,
+                       num_evaluated):
+  """Evaluates `(iteration, snapshot)` requests until `_STOP` is received.
+
+  The evaluation time and count are added to the shared `seconds` and
+  `num_evaluated` values as soon as each evaluation ends.
+  """
+  while True:
+    request = requests.get()
+    if request is _STOP:
+      return
+    iteration, pickled_snapshot = request
+    try:
+      start = time.perf_counter()
+      evaluation = _evaluate_snapshot(game, game_index,
+                                      pickle.loads(pickled_snapshot))
+      seconds.value += time.perf_counter() - start
+      num_evaluated.value += 1
+      results.put((iteration, evaluation))
+    except Exception as e:  # pylint: disable=broad-except
+      results.put((iteration, e))
+      return
+
+
+class Evaluator(object):
+  """Evaluates policy snapshots inline, as soon as they are submitted."""
+
+  def __init__(self, game, game_index=None):
+    self._game = game
+    self._game_index = game_index or felix_game_index.get_game_index(game)
+    self._results = []
+    self._num_submitted = 0
+    self._num_evaluated = 0
+    self._evaluation_seconds = 0.
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    self.close()
+
+  @property
+  def num_submitted(self):
+    """(int) Number of snapshots submitted."""
+    return self._num_submitted
+
+  @property
+  def num_evaluated(self):
+    """(int) Number of snapshots evaluated, returned or not."""
+    return self._num_evaluated
+
+  @property
+  def evaluation_seconds(self):
+    """(float) Time spent evaluating the `num_evaluated` snapshots."""
+    return self._evaluation_seconds
+
+  def submit(self, iteration, snapshot):
+    start = time.perf_counter()
+    self._results.append(
+        (iteration, _evaluate_snapshot(self._game, self._game_index,
+                                       snapshot)))
+    self._num_submitted += 1
+    self._num_evaluated += 1
+    self._evaluation_seconds += time.perf_counter() - start
+
+  def poll(self):
+    """Returns the `(iteration, PolicyEvaluation)` pairs not yet returned."""
+    results, self._results = self._results, []
+    return results
+
+  def join(self):
+    """Returns the pairs of all the remaining submitted snapshots."""
+    return self.poll()
+
+  def close(self):
+    pass
+
+
+class AsyncEvaluator(Evaluator):
+  """Evaluates policy snapshots in a separate process.
+
+  The game index is built before the evaluation process is forked, so that it
+  is shared with the training loop instead of being built twice.
+  """
+
+  def __init__(self, game, game_index=None):
+    super(AsyncEvaluator, self).__init__(game, game_index)
+    context = multiprocessing.get_context("fork")
+    self._requests = context.Queue()
+    self._results_queue = context.Queue()
+    self._num_pending = 0
+    # Written by the evaluation process only.
+    self._shared_seconds = context.RawValue("d", 0.)
+    self._shared_num_evaluated = context.RawValue("q", 0)
+    self._process = context.Process(
+        target=_evaluation_worker,
+        args=(self._game, self._game_index, self._requests,
+              self._results_queue, self._shared_seconds,
+              self._shared_num_evaluated),
+        daemon=True)
+    self._process.start()
+
+  def submit(self, iteration, snapshot):
+    # Queues pickle their items in a background thread, so the snapshot is
+    # pickled here, before training modifies it.
+    self._requests.put(
+        (iteration, pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)))
+    self._num_pending += 1
+    self._num_submitted += 1
+
+  @property
+  def num_evaluated(self):
+    return self._shared_num_evaluated.value
+
+  @property
+  def evaluation_seconds(self):
+    return self._shared_seconds.value
+
+  def _get(self, block):
+    while True:
+      try:
+        iteration, evaluation = self._results_queue.get(
+            block=block, timeout=_LIVENESS_CHECK_SECONDS)
+        break
+      except queue.Empty:
+        if not block:
+          raise
+        if not self._process.is_alive():
+          # A result put just before the process died may still be in flight.
+          try:
+            iteration, evaluation = self._results_queue.get(
+                timeout=_LIVENESS_CHECK_SECONDS)
+            break
+          except queue.Empty:
+            raise RuntimeError(
+                "The evaluation process died with exit code {} and {} "
+                "snapshots pending".format(self._process.exitcode,
+                                           self._num_pending))
+    self._num_pending -= 1
+    if isinstance(evaluation, Exception):
+      raise evaluation
+    return iteration, evaluation
+
+  def poll(self):
+    results = []
+    while self._num_pending:
+      try:
+        results.append(self._get(block=False))
+      except queue.Empty:
+        break
+    return results
+
+  def join(self):
+    return [self._get(block=True) for _ in range(self._num_pending)]
+
+  def close(self):
+    """Stops the evaluation process, dropping pending evaluations."""
+    if self._process.is_alive():
+      self._requests.put(_STOP)
+      self._process.join(timeout=1)
+      if self._process.is_alive():
+        self._process.terminate()
+        self._process.join()
+
+
+def make_evaluator(game, game_index=None, asynchronous=True):
+  """Returns an `AsyncEvaluator` or, if not `asynchronous`, an `Evaluator`."""
+  if asynchronous:
+    return AsyncEvaluator(game, game_index)
+  return Evaluator(game, game_index)
@@ -0,0 +1,112 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_evaluation."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+from absl.testing import absltest
+import numpy as np
+
+from open_spiel.python import policy
+from open_spiel.python.algorithms import exploitability
+from open_spiel.python.algorithms import felix_evaluation
+from open_spiel.python.algorithms import felix_game_index
+import pyspiel
+
+
+class ScheduleTest(absltest.TestCase):
+
+  def test_linear_schedule(self):
+    schedule = felix_evaluation.make_schedule("linear:10")
+    self.assertEqual([i for i in range(35) if schedule.should_evaluate(i)],
+                     [0, 10, 20, 30])
+
+  def test_log_schedule(self):
+    schedule = felix_evaluation.make_schedule("log:2")
+    self.assertEqual([i for i in range(100) if schedule.should_evaluate(i)],
+                     [0, 1, 2, 4, 8, 16, 32, 64])
+
+  def test_budget_schedule(self):
+    game = pyspiel.load_game("leduc_poker")
+    mask = felix_game_index.get_game_index(game).legal_actions_mask
+    uniform_policy = mask / mask.sum(axis=1, keepdims=True)
+    with felix_evaluation.Evaluator(game) as evaluator:
+      schedule = felix_evaluation.make_schedule("budget:0.2", evaluator)
+      start = time.perf_counter()
+      for iteration in range(100):
+        time.sleep(0.005)
+        if schedule.should_evaluate(iteration):
+          evaluator.submit(iteration, uniform_policy)
+      elapsed = time.perf_counter() - start
+    self.assertGreater(evaluator.num_evaluated, 1)
+    self.assertLess(evaluator.num_evaluated, 100)
+    self.assertLessEqual(evaluator.evaluation_seconds, 0.25 * elapsed)
+    with self.assertRaises(ValueError):
+      felix_evaluation.make_schedule("budget:0.2").should_evaluate(0)
+
+  def test_unknown_schedule(self):
+    with self.assertRaises(ValueError):
+      felix_evaluation.make_schedule("every:10")
+
+
+class EvaluatorTest(absltest.TestCase):
+
+  def test_async_evaluator_matches_inline_evaluator(self):
+    game = pyspiel.load_game("kuhn_poker")
+    solver = pyspiel.ExternalSamplingMCCFRSolver(game, seed=0)
+    with felix_evaluation.Evaluator(game) as evaluator, \
+        felix_evaluation.AsyncEvaluator(game) as async_evaluator:
+      for iteration in range(3):
+        for _ in range(10):
+          solver.run_iteration()
+        evaluator.submit(iteration, solver)
+        async_evaluator.submit(iteration, solver)
+      expected = evaluator.join()
+      actual = async_evaluator.join()
+    self.assertEqual([iteration for iteration, _ in actual], [0, 1, 2])
+    for (_, actual_evaluation), (_, expected_evaluation) in zip(
+        actual, expected):
+      self.assertAlmostEqual(actual_evaluation.nash_conv,
+                             expected_evaluation.nash_conv)
+
+  def test_array_snapshots_without_uniform_info_state_depth(self):
+    game = pyspiel.load_game("dark_hex_ir(num_rows=2,num_cols=2)")
+    game_index = felix_game_index.get_game_index(game)
+    uniform_policy = game_index.legal_actions_mask / np.sum(
+        game_index.legal_actions_mask, axis=1, keepdims=True)
+    with felix_evaluation.Evaluator(game, game_index) as evaluator:
+      evaluator.submit(0, uniform_policy)
+      [(iteration, evaluation)] = evaluator.join()
+    self.assertEqual(iteration, 0)
+    self.assertAlmostEqual(
+        evaluation.nash_conv,
+        exploitability.nash_conv(game, policy.UniformRandomPolicy(game)))
+
+  def test_join_fails_when_evaluation_process_dies(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with felix_evaluation.AsyncEvaluator(game) as async_evaluator:
+      async_evaluator._process.terminate()
+      async_evaluator._process.join()
+      async_evaluator.submit(0, pyspiel.ExternalSamplingMCCFRSolver(game))
+      with self.assertRaisesRegex(RuntimeError, "exit code -15"):
+        async_evaluator.join()
+
+
+if __name__ == "__main__":
+  absltest.main()
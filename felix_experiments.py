@@ -0,0 +1,819 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs of the solvers on games, and sweeps of runs over a process pool.
+
+A run trains one algorithm on one game from one seed, evaluates its policy on
+an evaluation schedule and reports each evaluation as a record, e.g.
+
+  {"run": "mccfr/leduc_poker/sampling=outcome/seed=1",
+   "algorithm": "mccfr", "game": "leduc_poker", "seed": 1,
+   "iteration": 64, "time": 0.52, "exploitability": 1.9, "nash_conv": 3.8}
+
+where `time` is the training time up to the evaluated snapshot, excluding the
+time spent evaluating.
+
+A sweep is a dict whose `algorithm`, `game`, `seed` and `iterations` values
+may be lists, and whose `params` may be a list of dicts of algorithm
+parameters; it expands into one run per element of their cartesian product.
+The other keys are the remaining arguments of `run`, shared by all its runs:
+
+  {"algorithm": "mccfr", "game": ["kuhn_poker", "leduc_poker"],
+   "seed": [0, 1, 2], "iterations": 10000, "eval_schedule": "log:1.5",
+   "params": [{"sampling": "external"}, {"sampling": "outcome"}]}
+
+Given a `checkpoint` dict of `felix_checkpoint.Checkpointer` arguments, runs of
+the algorithms supporting it write checkpoints to the `<run name>`
+sub-directory of its `directory`, and with `resume` continue from the last
+one, reporting again the evaluations made before it:
+
+  {"algorithm": "mccfr", "game": "liars_dice", "iterations": 100000,
+   "checkpoint": {"directory": "/tmp/checkpoints", "seconds": 600, "keep": 3},
+   "resume": True}
+
+`run_sweep` runs up to one run per core at a time, each in a fresh process,
+and appends every record to a single JSONL results store as it arrives. When
+the sweep ends, the series of every run are compacted, with the specs of the
+runs, into an npz file next to the store, which `load_results` reads and
+`felix_plot.py` plots.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import random
+import time
+import traceback
+
+from absl import logging
+import numpy as np
+
+from open_spiel.python.algorithms import felix_cfr
+from open_spiel.python.algorithms import felix_checkpoint
+from open_spiel.python.algorithms import felix_evaluation
+from open_spiel.python.algorithms import felix_exploitability
+from open_spiel.python.algorithms import felix_game_index
+from open_spiel.python.algorithms import felix_metrics
+from open_spiel.python.algorithms import felix_parallel_mccfr
+import pyspiel
+
+# Registered algorithms: name -> training function. A training function is
+# called as `fn(run, game, iterations, **params)` and submits its snapshots to
+# `run`.
+_ALGORITHMS = collections.OrderedDict()
+
+# Keys of a sweep whose values may be lists of values to sweep over.
+_SWEPT_KEYS = ("algorithm", "game", "seed", "iterations")
+_SHARED_KEYS = ("eval_schedule", "game_params", "game_index_dir", "async_eval",
+                "checkpoint", "resume")
+
+# Series of the records of a run.
+_SERIES = ("iteration", "time", "exploitability", "nash_conv")
+
+_DEEP_CFR_DEFAULTS = {
+    "policy_network_layers": (16,),
+    "advantage_network_layers": (16,),
+    "num_traversals": 40,
+    "learning_rate": 1e-3,
+    "batch_size_advantage": 128,
+    "batch_size_strategy": 1024,
+    "memory_capacity": 1e7,
+    "policy_network_train_steps": 400,
+    "advantage_network_train_steps": 20,
+    "reinitialize_advantage_networks": False,
+}
+
+
+# Algorithms whose runs can be checkpointed and resumed.
+_CHECKPOINTED_ALGORITHMS = set()
+
+
+def _algorithm(name, checkpoints=False):
+  def register(fn):
+    _ALGORITHMS[name] = fn
+    if checkpoints:
+      _CHECKPOINTED_ALGORITHMS.add(name)
+    return fn
+  return register
+
+
+class _Run(object):
+  """Evaluates the snapshots of one run and reports their records."""
+
+  def __init__(self, run_name, spec, game_index, evaluator, schedule,
+               callback, checkpointer=None):
+    self.seed = spec["seed"]
+    self.eval_schedule = spec["eval_schedule"]
+    self.async_eval = spec["async_eval"]
+    self.game_index = game_index
+    self._header = collections.OrderedDict([
+        ("run", run_name),
+        ("algorithm", spec["algorithm"]),
+        ("game", spec["game"]),
+        ("seed", spec["seed"]),
+    ])
+    self._iterations = spec["iterations"]
+    self._evaluator = evaluator
+    self._schedule = schedule
+    self._callback = callback
+    self._checkpointer = checkpointer
+    self._resume = spec.get("resume", False)
+    self._start = time.perf_counter()
+    self._evaluation_seconds = 0.
+    self._submit_times = {}
+    self.records = []
+
+  def due(self, iteration):
+    """Returns whether the snapshot of `iteration` is to be evaluated."""
+    return (self._schedule.should_evaluate(iteration) or
+            iteration + 1 == self._iterations)
+
+  def training_seconds(self):
+    """Returns the time spent running, excluding evaluations and checkpoints."""
+    return time.perf_counter() - self._start - self._evaluation_seconds
+
+  def submit(self, iteration, snapshot):
+    start = time.perf_counter()
+    self._submit_times[iteration] = (
+        start - self._start - self._evaluation_seconds)
+    self._evaluator.submit(iteration, snapshot)
+    for result in self._evaluator.poll():
+      self.add(*result)
+    self._evaluation_seconds += time.perf_counter() - start
+
+  def add(self, iteration, evaluation, seconds=None):
+    """Reports the `PolicyEvaluation` of the snapshot of `iteration`."""
+    record = collections.OrderedDict(self._header)
+    record["iteration"] = int(iteration)
+    record["time"] = (seconds if seconds is not None else
+                      self._submit_times.get(iteration))
+    record["exploitability"] = float(evaluation.exploitability)
+    record["nash_conv"] = float(evaluation.nash_conv)
+    self.records.append(record)
+    if self._callback is not None:
+      self._callback(record)
+
+  def join(self):
+    for result in self._evaluator.join():
+      self.add(*result)
+
+  @property
+  def checkpointer(self):
+    """(`felix_checkpoint.Checkpointer` or None) Checkpointer of the run."""
+    return self._checkpointer
+
+  @property
+  def resume(self):
+    """(bool) Whether to resume from the last checkpoint of the run."""
+    return self._resume
+
+  def checkpoint_due(self, iteration):
+    """Returns whether a checkpoint is due after `iteration`."""
+    return self._checkpointer is not None and (
+        self._checkpointer.due(iteration) or
+        iteration + 1 == self._iterations)
+
+  def save_checkpoint(self, iterations, state):
+    """Checkpoints the solver after `iterations`.
+
+    The pending evaluations are waited for, so that the checkpoint holds the
+    records of all the evaluations before it. Neither counts as training time.
+
+    Args:
+      iterations: (int) Number of iterations run.
+      state: (callable) Returns the serialized state of the solver.
+    """
+    training_seconds = self.training_seconds()
+    start = time.perf_counter()
+    self.join()
+    self._checkpointer.save(iterations, state, {
+        "time": training_seconds,
+        "records": [{key: record[key] for key in _SERIES}
+                    for record in self.records],
+    })
+    self._evaluation_seconds += time.perf_counter() - start
+
+  def restore_checkpoint(self):
+    """Returns `(iterations, state)` of the checkpoint to resume, or None.
+
+    The records of the checkpoint are reported again, and the training time
+    continues from that of the checkpoint.
+    """
+    if self._checkpointer is None or not self._resume:
+      return None
+    restored = self._checkpointer.restore()
+    if restored is None:
+      return None
+    metadata, state = restored
+    logging.info("Resuming from the checkpoint of iteration %d in %s",
+                 metadata["iteration"], self._checkpointer.directory)
+    for record in metadata["records"]:
+      self.add(
+          record["iteration"],
+          felix_exploitability.PolicyEvaluation(record["exploitability"],
+                                                record["nash_conv"], None),
+          seconds=record["time"])
+    self._start = time.perf_counter() - metadata["time"]
+    self._evaluation_seconds = 0.
+    return metadata["iteration"], state
+
+  def log_checkpoints(self):
+    if self._checkpointer is not None:
+      logging.info("%s: %s", self._header["run"],
+                   self._checkpointer.summary())
+
+
+@_algorithm("cfr")
+def _train_cfr(run, game, iterations, mode="cfr", **kwargs):
+  """Trains a tabular CFR solver.
+
+  Args:
+    run: (_Run) The run.
+    game: (pyspiel.Game) The game.
+    iterations: (int) The number of iterations.
+    mode: (str) The variant of CFR, a key of `felix_cfr.SOLVERS`.
+    **kwargs: Arguments of the solver, such as the `alpha`, `beta` and
+      `gamma` of DCFR.
+  """
+  if mode not in felix_cfr.SOLVERS:
+    raise ValueError("Unknown CFR mode: {}".format(mode))
+  solver = felix_cfr.SOLVERS[mode](game, run.game_index, **kwargs)
+  for i in range(iterations):
+    solver.evaluate_and_update_policy()
+    if run.due(i):
+      run.submit(i, solver.average_policy_array())
+
+
+@_algorithm("mccfr", checkpoints=True)
+def _train_mccfr(run,
+                 game,
+                 iterations,
+                 sampling="external",
+                 num_workers=1,
+                 merge_every=None):
+  """Trains a pyspiel external or outcome sampling MCCFR solver.
+
+  Checkpoints hold the serialized solver, so that a resumed single solver
+  continues exactly as if never interrupted, random numbers included, and
+  resumed parallel workers continue from the merged tables with new seeds,
+  drawn from the seed of the run and the number of iterations restored.
+
+  Args:
+    run: (_Run) The run.
+    game: (pyspiel.Game) The game.
+    iterations: (int) The number of iterations.
+    sampling: (str) "external" or "outcome" sampling.
+    num_workers: (int) Number of solvers run in parallel processes, whose
+      tables are merged every `merge_every` iterations of each, as done by
+      `felix_parallel_mccfr.ParallelMCCFRSolver`. The merged solver is then
+      evaluated and checkpointed at the end of the rounds holding iterations
+      due for it.
+    merge_every: (int or None) Iterations of each worker between merges, or
+      None for the default of the sampling.
+  """
+  restored = run.restore_checkpoint()
+  if num_workers > 1:
+    with felix_parallel_mccfr.ParallelMCCFRSolver(
+        game, num_workers, sampling=sampling, seed=run.seed,
+        merge_every=merge_every) as solver:
+      if restored is not None:
+        restored_iterations, state = restored
+        solver.restore(state, restored_iterations)
+      while solver.iterations < iterations:
+        start = solver.iterations
+        solver.run_iterations(
+            min(solver.round_iterations, iterations - start))
+        # Every iteration is checked, for the schedules to see them all.
+        if any([run.due(i) for i in range(start, solver.iterations)]):
+          run.submit(solver.iterations - 1,
+                     solver.average_policy_array(run.game_index))
+        if any([run.checkpoint_due(i)
+                for i in range(start, solver.iterations)]):
+          run.save_checkpoint(solver.iterations, solver.serialize)
+    run.log_checkpoints()
+    return
+  if sampling == "external":
+    solver = pyspiel.ExternalSamplingMCCFRSolver(
+        game, seed=run.seed, avg_type=pyspiel.MCCFRAverageType.FULL)
+  elif sampling == "outcome":
+    solver = pyspiel.OutcomeSamplingMCCFRSolver(game, seed=run.seed)
+  else:
+    raise ValueError("Unknown MCCFR sampling: {}".format(sampling))
+  start = 0
+  if restored is not None:
+    start, state = restored
+    solver = type(solver).__new__(type(solver))
+    solver.__setstate__(state)
+  for i in range(start, iterations):
+    solver.run_iteration()
+    if run.due(i):
+      # The solver pickles through its serialization, and its average policy
+      # is built by the evaluator.
+      run.submit(i, solver)
+    if run.checkpoint_due(i):
+      run.save_checkpoint(i + 1, solver.__getstate__)
+  run.log_checkpoints()
+
+
+@_algorithm("rcfr")
+def _train_rcfr(run,
+                game,
+                iterations,
+                bootstrap=False,
+                truncate_negative=False,
+                buffer_size=-1,
+                num_hidden_layers=1,
+                num_hidden_units=13,
+                num_hidden_factors=8,
+                use_skip_connections=True,
+                num_epochs=200,
+                batch_size=100,
+                step_size=0.01):
+  """Trains an RCFR solver with deep regret models."""
+  # TensorFlow is imported by the runs needing it, each of which sets the
+  # execution mode of its own process.
+  import tensorflow.compat.v1 as tf  # pylint: disable=g-import-not-at-top
+  from open_spiel.python.algorithms import rcfr  # pylint: disable=g-import-not-at-top
+  tf.enable_eager_execution()
+  tf.set_random_seed(run.seed)
+
+  models = []
+  for _ in range(game.num_players()):
+    models.append(
+        rcfr.DeepRcfrModel(
+            game,
+            num_hidden_layers=num_hidden_layers,
+            num_hidden_units=num_hidden_units,
+            num_hidden_factors=num_hidden_factors,
+            use_skip_connections=use_skip_connections))
+
+  if buffer_size > 0:
+    solver = rcfr.ReservoirRcfrSolver(
+        game, models, buffer_size, truncate_negative=truncate_negative)
+  else:
+    solver = rcfr.RcfrSolver(
+        game, models, truncate_negative=truncate_negative, bootstrap=bootstrap)
+
+  def _train_fn(model, data):
+    """Train `model` on `data`."""
+    data = data.shuffle(batch_size * 10)
+    data = data.batch(batch_size)
+    data = data.repeat(num_epochs)
+
+    optimizer = tf.keras.optimizers.Adam(lr=step_size, amsgrad=True)
+
+    @tf.function
+    def _train():
+      for x, y in data:
+        optimizer.minimize(
+            lambda: tf.losses.huber_loss(y, model(x), delta=0.01),  # pylint: disable=cell-var-from-loop
+            model.trainable_variables)
+
+    _train()
+
+  for i in range(iterations):
+    solver.evaluate_and_update_policy(_train_fn)
+    if run.due(i):
+      run.submit(
+          i, run.game_index.action_probability_array(solver.average_policy()))
+
+
+@_algorithm("deep_cfr", checkpoints=True)
+def _train_deep_cfr(run, game, iterations, metrics_path=None, **kwargs):
+  """Trains a Deep CFR solver.
+
+  The solver evaluates its snapshots itself, so the evaluations of the run are
+  reported when training ends.
+
+  The solver writes its own checkpoint, of its networks and memories, to the
+  checkpoint directory of the run every `every` iterations of the run's
+  checkpoint options, and after the last iteration. It keeps only its last
+  checkpoint, and cannot checkpoint every number of seconds.
+
+  Args:
+    run: (_Run) The run.
+    game: (pyspiel.Game) The game.
+    iterations: (int) The number of iterations.
+    metrics_path: (str or None) JSONL file of the per-iteration metrics.
+    **kwargs: Arguments of `DeepCFRSolver` overriding `_DEEP_CFR_DEFAULTS`.
+
+  Raises:
+    ValueError: If checkpoints are due every number of seconds, or if a
+      checkpoint of the run exists and is not resumed.
+  """
+  # See `_train_rcfr`.
+  import tensorflow.compat.v1 as tf  # pylint: disable=g-import-not-at-top
+  from open_spiel.python.algorithms import felix_deep_cfr as deep_cfr  # pylint: disable=g-import-not-at-top
+  tf.disable_v2_behavior()
+
+  solver_kwargs = dict(_DEEP_CFR_DEFAULTS)
+  solver_kwargs.update(kwargs)
+  checkpoint_directory = None
+  if run.checkpointer is not None:
+    if run.checkpointer.seconds is not None:
+      raise ValueError("Deep CFR checkpoints every number of iterations, not "
+                       "of seconds")
+    checkpoint_directory = run.checkpointer.directory
+    solver_kwargs["checkpoint_every"] = run.checkpointer.every or iterations
+    if deep_cfr.checkpoint_exists(checkpoint_directory) and not run.resume:
+      raise ValueError(
+          "A checkpoint of the run exists in {}; resume or remove it".format(
+              checkpoint_directory))
+  if metrics_path is not None and os.path.dirname(metrics_path):
+    if not os.path.exists(os.path.dirname(metrics_path)):
+      os.makedirs(os.path.dirname(metrics_path))
+  with tf.Graph().as_default(), tf.Session() as sess:
+    tf.set_random_seed(run.seed)
+    solver = deep_cfr.DeepCFRSolver(
+        sess,
+        game,
+        num_iterations=iterations,
+        game_index=run.game_index,
+        eval_schedule=run.eval_schedule,
+        async_evaluation=run.async_eval,
+        checkpoint_directory=checkpoint_directory,
+        metrics=felix_metrics.Metrics(jsonl_path=metrics_path),
+        **solver_kwargs)
+    sess.run(tf.global_variables_initializer())
+    if checkpoint_directory is not None and deep_cfr.checkpoint_exists(
+        checkpoint_directory):
+      logging.info("Resuming from the checkpoint in %s", checkpoint_directory)
+      solver.restore(checkpoint_directory)
+    _, advantage_losses, policy_loss, nash_convs, exploitabilities = (
+        solver.solve())
+    for player, losses in advantage_losses.items():
+      logging.info("Advantage for player %d: %s", player,
+                   losses[:2] + ["..."] + losses[-2:])
+      logging.info("Advantage Buffer Size for player %s: '%s'", player,
+                   len(solver.advantage_buffers[player]))
+    logging.info("Strategy Buffer Size: '%s'", len(solver.strategy_buffer))
+    logging.info("Final policy loss: '%s'", policy_loss)
+    logging.info("Time and counts per phase: %s", solver.metrics.totals())
+
+  # Training time up to the end of each iteration, excluding evaluations.
+  elapsed, seconds = {}, 0.
+  for record in solver.metrics.records:
+    seconds += sum(seconds_in_phase
+                   for phase, seconds_in_phase in record["time"].items()
+                   if phase != "evaluation")
+    elapsed[record["iteration"]] = seconds
+  for iteration, nash_conv, exploitability in zip(
+      solver.evaluation_iterations, nash_convs, exploitabilities):
+    run.add(
+        iteration,
+        felix_exploitability.PolicyEvaluation(exploitability, nash_conv, None),
+        seconds=elapsed.get(iteration))
+
+
+def algorithms():
+  """Returns the names of the registered algorithms."""
+  return list(_ALGORITHMS)
+
+
+def load_game(game_name, game_params=None):
+  """Loads `game_name` with the `game_params` dict of parameter values."""
+  if not game_params:
+    return pyspiel.load_game(game_name)
+  return pyspiel.load_game(
+      game_name,
+      {key: pyspiel.GameParameter(value)
+       for key, value in game_params.items()})
+
+
+def run_name(spec):
+  """Returns the name identifying the run of `spec` in a results store."""
+  parts = [spec["algorithm"], spec["game"]]
+  if spec.get("params"):
+    parts.append(",".join("{}={}".format(key, value)
+                          for key, value in sorted(spec["params"].items())))
+  parts.append("seed={}".format(spec.get("seed", 0)))
+  return "/".join(parts)
+
+
+def run(algorithm,
+        game,
+        iterations,
+        seed=0,
+        params=None,
+        eval_schedule="linear:1",
+        game_params=None,
+        game_index_dir=None,
+        async_eval=False,
+        checkpoint=None,
+        resume=False,
+        callback=None):
+  """Trains `algorithm` on `game` and returns the records of its evaluations.
+
+  Args:
+    algorithm: (str) Name of a registered algorithm.
+    game: (str) Name of the game.
+    iterations: (int) Number of training iterations.
+    seed: (int) Seed of the run.
+    params: (dict or None) Parameters of the algorithm.
+    eval_schedule: (str) Evaluation schedule, as accepted by
+      `felix_evaluation.make_schedule`. The last iteration is always
+      evaluated.
+    game_params: (dict or None) Parameters of the game.
+    game_index_dir: (str or None) Directory in which game indices are cached.
+    async_eval: (bool) Whether to evaluate in a separate process.
+    checkpoint: (dict or None) Arguments of the `felix_checkpoint.Checkpointer`
+      of the run, whose `directory` is that of all runs: the checkpoints of the
+      run are written to its `run_name` sub-directory.
+    resume: (bool) Whether to resume from the last checkpoint of the run, if
+      any. Otherwise, the run must have no checkpoint.
+    callback: (callable or None) Called with each record as it is produced.
+
+  Returns:
+    The list of the records of the run, in evaluation order.
+
+  Raises:
+    ValueError: If the algorithm is unknown or cannot be checkpointed, or if
+      checkpoints of the run exist and are not resumed.
+  """
+  if algorithm not in _ALGORITHMS:
+    raise ValueError("Unknown algorithm: {}".format(algorithm))
+  if checkpoint is not None and algorithm not in _CHECKPOINTED_ALGORITHMS:
+    raise ValueError("Algorithm {} does not support checkpoints".format(
+        algorithm))
+  spec = {
+      "algorithm": algorithm,
+      "game": game,
+      "iterations": iterations,
+      "seed": seed,
+      "params": params or {},
+      "eval_schedule": eval_schedule,
+      "async_eval": async_eval,
+      "resume": resume,
+  }
+  checkpointer = None
+  if checkpoint is not None:
+    checkpoint = dict(checkpoint)
+    checkpointer = felix_checkpoint.Checkpointer(
+        os.path.join(checkpoint.pop("directory"), run_name(spec)),
+        **checkpoint)
+    if not resume and checkpointer.iterations():
+      raise ValueError(
+          "Checkpoints of run {} exist in {}; resume or remove them".format(
+              run_name(spec), checkpointer.directory))
+  random.seed(seed)
+  np.random.seed(seed)
+  loaded_game = load_game(game, game_params)
+  game_index = felix_game_index.get_game_index(loaded_game, game_index_dir)
+  with felix_evaluation.make_evaluator(loaded_game, game_index,
+                                       async_eval) as evaluator:
+    start = time.perf_counter()
+    run_state = _Run(run_name(spec), spec, game_index, evaluator,
+                     felix_evaluation.make_schedule(eval_schedule, evaluator),
+                     callback, checkpointer)
+    _ALGORITHMS[algorithm](run_state, loaded_game, iterations,
+                           **spec["params"])
+    run_state.join()
+    logging.info(
+        "%s: %.2fs in total, of which %.2fs of training; %d evaluations "
+        "took %.2fs%s", run_name(spec), time.perf_counter() - start,
+        run_state.training_seconds(), evaluator.num_evaluated,
+        evaluator.evaluation_seconds,
+        " in a separate process" if async_eval else "")
+  return run_state.records
+
+
+def _as_list(value):
+  return value if isinstance(value, list) else [value]
+
+
+def expand_sweep(sweep):
+  """Returns the list of the run specs of `sweep`, or of a list of sweeps.
+
+  A run spec is a dict of the arguments of `run`, except `callback`.
+
+  Raises:
+    ValueError: If the sweep has unknown keys or algorithms.
+  """
+  if isinstance(sweep, list):
+    return [spec for each in sweep for spec in expand_sweep(each)]
+  unknown = set(sweep) - set(_SWEPT_KEYS + _SHARED_KEYS + ("params",))
+  if unknown:
+    raise ValueError("Unknown sweep keys: {}".format(
+        ", ".join(sorted(unknown))))
+  values = [_as_list(sweep.get(key, 0)) for key in _SWEPT_KEYS]
+  values.append(_as_list(sweep.get("params", {})))
+  specs = []
+  for algorithm, game, seed, iterations, params in itertools.product(*values):
+    if algorithm not in _ALGORITHMS:
+      raise ValueError("Unknown algorithm: {}".format(algorithm))
+    spec = {key: sweep[key] for key in _SHARED_KEYS if key in sweep}
+    spec.update(algorithm=algorithm, game=game, seed=seed,
+                iterations=iterations, params=dict(params))
+    specs.append(spec)
+  return specs
+
+
+def _run_worker(spec, messages):
+  """Runs `spec`, sending its records and then its outcome to `messages`."""
+  name = run_name(spec)
+  try:
+    run(callback=lambda record: messages.put(("record", record)), **spec)
+  except Exception:  # pylint: disable=broad-except
+    messages.put(("done", name, traceback.format_exc()))
+  else:
+    messages.put(("done", name, None))
+
+
+def run_sweep(specs, results_path, num_workers=None, callback=None):
+  """Runs the run `specs` in parallel, writing their records to a store.
+
+  Each run has a fresh process, forked when one of the `num_workers` slots is
+  free, so that runs neither share the state of their solvers nor the
+  execution mode of TensorFlow.
+
+  Args:
+    specs: (list[dict]) Run specs, as returned by `expand_sweep`.
+    results_path: (str) JSONL file to which the records of all the runs are
+      written, one per line, as they arrive. When all the runs are done, they
+      are also written with their specs to `results_npz_path(results_path)`.
+    num_workers: (int or None) Number of concurrent runs. Defaults to the
+      number of cores.
+    callback: (callable or None) Called with each record as it arrives.
+
+  Returns:
+    A dict mapping the name of every failed run to its error.
+  """
+  names = [run_name(spec) for spec in specs]
+  if len(set(names)) != len(names):
+    raise ValueError("Runs of a sweep must differ in their algorithm, game, "
+                     "parameters or seed")
+  num_workers = num_workers or os.cpu_count() or 1
+  context = multiprocessing.get_context("fork")
+  messages = context.Queue()
+  pending = collections.deque(zip(names, specs))
+  running = {}
+  failures = {}
+
+  def handle(message, results):
+    if message[0] == "record":
+      results.write(json.dumps(message[1]) + "\n")
+      results.flush()
+      if callback is not None:
+        callback(message[1])
+      return
+    _, name, error = message
+    running.pop(name).join()
+    if error is not None:
+      logging.error("Run %s failed:\n%s", name, error)
+      failures[name] = error
+
+  with open(results_path, "w") as results:
+    while pending or running:
+      while pending and len(running) < num_workers:
+        name, spec = pending.popleft()
+        # Not a daemon, so that the run can start its own evaluation process.
+        process = context.Process(target=_run_worker, args=(spec, messages))
+        process.start()
+        running[name] = process
+      try:
+        handle(messages.get(timeout=0.1), results)
+      except queue.Empty:
+        # A process exits after its messages are flushed to the queue, so
+        # those of an exited process that are still missing never come.
+        for name, process in list(running.items()):
+          if process.exitcode is not None:
+            while name in running:
+              try:
+                handle(messages.get_nowait(), results)
+              except queue.Empty:
+                running.pop(name)
+                failures[name] = "Exited with code {}".format(
+                    process.exitcode)
+                logging.error("Run %s exited with code %d", name,
+                              process.exitcode)
+  npz_path = results_npz_path(results_path)
+  save_results(load_results(results_path), npz_path, specs, failures)
+  for name, result in load_results(npz_path).items():
+    if "error" not in result and "nash_conv" in result:
+      logging.info("%s: exploitability %g, NashConv %g after %d iterations",
+                   name, result["exploitability"][-1],
+                   result["nash_conv"][-1], result["iteration"][-1] + 1)
+  logging.info("Results written to %s", npz_path)
+  return failures
+
+
+def results_npz_path(results_path):
+  """Returns the path of the compact results file of a JSONL results store."""
+  return os.path.splitext(results_path)[0] + ".npz"
+
+
+def save_results(runs, npz_path, specs=None, failures=None):
+  """Writes runs to a compressed npz file, with their metadata.
+
+  The series of the i-th run are stored as the arrays `<i>/iteration`,
+  `<i>/time`, `<i>/exploitability` and `<i>/nash_conv`, and the metadata of
+  all runs as the JSON string `metadata`.
+
+  Args:
+    runs: (dict) Runs, as returned by `load_results`.
+    npz_path: (str) File to write.
+    specs: (list[dict] or None) Specs of the runs, stored with their metadata.
+      Runs of `specs` without records are stored with their metadata only.
+    failures: (dict or None) Errors of the failed runs, as returned by
+      `run_sweep`.
+  """
+  specs_by_name = collections.OrderedDict(
+      (run_name(spec), spec) for spec in specs or ())
+  names = list(runs) + [name for name in specs_by_name if name not in runs]
+  entries = []
+  arrays = {}
+  for i, name in enumerate(names):
+    entry = {"run": name}
+    entry.update((key, value)
+                 for key, value in runs.get(name, {}).items()
+                 if key not in _SERIES)
+    if name in specs_by_name:
+      spec = specs_by_name[name]
+      entry.update(algorithm=spec["algorithm"], game=spec["game"],
+                   seed=spec.get("seed", 0), spec=spec)
+    if failures and name in failures:
+      entry["error"] = failures[name]
+    entries.append(entry)
+    for key in _SERIES:
+      if key in runs.get(name, {}):
+        arrays["{}/{}".format(i, key)] = runs[name][key]
+  arrays["metadata"] = np.array(json.dumps({"runs": entries}))
+  # Written to a temporary file first, so that readers never see a partial
+  # file.
+  temporary_path = npz_path + ".tmp"
+  with open(temporary_path, "wb") as f:
+    np.savez_compressed(f, **arrays)
+  os.replace(temporary_path, npz_path)
+
+
+def _load_npz(npz_path, select):
+  runs = collections.OrderedDict()
+  # Members of an npz file are only read when accessed, so the series of
+  # unselected runs are never decompressed.
+  with np.load(npz_path) as data:
+    for i, entry in enumerate(json.loads(str(data["metadata"]))["runs"]):
+      if select is not None and not select(entry):
+        continue
+      name = entry.pop("run")
+      runs[name] = entry
+      for key in _SERIES:
+        if "{}/{}".format(i, key) in data.files:
+          entry[key] = data["{}/{}".format(i, key)]
+  return runs
+
+
+def load_results(results_path, select=None):
+  """Returns the records of a results store grouped by run.
+
+  Args:
+    results_path: (str) JSONL results store written by `run_sweep`, or its
+      compact npz file.
+    select: (callable or None) Predicate on the metadata dict of a run,
+      holding at least its `run` name, `algorithm`, `game` and `seed`; only
+      the runs for which it is true are loaded.
+
+  Returns:
+    An `OrderedDict` mapping each run name to a dict with its metadata and
+    arrays of the `iteration`, `time`, `exploitability` and `nash_conv` of its
+    records sorted by iteration. Runs stored without records, such as failed
+    runs of an npz file, have no arrays.
+  """
+  if results_path.endswith(".npz"):
+    return _load_npz(results_path, select)
+  records = collections.OrderedDict()
+  with open(results_path) as f:
+    for line in f:
+      record = json.loads(line)
+      records.setdefault(record["run"], []).append(record)
+  runs = collections.OrderedDict()
+  for name, run_records in records.items():
+    run_records.sort(key=lambda record: record["iteration"])
+    metadata = {key: run_records[0][key]
+                for key in ("run", "algorithm", "game", "seed")}
+    if select is not None and not select(metadata):
+      continue
+    del metadata["run"]
+    runs[name] = metadata
+    for key in _SERIES:
+      runs[name][key] = np.array(
+          [record[key] for record in run_records], dtype=np.float64)
+    runs[name]["iteration"] = runs[name]["iteration"].astype(np.int64)
+  return runs
@@ -0,0 +1,164 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_experiments."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+from absl.testing import absltest
+import numpy as np
+
+from open_spiel.python.algorithms import felix_experiments
+
+
+class ExpandSweepTest(absltest.TestCase):
+
+  def test_cartesian_product(self):
+    specs = felix_experiments.expand_sweep({
+        "algorithm": "mccfr",
+        "game": ["kuhn_poker", "leduc_poker"],
+        "seed": [0, 1, 2],
+        "iterations": 10,
+        "eval_schedule": "log:2",
+        "params": [{"sampling": "external"}, {"sampling": "outcome"}],
+    })
+    self.assertLen(specs, 12)
+    self.assertLen(set(felix_experiments.run_name(spec) for spec in specs),
+                   12)
+    self.assertTrue(all(spec["eval_schedule"] == "log:2" for spec in specs))
+
+  def test_unknown_keys_and_algorithms(self):
+    with self.assertRaises(ValueError):
+      felix_experiments.expand_sweep({"algorithm": "cfr", "gmae": "kuhn"})
+    with self.assertRaises(ValueError):
+      felix_experiments.expand_sweep({"algorithm": "dcfr", "game": "kuhn"})
+
+
+class RunSweepTest(absltest.TestCase):
+
+  def test_records_of_all_runs_are_stored(self):
+    specs = felix_experiments.expand_sweep({
+        "algorithm": ["cfr", "mccfr"],
+        "game": "kuhn_poker",
+        "iterations": 4,
+        "eval_schedule": "linear:2",
+    })
+    path = os.path.join(self.create_tempdir().full_path, "results.jsonl")
+    failures = felix_experiments.run_sweep(specs, path, num_workers=2)
+    self.assertEmpty(failures)
+    results = felix_experiments.load_results(path)
+    for spec in specs:
+      run = results[felix_experiments.run_name(spec)]
+      self.assertEqual(list(run["iteration"]), [0, 2, 3])
+      self.assertEqual(
+          [record["nash_conv"] for record in felix_experiments.run(**spec)],
+          list(run["nash_conv"]))
+    cfr_run = results[felix_experiments.run_name(specs[0])]
+    self.assertLess(cfr_run["nash_conv"][-1], cfr_run["nash_conv"][0])
+
+    compact = felix_experiments.load_results(
+        felix_experiments.results_npz_path(path),
+        select=lambda run: run["algorithm"] == "cfr")
+    self.assertEqual(list(compact), [felix_experiments.run_name(specs[0])])
+    self.assertEqual(compact[felix_experiments.run_name(specs[0])]["spec"],
+                     specs[0])
+    np.testing.assert_array_equal(
+        compact[felix_experiments.run_name(specs[0])]["nash_conv"],
+        cfr_run["nash_conv"])
+
+  def test_failed_runs_are_reported(self):
+    specs = felix_experiments.expand_sweep({
+        "algorithm": "mccfr",
+        "game": "kuhn_poker",
+        "iterations": 2,
+        "params": {"sampling": "stratified"},
+    })
+    path = os.path.join(self.create_tempdir().full_path, "results.jsonl")
+    failures = felix_experiments.run_sweep(specs, path)
+    self.assertEqual(list(failures), [felix_experiments.run_name(specs[0])])
+    self.assertIn("ValueError", failures[felix_experiments.run_name(specs[0])])
+    compact = felix_experiments.load_results(
+        felix_experiments.results_npz_path(path))
+    self.assertIn("ValueError",
+                  compact[felix_experiments.run_name(specs[0])]["error"])
+
+  def test_resumed_runs_continue_where_they_stopped(self):
+    directory = self.create_tempdir().full_path
+    for params in ({"sampling": "outcome"},
+                   {"sampling": "external", "num_workers": 2,
+                    "merge_every": 5}):
+      checkpoint = {"directory": directory, "every": 10, "keep": 2}
+      first = felix_experiments.run("mccfr", "kuhn_poker", 20, params=params,
+                                    eval_schedule="linear:10",
+                                    checkpoint=checkpoint)
+      with self.assertRaises(ValueError):
+        felix_experiments.run("mccfr", "kuhn_poker", 40, params=params,
+                              checkpoint=checkpoint)
+      resumed = felix_experiments.run(
+          "mccfr", "kuhn_poker", 40, params=params, eval_schedule="linear:10",
+          checkpoint=checkpoint, resume=True)
+      self.assertEqual(resumed[:len(first)], first)
+      self.assertEqual(resumed[-1]["iteration"], 39)
+      if "num_workers" not in params:
+        uninterrupted = felix_experiments.run("mccfr", "kuhn_poker", 40,
+                                              params=params,
+                                              eval_schedule="linear:10")
+        self.assertEqual(resumed[-1]["nash_conv"],
+                         uninterrupted[-1]["nash_conv"])
+
+  def test_deep_cfr_runs_resume_from_spec_checkpoint(self):
+    params = {
+        "policy_network_layers": (8,),
+        "advantage_network_layers": (8,),
+        "num_traversals": 4,
+        "memory_capacity": 1000,
+        "batch_size_advantage": 8,
+        "batch_size_strategy": 8,
+        "policy_network_train_steps": 2,
+        "advantage_network_train_steps": 2,
+    }
+    checkpoint = {"directory": self.create_tempdir().full_path, "every": 1}
+    first = felix_experiments.run("deep_cfr", "kuhn_poker", 2, params=params,
+                                  checkpoint=checkpoint)
+    with self.assertRaises(ValueError):
+      felix_experiments.run("deep_cfr", "kuhn_poker", 3, params=params,
+                            checkpoint=checkpoint)
+    with self.assertRaises(ValueError):
+      felix_experiments.run("deep_cfr", "kuhn_poker", 3, params=params,
+                            checkpoint=dict(checkpoint, seconds=60.),
+                            resume=True)
+    resumed = felix_experiments.run("deep_cfr", "kuhn_poker", 3,
+                                    params=params, checkpoint=checkpoint,
+                                    resume=True)
+    self.assertEqual([record["iteration"] for record in resumed], [1, 2, 3])
+    self.assertEqual([record["nash_conv"] for record in resumed[:2]],
+                     [record["nash_conv"] for record in first])
+
+  def test_import_does_not_load_matplotlib(self):
+    subprocess.check_call([
+        sys.executable, "-c",
+        "import sys; "
+        "from open_spiel.python.algorithms import felix_experiments; "
+        "assert 'matplotlib' not in sys.modules"
+    ])
+
+
+if __name__ == "__main__":
+  absltest.main()
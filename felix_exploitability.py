@@ -0,0 +1,277 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Exploitability and NashConv computed over a `felix_game_index.GameIndex`.
+
+These functions mirror `open_spiel.python.algorithms.exploitability`, but the
+best responses and on-policy values are computed with vectorized passes over
+the flat game tree of the game index, one depth at a time, instead of walking
+the game tree again for every call. Games whose information states span
+several depths fall back to the open_spiel implementation.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+from open_spiel.python.algorithms import exploitability as os_exploitability
+from open_spiel.python.algorithms import felix_game_index
+import pyspiel
+
+_NashConvReturn = collections.namedtuple("_NashConvReturn",
+                                         ["nash_conv", "player_improvements"])
+
+PolicyEvaluation = collections.namedtuple(
+    "PolicyEvaluation", ["exploitability", "nash_conv", "player_improvements"])
+
+
+def _edge_probabilities(game_index, action_probabilities):
+  """Returns the probability of reaching each node from its parent.
+
+  Args:
+    game_index: `GameIndex` of the game.
+    action_probabilities: `[num_info_states, num_distinct_actions]` policy.
+
+  Returns:
+    An array over nodes holding the chance or policy probability of the action
+    leading to each node, and 1 for the root.
+  """
+  probs = np.ones(game_index.num_nodes)
+  parent_rows = game_index.node_info_state[game_index.node_parent[1:]]
+  actions = game_index.node_action[1:]
+  decision = parent_rows >= 0
+  probs[1:] = game_index.node_chance_prob[1:]
+  probs[1:][decision] = action_probabilities[parent_rows[decision],
+                                             actions[decision]]
+  return probs
+
+
+def _backup(game_index, values, weights, start, end):
+  """Adds the weighted values of nodes `start:end` to their parents."""
+  parents = game_index.node_parent[start:end]
+  first_parent = parents[0]
+  contributions = weights[start:end, np.newaxis] * values[start:end]
+  for column in range(values.shape[1]):
+    values[first_parent:parents[-1] + 1, column] += np.bincount(
+        parents - first_parent, weights=contributions[:, column])
+
+
+def policy_values(game_index, action_probabilities):
+  """Returns the expected return of each player when all follow the policy.
+
+  Args:
+    game_index: `GameIndex` of the game.
+    action_probabilities: `[num_info_states, num_distinct_actions]` policy.
+  """
+  return _policy_values(game_index,
+                        _edge_probabilities(game_index, action_probabilities))
+
+
+def _policy_values(game_index, probs):
+  values = game_index.node_returns.copy()
+  levels = game_index.level_starts
+  for depth in range(len(levels) - 2, 0, -1):
+    _backup(game_index, values, probs, levels[depth], levels[depth + 1])
+  return values[0]
+
+
+def best_response_value(game_index, action_probabilities, best_responder):
+  """Returns the value of a best response of `best_responder` to the policy.
+
+  Args:
+    game_index: `GameIndex` of the game.
+    action_probabilities: `[num_info_states, num_distinct_actions]` policy.
+    best_responder: (int) Player computing a best response.
+  """
+  return _best_response_value(
+      game_index, _edge_probabilities(game_index, action_probabilities),
+      best_responder)
+
+
+def _best_response_value(game_index, probs, best_responder):
+  parents = game_index.node_parent
+  responder_child = np.zeros(game_index.num_nodes, dtype=bool)
+  responder_child[1:] = game_index.node_player[parents[1:]] == best_responder
+  levels = game_index.level_starts
+
+  # Reach probability of every node due to chance and the other players.
+  reach = np.ones(game_index.num_nodes)
+  others_probs = np.where(responder_child, 1., probs)
+  for depth in range(1, len(levels) - 1):
+    start, end = levels[depth], levels[depth + 1]
+    reach[start:end] = reach[parents[start:end]] * others_probs[start:end]
+
+  values = game_index.node_returns[:, best_responder:best_responder + 1].copy()
+  num_actions = game_index.legal_actions_mask.shape[1]
+  for depth in range(len(levels) - 2, 0, -1):
+    start, end = levels[depth], levels[depth + 1]
+    weights = probs.copy()
+    children = np.arange(start, end)[responder_child[start:end]]
+    if len(children):
+      # Counterfactual value of each action of the responder's info states.
+      rows = game_index.node_info_state[parents[children]]
+      actions = game_index.node_action[children]
+      action_values = np.zeros((game_index.num_info_states, num_actions))
+      np.add.at(action_values, (rows, actions),
+                reach[parents[children]] * values[children, 0])
+      action_values[game_index.legal_actions_mask == 0] = -np.inf
+      best_actions = np.argmax(action_values, axis=1)
+      weights[children] = actions == best_actions[rows]
+    _backup(game_index, values, weights, start, end)
+  return values[0, 0]
+
+
+def _check_two_player_constant_sum(game):
+  if game.num_players() != 2:
+    raise ValueError("Game must be a 2-player game")
+  game_info = game.get_type()
+  if game_info.dynamics != pyspiel.GameType.Dynamics.SEQUENTIAL:
+    raise ValueError("The game must be turn-based, not {}".format(
+        game_info.dynamics))
+  if game_info.utility not in (pyspiel.GameType.Utility.ZERO_SUM,
+                               pyspiel.GameType.Utility.CONSTANT_SUM):
+    raise ValueError("The game must be constant- or zero-sum, not {}".format(
+        game_info.utility))
+
+
+def evaluate(game, policy, game_index=None):
+  """Returns the exploitability and NashConv of the policy in the game.
+
+  Both metrics are derived from the same best response values, computed once
+  per player.
+
+  Args:
+    game: An open_spiel game, e.g. kuhn_poker
+    policy: A `policy.Policy` object, a `pyspiel.Policy`, or an array of
+      action probabilities indexed by the rows of the game index.
+    game_index: `GameIndex` of `game`. Defaults to
+      `felix_game_index.get_game_index(game)`.
+
+  Returns:
+    A `PolicyEvaluation` namedtuple.
+
+  Raises:
+    ValueError if the game is not a two-player constant-sum turn-based game.
+  """
+  _check_two_player_constant_sum(game)
+  game_index = game_index or felix_game_index.get_game_index(game)
+  if not game_index.uniform_info_state_depth:
+    policy = _as_policy(game_index, policy)
+    nash_conv_return = os_exploitability.nash_conv(
+        game, policy, return_only_nash_conv=False)
+    return PolicyEvaluation(
+        exploitability=os_exploitability.exploitability(game, policy),
+        nash_conv=nash_conv_return.nash_conv,
+        player_improvements=nash_conv_return.player_improvements)
+  probs = _edge_probabilities(game_index, _as_array(game_index, policy))
+  best_response_values = np.array([
+      _best_response_value(game_index, probs, best_responder)
+      for best_responder in range(game.num_players())
+  ])
+  player_improvements = best_response_values - _policy_values(
+      game_index, probs)
+  return PolicyEvaluation(
+      exploitability=(sum(best_response_values) - game.utility_sum()) /
+      game.num_players(),
+      nash_conv=sum(player_improvements),
+      player_improvements=player_improvements)
+
+
+def exploitability(game, policy, game_index=None):
+  """Returns the exploitability of the policy in the game.
+
+  See `open_spiel.python.algorithms.exploitability.exploitability`. Use
+  `evaluate` to also get the NashConv from the same best responses.
+
+  Args:
+    game: An open_spiel game, e.g. kuhn_poker
+    policy: A `policy.Policy` object, a `pyspiel.Policy`, or an array of
+      action probabilities indexed by the rows of the game index.
+    game_index: `GameIndex` of `game`. Defaults to
+      `felix_game_index.get_game_index(game)`.
+
+  Returns:
+    The value that this policy achieves when playing against the worst-case
+    non-cheating opponent, averaged across both starting positions.
+
+  Raises:
+    ValueError if the game is not a two-player constant-sum turn-based game.
+  """
+  _check_two_player_constant_sum(game)
+  game_index = game_index or felix_game_index.get_game_index(game)
+  if not game_index.uniform_info_state_depth:
+    return os_exploitability.exploitability(
+        game, _as_policy(game_index, policy))
+  probs = _edge_probabilities(game_index, _as_array(game_index, policy))
+  nash_conv_value = (
+      sum(
+          _best_response_value(game_index, probs, best_responder)
+          for best_responder in range(game.num_players())) - game.utility_sum())
+  return nash_conv_value / game.num_players()
+
+
+def nash_conv(game, policy, return_only_nash_conv=True, game_index=None):
+  """Returns a measure of closeness to Nash for a policy in the game.
+
+  See `open_spiel.python.algorithms.exploitability.nash_conv`. Use `evaluate`
+  to also get the exploitability from the same best responses.
+
+  Args:
+    game: An open_spiel game, e.g. kuhn_poker
+    policy: A `policy.Policy` object, a `pyspiel.Policy`, or an array of
+      action probabilities indexed by the rows of the game index.
+    return_only_nash_conv: Whether to only return the NashConv value, or a
+      namedtuple containing additional statistics.
+    game_index: `GameIndex` of `game`. Defaults to
+      `felix_game_index.get_game_index(game)`.
+
+  Returns:
+    The NashConv, or a `(nash_conv, player_improvements)` namedtuple.
+  """
+  game_index = game_index or felix_game_index.get_game_index(game)
+  if not game_index.uniform_info_state_depth:
+    return os_exploitability.nash_conv(
+        game, _as_policy(game_index, policy), return_only_nash_conv)
+  probs = _edge_probabilities(game_index, _as_array(game_index, policy))
+  best_response_values = np.array([
+      _best_response_value(game_index, probs, best_responder)
+      for best_responder in range(game.num_players())
+  ])
+  player_improvements = best_response_values - _policy_values(
+      game_index, probs)
+  nash_conv_ = sum(player_improvements)
+  if return_only_nash_conv:
+    return nash_conv_
+  else:
+    return _NashConvReturn(
+        nash_conv=nash_conv_, player_improvements=player_improvements)
+
+
+def _as_policy(game_index, policy):
+  """Returns `policy` as a policy open_spiel can evaluate."""
+  if not isinstance(policy, np.ndarray):
+    return policy
+  tabular_policy = game_index.tabular_policy()
+  tabular_policy.action_probability_array = policy
+  return tabular_policy
+
+
+def _as_array(game_index, policy):
+  if isinstance(policy, np.ndarray):
+    return policy
+  return game_index.action_probability_array(policy)
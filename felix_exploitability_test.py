@@ -0,0 +1,109 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_exploitability."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import numpy as np
+
+from open_spiel.python import policy
+from open_spiel.python.algorithms import exploitability
+from open_spiel.python.algorithms import felix_exploitability
+from open_spiel.python.algorithms import felix_game_index
+import pyspiel
+
+
+def _random_policy(game, seed):
+  tabular_policy = policy.TabularPolicy(game)
+  probs = (np.random.RandomState(seed).rand(
+      *tabular_policy.action_probability_array.shape) *
+           tabular_policy.legal_actions_mask)
+  tabular_policy.action_probability_array = probs / probs.sum(
+      axis=1, keepdims=True)
+  return tabular_policy
+
+
+class GameIndexTest(absltest.TestCase):
+
+  def test_rows_match_tabular_policy(self):
+    game = pyspiel.load_game("leduc_poker")
+    game_index = felix_game_index.GameIndex.build(game)
+    tabular_policy = policy.TabularPolicy(game)
+    self.assertEqual(game_index.state_lookup, tabular_policy.state_lookup)
+    np.testing.assert_array_equal(game_index.legal_actions_mask,
+                                  tabular_policy.legal_actions_mask)
+
+  def test_save_and_load(self):
+    game = pyspiel.load_game("kuhn_poker")
+    game_index = felix_game_index.GameIndex.build(game)
+    path = self.create_tempfile("kuhn_poker.npz").full_path
+    game_index.save(path)
+    loaded = felix_game_index.GameIndex.load(game, path)
+    for name in felix_game_index.GameIndex._ARRAYS:  # pylint: disable=protected-access
+      np.testing.assert_array_equal(getattr(loaded, name),
+                                    getattr(game_index, name))
+    self.assertEqual(loaded.info_state_strings, game_index.info_state_strings)
+
+
+class ExploitabilityTest(parameterized.TestCase):
+
+  @parameterized.parameters("kuhn_poker", "leduc_poker")
+  def test_matches_open_spiel(self, game_name):
+    game = pyspiel.load_game(game_name)
+    for seed in range(3):
+      random_policy = _random_policy(game, seed)
+      expected = exploitability.nash_conv(game, random_policy, False)
+      actual = felix_exploitability.nash_conv(game, random_policy, False)
+      self.assertAlmostEqual(actual.nash_conv, expected.nash_conv)
+      np.testing.assert_allclose(actual.player_improvements,
+                                 expected.player_improvements)
+      expected_exploitability = exploitability.exploitability(
+          game, random_policy)
+      self.assertAlmostEqual(
+          felix_exploitability.exploitability(game, random_policy),
+          expected_exploitability)
+      evaluation = felix_exploitability.evaluate(game, random_policy)
+      self.assertAlmostEqual(evaluation.exploitability,
+                             expected_exploitability)
+      self.assertAlmostEqual(evaluation.nash_conv, expected.nash_conv)
+
+  def test_array_policy_without_uniform_info_state_depth(self):
+    # Imperfect recall puts nodes of an information state at several depths,
+    # so the evaluation falls back to open_spiel.
+    game = pyspiel.load_game("dark_hex_ir(num_rows=2,num_cols=2)")
+    game_index = felix_game_index.get_game_index(game)
+    self.assertFalse(game_index.uniform_info_state_depth)
+    random_policy = _random_policy(game, 0)
+    probs = game_index.action_probability_array(random_policy)
+    expected = exploitability.nash_conv(game, random_policy, False)
+    actual = felix_exploitability.nash_conv(game, probs, False, game_index)
+    self.assertAlmostEqual(actual.nash_conv, expected.nash_conv)
+    np.testing.assert_allclose(actual.player_improvements,
+                               expected.player_improvements)
+    self.assertAlmostEqual(
+        felix_exploitability.exploitability(game, probs, game_index),
+        exploitability.exploitability(game, random_policy))
+    evaluation = felix_exploitability.evaluate(game, probs, game_index)
+    self.assertAlmostEqual(evaluation.nash_conv, expected.nash_conv)
+    self.assertAlmostEqual(evaluation.exploitability,
+                           expected.nash_conv / 2)
+
+
+if __name__ == "__main__":
+  absltest.main()
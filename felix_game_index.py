@@ -0,0 +1,316 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Flat index of the game tree and information states of a game.
+
+Building the index walks the whole game tree once. Every node is stored in
+breadth-first order in flat arrays (player, parent, action from the parent,
+chance probability, information state, returns), and every information state
+in the order used by `policy.TabularPolicy`, with its string, tensor and legal
+actions mask.
+
+`get_game_index` keeps one index per game string (i.e. per game name and
+parameters) in memory and, given a `cache_dir`, caches it on disk as a
+compressed `.npz` file, so that evaluations and policy builders over the same
+game share a single tree walk.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+import re
+
+import numpy as np
+
+from open_spiel.python import policy
+import pyspiel
+
+_FORMAT_VERSION = 1
+
+# Game indices already built or loaded, keyed by game string.
+_game_indices = {}
+
+
+def get_game_index(game, cache_dir=None):
+  """Returns the `GameIndex` of `game`, building it at most once.
+
+  Args:
+    game: OpenSpiel game.
+    cache_dir: (str or None) Directory in which indices are cached on disk. If
+      `None`, the index is only kept in memory.
+
+  Returns:
+    The `GameIndex` of `game`.
+  """
+  key = str(game)
+  index = _game_indices.get(key)
+  if index is not None:
+    return index
+  path = None
+  if cache_dir is not None:
+    path = os.path.join(
+        cache_dir, "{}.v{}.npz".format(
+            re.sub(r"[^A-Za-z0-9_.=-]+", "_", key), _FORMAT_VERSION))
+  if path is not None and os.path.exists(path):
+    index = GameIndex.load(game, path)
+  else:
+    index = GameIndex.build(game)
+    if path is not None:
+      if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+      index.save(path)
+  _game_indices[key] = index
+  return index
+
+
+class GameIndex(object):
+  """Flat arrays describing the game tree and information states of a game.
+
+  Nodes are numbered in breadth-first order from the root (node 0), so the
+  nodes of each depth are contiguous: depth `d` spans
+  `level_starts[d]:level_starts[d + 1]`.
+
+  Attributes:
+    game: The indexed game.
+    node_player: Player to act at each node, or `pyspiel.PlayerId.CHANCE` /
+      `pyspiel.PlayerId.TERMINAL`.
+    node_parent: Parent of each node, -1 for the root.
+    node_action: Action leading from the parent to each node, -1 for the root.
+    node_chance_prob: Probability of that action if the parent is a chance
+      node, 1 otherwise.
+    node_info_state: Information state row of each decision node, -1 for
+      chance and terminal nodes.
+    node_returns: `[num_nodes, num_players]` returns, 0 for non-terminal nodes.
+    level_starts: Index of the first node of each depth, plus the number of
+      nodes.
+    info_state_strings: (list) Information state string of each row.
+    info_state_player: Player acting at each information state.
+    info_state_node: For each information state, the node with the smallest
+      `history_str()`, used to rebuild a representative state.
+    info_state_tensors: `[num_info_states, tensor_size]` information state
+      tensors, or `None` if the game does not provide them.
+    legal_actions_mask: `[num_info_states, num_distinct_actions]` legal
+      actions of each information state.
+  """
+
+  _ARRAYS = ("node_player", "node_parent", "node_action", "node_chance_prob",
+             "node_info_state", "node_returns", "level_starts",
+             "info_state_player", "info_state_node", "legal_actions_mask")
+
+  def __init__(self, game, arrays, info_state_strings, info_state_tensors):
+    self.game = game
+    for name in self._ARRAYS:
+      setattr(self, name, arrays[name])
+    self.info_state_strings = info_state_strings
+    self.info_state_tensors = info_state_tensors
+    self.state_lookup = {key: row for row, key in enumerate(info_state_strings)}
+    self._states = None
+    # Whether all the nodes of each information state are at the same depth,
+    # which lets evaluations process the tree one depth at a time.
+    decision_nodes = self.node_info_state >= 0
+    node_depth = np.repeat(
+        np.arange(len(self.level_starts) - 1), np.diff(self.level_starts))
+    depths = node_depth[decision_nodes]
+    rows = self.node_info_state[decision_nodes]
+    self.info_state_depth = np.full(self.num_info_states, -1)
+    self.info_state_depth[rows] = depths
+    self.uniform_info_state_depth = bool(
+        np.all(self.info_state_depth[rows] == depths))
+
+  @classmethod
+  def build(cls, game):
+    """Returns the index of `game`, walking its whole game tree.
+
+    Raises:
+      ValueError: If `game` is not sequential.
+    """
+    game_type = game.get_type()
+    if game_type.dynamics != pyspiel.GameType.Dynamics.SEQUENTIAL:
+      raise ValueError("Only sequential games can be indexed, not {}".format(
+          game_type.dynamics))
+    num_players = game.num_players()
+    columns = collections.defaultdict(list)
+    returns = {}
+    level_starts = []
+    info_state_rows = {}
+    info_state_histories = []
+    info_state_tensors = []
+    legal_actions_masks = []
+    # Entries are (state, parent, action, depth, chance probability).
+    frontier = collections.deque([(game.new_initial_state(), -1, -1, 0, 1.)])
+    while frontier:
+      state, parent, action, depth, prob = frontier.popleft()
+      node = len(columns["node_parent"])
+      if depth == len(level_starts):
+        level_starts.append(node)
+      columns["node_parent"].append(parent)
+      columns["node_action"].append(action)
+      columns["node_chance_prob"].append(prob)
+      if state.is_terminal():
+        columns["node_player"].append(pyspiel.PlayerId.TERMINAL)
+        columns["node_info_state"].append(-1)
+        returns[node] = state.returns()
+        continue
+      if state.is_chance_node():
+        columns["node_player"].append(pyspiel.PlayerId.CHANCE)
+        columns["node_info_state"].append(-1)
+        children = state.chance_outcomes()
+      else:
+        player = state.current_player()
+        key = state.information_state_string(player)
+        history = state.history_str()
+        row = info_state_rows.get(key)
+        if row is None:
+          row = len(info_state_histories)
+          info_state_rows[key] = row
+          info_state_histories.append(history)
+          columns["info_state_player"].append(player)
+          columns["info_state_node"].append(node)
+          legal_actions_masks.append(state.legal_actions_mask(player))
+          if game_type.provides_information_state_tensor:
+            info_state_tensors.append(state.information_state_tensor(player))
+        elif history < info_state_histories[row]:
+          info_state_histories[row] = history
+          columns["info_state_node"][row] = node
+        columns["node_player"].append(player)
+        columns["node_info_state"].append(row)
+        children = [(a, 1.) for a in state.legal_actions()]
+      for child_action, child_prob in children:
+        frontier.append((state.child(child_action), node, child_action,
+                         depth + 1, child_prob))
+
+    num_nodes = len(columns["node_parent"])
+    level_starts.append(num_nodes)
+    node_returns = np.zeros((num_nodes, num_players))
+    for node, node_return in returns.items():
+      node_returns[node] = node_return
+    # Order the information states as `policy.TabularPolicy` does: by player,
+    # then by the first history (in string order) reaching them.
+    keys = list(info_state_rows)
+    order = sorted(
+        range(len(keys)),
+        key=lambda row: (columns["info_state_player"][row],
+                         info_state_histories[row]))
+    new_rows = np.empty(len(order), dtype=np.int64)
+    new_rows[order] = np.arange(len(order))
+    node_info_state = np.array(columns["node_info_state"], dtype=np.int64)
+    decision_nodes = node_info_state >= 0
+    node_info_state[decision_nodes] = new_rows[node_info_state[decision_nodes]]
+    arrays = {
+        "node_player": np.array(columns["node_player"], dtype=np.int32),
+        "node_parent": np.array(columns["node_parent"], dtype=np.int64),
+        "node_action": np.array(columns["node_action"], dtype=np.int64),
+        "node_chance_prob": np.array(columns["node_chance_prob"]),
+        "node_info_state": node_info_state,
+        "node_returns": node_returns,
+        "level_starts": np.array(level_starts, dtype=np.int64),
+        "info_state_player": np.array(
+            columns["info_state_player"], dtype=np.int32)[order],
+        "info_state_node": np.array(
+            columns["info_state_node"], dtype=np.int64)[order],
+        "legal_actions_mask": np.array(
+            legal_actions_masks, dtype=np.int8)[order],
+    }
+    tensors = None
+    if info_state_tensors:
+      tensors = np.array(info_state_tensors, dtype=np.float32)[order]
+    return cls(game, arrays, [keys[row] for row in order], tensors)
+
+  @classmethod
+  def load(cls, game, path):
+    """Returns the index of `game` saved by `save` at `path`.
+
+    Raises:
+      ValueError: If the file at `path` indexes a different game.
+    """
+    with np.load(path) as data:
+      if str(data["game"]) != str(game):
+        raise ValueError("{} indexes {}, not {}".format(path, data["game"],
+                                                        game))
+      arrays = {name: data[name] for name in cls._ARRAYS}
+      info_state_strings = data["info_state_strings"].tolist()
+      info_state_tensors = None
+      if "info_state_tensors" in data:
+        info_state_tensors = data["info_state_tensors"]
+    return cls(game, arrays, info_state_strings, info_state_tensors)
+
+  def save(self, path):
+    """Writes the index to `path` as a compressed `.npz` file."""
+    arrays = {name: getattr(self, name) for name in self._ARRAYS}
+    arrays["game"] = np.array(str(self.game))
+    arrays["info_state_strings"] = np.array(self.info_state_strings)
+    if self.info_state_tensors is not None:
+      arrays["info_state_tensors"] = self.info_state_tensors
+    with open(path + ".tmp", "wb") as f:
+      np.savez_compressed(f, **arrays)
+    os.replace(path + ".tmp", path)
+
+  @property
+  def num_nodes(self):
+    return len(self.node_player)
+
+  @property
+  def num_info_states(self):
+    return len(self.info_state_strings)
+
+  @property
+  def states(self):
+    """(list) A representative OpenSpiel state of each information state."""
+    if self._states is None:
+      self._states = [self.node_state(node) for node in self.info_state_node]
+    return self._states
+
+  def node_state(self, node):
+    """Returns the OpenSpiel state of `node`, replayed from the root."""
+    actions = []
+    while self.node_parent[node] >= 0:
+      actions.append(self.node_action[node])
+      node = self.node_parent[node]
+    state = self.game.new_initial_state()
+    for action in reversed(actions):
+      state.apply_action(int(action))
+    return state
+
+  def info_state_row(self, state):
+    """Returns the information state row of decision state `state`."""
+    return self.state_lookup[state.information_state_string(
+        state.current_player())]
+
+  def tabular_policy(self):
+    """Returns a uniform `policy.TabularPolicy` with the rows of this index."""
+    return policy.TabularPolicy(
+        self.game, states={state.history_str(): state for state in self.states})
+
+  def action_probability_array(self, callable_policy):
+    """Returns the probabilities of `callable_policy` in each row.
+
+    Args:
+      callable_policy: A `policy.TabularPolicy`, or any policy exposing
+        `action_probabilities(state)`, such as `pyspiel.Policy`.
+
+    Returns:
+      A `[num_info_states, num_distinct_actions]` array.
+    """
+    if isinstance(callable_policy, policy.TabularPolicy):
+      rows = [callable_policy.state_lookup[key] for key in
+              self.info_state_strings]
+      return callable_policy.action_probability_array[rows]
+    array = np.zeros(self.legal_actions_mask.shape)
+    for row, state in enumerate(self.states):
+      for action, prob in callable_policy.action_probabilities(state).items():
+        array[row, action] = prob
+    return array
@@ -18,23 +18,13 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+import sys
+
 from absl import app
 from absl import flags
-from absl import logging
-import six
-
-import tensorflow.compat.v1 as tf
 
-from open_spiel.python import policy
-from open_spiel.python.algorithms import felix_deep_cfr as deep_cfr
-from open_spiel.python.algorithms import expected_game_score
-from open_spiel.python.algorithms import exploitability
-import pyspiel
-from matplotlib import pyplot as plt
-import numpy as np
-
-# Temporarily disable TF2 behavior until we update the code.
-tf.disable_v2_behavior()
+from open_spiel.python.algorithms import felix_experiments
 
 FLAGS = flags.FLAGS
 #TODO: always let the number of iterations be a multiple of 10!
@@ -42,103 +32,62 @@ flags.DEFINE_integer("num_iterations", 20, "Number of iterations")
 flags.DEFINE_integer("num_traversals", 40, "Number of traversals/games")
 flags.DEFINE_string("kuhn_game_name", "kuhn_poker", "Name of the game")
 flags.DEFINE_string("leduc_game_name", "leduc_poker", "Name of the game")
-
-def main(unused_argv):
-  logging.info("Loading %s", FLAGS.kuhn_game_name)
-  game = pyspiel.load_game(FLAGS.kuhn_game_name)
-  with tf.Session() as sess:
-    deep_cfr_solver = deep_cfr.DeepCFRSolver(
-        sess,
-        game,
-        policy_network_layers=(16,),
-        advantage_network_layers=(16,),
-        num_iterations=FLAGS.num_iterations,
-        num_traversals=FLAGS.num_traversals,
-        learning_rate=1e-3,
-        batch_size_advantage=128,
-        batch_size_strategy=1024,
-        memory_capacity=1e7,
-        policy_network_train_steps=400,
-        advantage_network_train_steps=20,
-        reinitialize_advantage_networks=False)
-    sess.run(tf.global_variables_initializer())
-    _, advantage_losses, policy_loss, nash_kuhn, expl_kuhn = deep_cfr_solver.solve()
-    for player, losses in six.iteritems(advantage_losses):
-      logging.info("Advantage for player %d: %s", player,
-                   losses[:2] + ["..."] + losses[-2:])
-      logging.info("Advantage Buffer Size for player %s: '%s'", player,
-                   len(deep_cfr_solver.advantage_buffers[player]))
-    logging.info("Strategy Buffer Size: '%s'",
-                 len(deep_cfr_solver.strategy_buffer))
-    logging.info("Final policy loss: '%s'", policy_loss)
-
-    average_policy = policy.tabular_policy_from_callable(
-        game, deep_cfr_solver.action_probabilities)
-    conv = exploitability.nash_conv(game, average_policy)
-    logging.info("Deep CFR in '%s' - NashConv: %s", FLAGS.kuhn_game_name, conv)
-
-    average_policy_values = expected_game_score.policy_value(
-        game.new_initial_state(), [average_policy] * 2)
+flags.DEFINE_string("game_index_dir", "/tmp/game_index",
+                    "Directory in which the game indices are cached")
+flags.DEFINE_string("eval_schedule", "linear:10",
+                    "When to evaluate: linear:<every>, log:<factor>, "
+                    "time:<seconds> or budget:<fraction of the wall time>")
+flags.DEFINE_boolean("async_eval", True,
+                     "Whether to evaluate in a separate process")
+flags.DEFINE_string(
+    "checkpoint_dir", None,
+    "If set, each game is checkpointed to a sub-directory of this directory")
+flags.DEFINE_integer("checkpoint_every", 10, "Iterations between checkpoints")
+flags.DEFINE_boolean("resume", True,
+                     "Whether to resume each game from its checkpoint")
+
+flags.DEFINE_string(
+    "metrics_dir", None,
+    "If set, per-iteration timing metrics of each game are streamed to "
+    "<metrics_dir>/<game>.jsonl")
+flags.DEFINE_string("results", "/tmp/deep_cfr_results.jsonl",
+                    "JSONL file to which the evaluations are written; they "
+                    "are also written, for felix_plot.py, to the .npz file "
+                    "of the same name")
+flags.DEFINE_integer("num_workers", None,
+                     "Number of games solved in parallel; one per core if "
+                     "unset")
+
+
+def _sweep(game_name):
+  """Returns the sweep of the run on `game_name`."""
+  params = {"num_traversals": FLAGS.num_traversals}
+  if FLAGS.metrics_dir is not None:
+    params["metrics_path"] = os.path.join(FLAGS.metrics_dir,
+                                          game_name + ".jsonl")
+  sweep = {
+      "algorithm": "deep_cfr",
+      "game": game_name,
+      "iterations": FLAGS.num_iterations,
+      "params": params,
+      "eval_schedule": FLAGS.eval_schedule,
+      "game_index_dir": FLAGS.game_index_dir,
+      "async_eval": FLAGS.async_eval,
+  }
+  if FLAGS.checkpoint_dir is not None:
+    sweep["checkpoint"] = {
+        "directory": FLAGS.checkpoint_dir,
+        "every": FLAGS.checkpoint_every,
+    }
+    sweep["resume"] = FLAGS.resume
+  return sweep
 
 
-
-
-
-  logging.info("Loading %s", FLAGS.leduc_game_name)
-  game = pyspiel.load_game(FLAGS.leduc_game_name)
-  with tf.Session() as sess:
-    deep_cfr_solver = deep_cfr.DeepCFRSolver(
-        sess,
-        game,
-        policy_network_layers=(16,),
-        advantage_network_layers=(16,),
-        num_iterations=FLAGS.num_iterations,
-        num_traversals=FLAGS.num_traversals,
-        learning_rate=1e-3,
-        batch_size_advantage=128,
-        batch_size_strategy=1024,
-        memory_capacity=1e7,
-        policy_network_train_steps=400,
-        advantage_network_train_steps=20,
-        reinitialize_advantage_networks=False)
-    sess.run(tf.global_variables_initializer())
-    _, advantage_losses, policy_loss, nash_leduc, expl_leduc = deep_cfr_solver.solve()
-    for player, losses in six.iteritems(advantage_losses):
-      logging.info("Advantage for player %d: %s", player,
-                   losses[:2] + ["..."] + losses[-2:])
-      logging.info("Advantage Buffer Size for player %s: '%s'", player,
-                   len(deep_cfr_solver.advantage_buffers[player]))
-    logging.info("Strategy Buffer Size: '%s'",
-                 len(deep_cfr_solver.strategy_buffer))
-    logging.info("Final policy loss: '%s'", policy_loss)
-
-    average_policy = policy.tabular_policy_from_callable(
-        game, deep_cfr_solver.action_probabilities)
-    conv = exploitability.nash_conv(game, average_policy)
-    logging.info("Deep CFR in '%s' - NashConv: %s", FLAGS.leduc_game_name, conv)
-
-    average_policy_values = expected_game_score.policy_value(
-        game.new_initial_state(), [average_policy] * 2)
-  
- 
-  nash_kuhn = np.array(nash_kuhn)
-  expl_kuhn = np.array(expl_kuhn)
-  nash_leduc = np.array(nash_leduc)
-  expl_leduc = np.array(expl_leduc)
-  x_kuhn = np.arange(start=0, stop=len(nash_kuhn)*10, step=10)
-  x_leduc = np.arange(start=0, stop=len(nash_leduc)*10, step=10)
-  fig=plt.figure()
-  plt.xlabel("Iteration")
-  plt.ylabel("NashConv")
-  plt.title('NashConv of deep_cfr for Kuhn and Leduc Poker')
-  ax=fig.add_subplot(111)
- 
-  ax.plot(x_kuhn,expl_kuhn,label='Exploitability Kuhn Poker')
-  ax.plot(x_leduc,expl_leduc,label='Exploitability Leduc Poker')
-  ax.plot(x_kuhn,nash_kuhn,label='NashConv Kuhn Poker', linestyle='dashed')
-  ax.plot(x_leduc,nash_leduc,label='NashConv Leduc Poker', linestyle='dashed')
-  plt.legend(loc=2)
-  plt.show()
+def main(unused_argv):
+  specs = felix_experiments.expand_sweep(
+      [_sweep(FLAGS.kuhn_game_name), _sweep(FLAGS.leduc_game_name)])
+  if felix_experiments.run_sweep(specs, FLAGS.results, FLAGS.num_workers):
+    sys.exit(1)
 
 if __name__ == "__main__":
   app.run(main)
@@ -18,21 +18,18 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import sys
+
 from absl import app
 from absl import flags
-import tensorflow.compat.v1 as tf
-import numpy as np
-
-from matplotlib import pyplot as plt
-from open_spiel.python.algorithms import rcfr
-import pyspiel
 
-tf.enable_eager_execution()
+from open_spiel.python.algorithms import felix_experiments
 
 FLAGS = flags.FLAGS
 
 flags.DEFINE_integer("iterations", 5, "Number of iterations")
 flags.DEFINE_string("kuhn_poker_game", "kuhn_poker", "Name of the game")
+flags.DEFINE_string("leduc_poker_game", "leduc_poker", "Name of the game")
 flags.DEFINE_integer("players", 2, "Number of players")
 flags.DEFINE_integer("print_freq", 1, "How often to print the exploitability")
 flags.DEFINE_boolean("bootstrap", False,
@@ -59,124 +56,49 @@ flags.DEFINE_integer(
     "models.")
 flags.DEFINE_integer("batch_size", 100, "The regret model training batch size.")
 flags.DEFINE_float("step_size", 0.01, "The ADAM (AMSGrad) optimizer step size.")
+flags.DEFINE_string("game_index_dir", "/tmp/game_index",
+                    "Directory in which the game indices are cached")
+flags.DEFINE_string(
+    "eval_schedule", None,
+    "When to evaluate: linear:<every>, log:<factor>, time:<seconds> or "
+    "budget:<fraction of the wall time>. Defaults to every `print_freq` "
+    "iterations.")
+flags.DEFINE_boolean("async_eval", True,
+                     "Whether to evaluate in a separate process")
+flags.DEFINE_string("results", "/tmp/rcfr_results.jsonl",
+                    "JSONL file to which the evaluations are written; they "
+                    "are also written, for felix_plot.py, to the .npz file "
+                    "of the same name")
+flags.DEFINE_integer("num_workers", None,
+                     "Number of games solved in parallel; one per core if "
+                     "unset")
 
 
 def main(_):
-  game = pyspiel.load_game(FLAGS.kuhn_poker_game,
-                           {"players": pyspiel.GameParameter(FLAGS.players)})
-
-  models = []
-  for _ in range(game.num_players()):
-    models.append(
-        rcfr.DeepRcfrModel(
-            game,
-            num_hidden_layers=FLAGS.num_hidden_layers,
-            num_hidden_units=FLAGS.num_hidden_units,
-            num_hidden_factors=FLAGS.num_hidden_factors,
-            use_skip_connections=FLAGS.use_skip_connections))
-
-  if FLAGS.buffer_size > 0:
-    solver = rcfr.ReservoirRcfrSolver(
-        game,
-        models,
-        FLAGS.buffer_size,
-        truncate_negative=FLAGS.truncate_negative)
-  else:
-    solver = rcfr.RcfrSolver(
-        game,
-        models,
-        truncate_negative=FLAGS.truncate_negative,
-        bootstrap=FLAGS.bootstrap)
-
-  def _train_fn(model, data):
-    """Train `model` on `data`."""
-    data = data.shuffle(FLAGS.batch_size * 10)
-    data = data.batch(FLAGS.batch_size)
-    data = data.repeat(FLAGS.num_epochs)
-
-    optimizer = tf.keras.optimizers.Adam(lr=FLAGS.step_size, amsgrad=True)
-
-    @tf.function
-    def _train():
-      for x, y in data:
-        optimizer.minimize(
-            lambda: tf.losses.huber_loss(y, model(x), delta=0.01),  # pylint: disable=cell-var-from-loop
-            model.trainable_variables)
-
-    _train()
-
-  # End of _train_fn
-  expl_kuhn = []
-  nash_kuhn = []
-  x_kuhn = []
-  for i in range(FLAGS.iterations):
-    solver.evaluate_and_update_policy(_train_fn)
-    if i % FLAGS.print_freq == 0:
-      print(i)
-      expl = pyspiel.exploitability(game, solver.average_policy())
-      conv = pyspiel.nash_conv(game, solver.average_policy())
-      #print("Iteration {} exploitability {}".format(i, conv))
-      expl_kuhn.append(expl)
-      nash_kuhn.append(conv)
-      x_kuhn.append(i)
-  
-  
-  flags.DEFINE_string("leduc_poker_game", "leduc_poker", "Name of the game")
-  
-  game = pyspiel.load_game(FLAGS.leduc_poker_game,
-                           {"players": pyspiel.GameParameter(FLAGS.players)})
-
-  models = []
-  for _ in range(game.num_players()):
-    models.append(
-        rcfr.DeepRcfrModel(
-            game,
-            num_hidden_layers=FLAGS.num_hidden_layers,
-            num_hidden_units=FLAGS.num_hidden_units,
-            num_hidden_factors=FLAGS.num_hidden_factors,
-            use_skip_connections=FLAGS.use_skip_connections))
-
-  if FLAGS.buffer_size > 0:
-    solver = rcfr.ReservoirRcfrSolver(
-        game,
-        models,
-        FLAGS.buffer_size,
-        truncate_negative=FLAGS.truncate_negative)
-  else:
-    solver = rcfr.RcfrSolver(
-        game,
-        models,
-        truncate_negative=FLAGS.truncate_negative,
-        bootstrap=FLAGS.bootstrap)
-
-  expl_leduc = []
-  x_leduc = []
-  nash_leduc = []
-  for i in range(FLAGS.iterations):
-    solver.evaluate_and_update_policy(_train_fn)
-    if i % FLAGS.print_freq == 0:
-      print(i)
-      expl = pyspiel.exploitability(game, solver.average_policy())
-      conv = pyspiel.nash_conv(game, solver.average_policy())
-      #print("Iteration {} exploitability {}".format(i, conv))
-      expl_leduc.append(expl)
-      nash_leduc.append(conv)
-      x_leduc.append(i)
-  expl_leduc = np.array(expl_leduc)
-  x_leduc = np.array(x_leduc)
-  
-  fig=plt.figure()
-  plt.xlabel("Iteration")
-  plt.ylabel("NashConv")
-  plt.title('NashConv of rcfr for Kuhn and Leduc Poker')
-  ax=fig.add_subplot(111)
- 
-  ax.plot(x_kuhn,expl_kuhn,label='Exploitability Kuhn Poker')
-  ax.plot(x_leduc,expl_leduc,label='Exploitability Leduc Poker')
-  ax.plot(x_kuhn,nash_kuhn,label='NashConv Kuhn Poker', linestyle='dashed')
-  ax.plot(x_leduc,nash_leduc,label='NashConv Leduc Poker', linestyle='dashed')
-  plt.legend(loc=2)
-  plt.show()
+  specs = felix_experiments.expand_sweep({
+      "algorithm": "rcfr",
+      "game": [FLAGS.kuhn_poker_game, FLAGS.leduc_poker_game],
+      "iterations": FLAGS.iterations,
+      "params": {
+          "bootstrap": FLAGS.bootstrap,
+          "truncate_negative": FLAGS.truncate_negative,
+          "buffer_size": FLAGS.buffer_size,
+          "num_hidden_layers": FLAGS.num_hidden_layers,
+          "num_hidden_units": FLAGS.num_hidden_units,
+          "num_hidden_factors": FLAGS.num_hidden_factors,
+          "use_skip_connections": FLAGS.use_skip_connections,
+          "num_epochs": FLAGS.num_epochs,
+          "batch_size": FLAGS.batch_size,
+          "step_size": FLAGS.step_size,
+      },
+      "eval_schedule": (FLAGS.eval_schedule or
+                        "linear:{}".format(FLAGS.print_freq)),
+      "game_params": {"players": FLAGS.players},
+      "game_index_dir": FLAGS.game_index_dir,
+      "async_eval": FLAGS.async_eval,
+  })
+  if felix_experiments.run_sweep(specs, FLAGS.results, FLAGS.num_workers):
+    sys.exit(1)
 
 if __name__ == "__main__":
   app.run(main)
@@ -23,10 +23,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import sys
+
 from absl import app
 from absl import flags
 
-import pyspiel
+from open_spiel.python.algorithms import felix_experiments
 
 FLAGS = flags.FLAGS
 
@@ -40,71 +42,68 @@ flags.DEFINE_integer("iterations", 50, "Number of iterations")
 flags.DEFINE_string("kuhn_game", "kuhn_poker", "Name of the game")
 flags.DEFINE_integer("players", 2, "Number of players")
 flags.DEFINE_string("leduc_game", "leduc_poker", "Name of the game")
+flags.DEFINE_string("game_index_dir", "/tmp/game_index",
+                    "Directory in which the game indices are cached")
+flags.DEFINE_string("eval_schedule", "log:1.2",
+                    "When to evaluate: linear:<every>, log:<factor>, "
+                    "time:<seconds> or budget:<fraction of the wall time>")
+flags.DEFINE_boolean("async_eval", True,
+                     "Whether to evaluate in a separate process")
+flags.DEFINE_integer("seed", 0, "Seed of the solvers")
+flags.DEFINE_string("results", "/tmp/mccfr_results.jsonl",
+                    "JSONL file to which the evaluations are written; they "
+                    "are also written, for felix_plot.py, to the .npz file "
+                    "of the same name")
+flags.DEFINE_integer("num_workers", None,
+                     "Number of games solved in parallel; one per core if "
+                     "unset")
+flags.DEFINE_integer("solver_workers", 1,
+                     "Number of processes running MCCFR on each game, whose "
+                     "tables are merged periodically; set --num_workers so "
+                     "that the processes of all games fit the cores")
+flags.DEFINE_integer("merge_every", None,
+                     "Iterations of each solver process between merges; a "
+                     "default per sampling if unset")
+flags.DEFINE_string(
+    "checkpoint_dir", None,
+    "If set, each game is checkpointed to a sub-directory of this directory "
+    "named after its run")
+flags.DEFINE_integer("checkpoint_every", None,
+                     "Iterations between checkpoints")
+flags.DEFINE_float("checkpoint_seconds", None,
+                   "Seconds of wall time between checkpoints")
+flags.DEFINE_integer("keep_checkpoints", 3,
+                     "Number of most recent checkpoints kept per game")
+flags.DEFINE_boolean("resume", False,
+                     "Whether to resume each game from its last checkpoint")
 
 def main(_):
-  game = pyspiel.load_game(
-      FLAGS.kuhn_game,
-      {"players": pyspiel.GameParameter(FLAGS.players)},
-  )
-
-  if FLAGS.sampling == "external":
-    solver = pyspiel.ExternalSamplingMCCFRSolver(
-        game,
-        avg_type=pyspiel.MCCFRAverageType.FULL,
-    )
-  elif FLAGS.sampling == "outcome":
-    solver = pyspiel.OutcomeSamplingMCCFRSolver(game)
-  expl_kuhn = []
-  conv_kuhn = []
-  for i in range(FLAGS.iterations):
-    solver.run_iteration()
-    expl_kuhn.append(pyspiel.exploitability(game, solver.average_policy()))
-    conv_kuhn.append(pyspiel.nash_conv(game, solver.average_policy()))
-    #print("Iteration {} exploitability: {:.6f}".format(
-    #    i, pyspiel.exploitability(game, solver.average_policy())))
-        
-  game = pyspiel.load_game(
-      FLAGS.leduc_game,
-      {"players": pyspiel.GameParameter(FLAGS.players)},
-  )
-
-  if FLAGS.sampling == "external":
-    solver = pyspiel.ExternalSamplingMCCFRSolver(
-        game,
-        avg_type=pyspiel.MCCFRAverageType.FULL,
-    )
-  elif FLAGS.sampling == "outcome":
-    solver = pyspiel.OutcomeSamplingMCCFRSolver(game)
-  expl_leduc = []
-  conv_leduc = []
-  for i in range(FLAGS.iterations):
-    solver.run_iteration()
-    expl_leduc.append(pyspiel.exploitability(game, solver.average_policy()))
-    conv_leduc.append(pyspiel.nash_conv(game, solver.average_policy()))
-    #print("Iteration {} exploitability: {:.6f}".format(
-    #    i, pyspiel.exploitability(game, solver.average_policy())))
-
-
-  nash_kuhn = np.array(nash_kuhn)
-  expl_kuhn = np.array(expl_kuhn)
-  nash_leduc = np.array(nash_leduc)
-  expl_leduc = np.array(expl_leduc)
-  x_kuhn = np.arange(start=0, stop=len(nash_kuhn), step=1)
-  x_leduc = np.arange(start=0, stop=len(nash_leduc), step=1)
-  
-    
-  fig=plt.figure()
-  plt.xlabel("Iteration")
-  plt.ylabel("NashConv")
-  plt.title('NashConv of deep_cfr for Kuhn and Leduc Poker')
-  ax=fig.add_subplot(111)
- 
-  ax.plot(x_kuhn,expl_kuhn,label='Exploitability Kuhn Poker')
-  ax.plot(x_leduc,expl_leduc,label='Exploitability Leduc Poker')
-  ax.plot(x_kuhn,nash_kuhn,label='NashConv Kuhn Poker', linestyle='dashed')
-  ax.plot(x_leduc,nash_leduc,label='NashConv Leduc Poker', linestyle='dashed')
-  plt.legend(loc=2)
-  plt.show()
+  params = {"sampling": FLAGS.sampling}
+  if FLAGS.solver_workers > 1:
+    params.update(num_workers=FLAGS.solver_workers,
+                  merge_every=FLAGS.merge_every)
+  sweep = {
+      "algorithm": "mccfr",
+      "game": [FLAGS.kuhn_game, FLAGS.leduc_game],
+      "seed": FLAGS.seed,
+      "iterations": FLAGS.iterations,
+      "params": params,
+      "eval_schedule": FLAGS.eval_schedule,
+      "game_params": {"players": FLAGS.players},
+      "game_index_dir": FLAGS.game_index_dir,
+      "async_eval": FLAGS.async_eval,
+  }
+  if FLAGS.checkpoint_dir is not None:
+    sweep["checkpoint"] = {
+        "directory": FLAGS.checkpoint_dir,
+        "every": FLAGS.checkpoint_every,
+        "seconds": FLAGS.checkpoint_seconds,
+        "keep": FLAGS.keep_checkpoints,
+    }
+    sweep["resume"] = FLAGS.resume
+  specs = felix_experiments.expand_sweep(sweep)
+  if felix_experiments.run_sweep(specs, FLAGS.results, FLAGS.num_workers):
+    sys.exit(1)
 
 if __name__ == "__main__":
   app.run(main)
@@ -0,0 +1,140 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-iteration timing and throughput metrics of training loops.
+
+A `Metrics` object accumulates, over one iteration, the wall time spent in
+named phases, counters and gauges, and turns them into a record when the
+iteration ends. Records are kept in `records` and, given a `jsonl_path`,
+appended to that file as one JSON object per line, e.g.
+
+  {"iteration": 3, "time": {"traversal": 1.2, "advantage_training": 0.4},
+   "counts": {"nodes_visited": 52000}, "gauges": {"strategy_fill": 0.1},
+   "rates": {"nodes_per_second": 43333.3}}
+
+`NULL_METRICS` has the same interface and records nothing, so that
+instrumented code costs a few no-op calls per phase when metrics are disabled.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import json
+import time
+
+
+class Metrics(object):
+  """Records phase wall times, counters and gauges per iteration.
+
+  Attributes:
+    records: (list[dict]) One record per ended iteration.
+  """
+
+  def __init__(self, jsonl_path=None):
+    """Initializes the metrics.
+
+    Args:
+      jsonl_path: (str or None) File to which each record is appended as a
+        line of JSON.
+    """
+    self._jsonl_path = jsonl_path
+    self._rates = {}
+    self._times = collections.defaultdict(float)
+    self._counts = collections.defaultdict(int)
+    self._gauges = {}
+    self.records = []
+
+  def add_rate(self, name, counter, phase):
+    """Adds to each record the rate `name`, `counter` per second of `phase`."""
+    self._rates[name] = (counter, phase)
+
+  @contextlib.contextmanager
+  def phase(self, name):
+    """Context adding the wall time spent in it to phase `name`."""
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self._times[name] += time.perf_counter() - start
+
+  def increment(self, name, value=1):
+    self._counts[name] += value
+
+  def gauge(self, name, value):
+    self._gauges[name] = value
+
+  def end_iteration(self, iteration):
+    """Returns the record of `iteration` and starts a new one."""
+    record = {
+        "iteration": iteration,
+        "time": dict(self._times),
+        "counts": dict(self._counts),
+        "gauges": dict(self._gauges),
+        "rates": {},
+    }
+    for name, (counter, phase) in self._rates.items():
+      if self._times.get(phase):
+        record["rates"][name] = self._counts[counter] / self._times[phase]
+    self.records.append(record)
+    if self._jsonl_path is not None:
+      with open(self._jsonl_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    self._times.clear()
+    self._counts.clear()
+    self._gauges.clear()
+    return record
+
+  def totals(self):
+    """Returns the phase times and counters summed over all the records."""
+    times = collections.defaultdict(float)
+    counts = collections.defaultdict(int)
+    for record in self.records:
+      for name, value in record["time"].items():
+        times[name] += value
+      for name, value in record["counts"].items():
+        counts[name] += value
+    return {"time": dict(times), "counts": dict(counts)}
+
+
+class _NullMetrics(object):
+  """`Metrics` interface recording nothing."""
+
+  records = ()
+  _null_context = contextlib.nullcontext()
+
+  def add_rate(self, name, counter, phase):
+    pass
+
+  def phase(self, name):
+    del name  # Unused.
+    return self._null_context
+
+  def increment(self, name, value=1):
+    pass
+
+  def gauge(self, name, value):
+    pass
+
+  def end_iteration(self, iteration):
+    del iteration  # Unused.
+    return None
+
+  def totals(self):
+    return {"time": {}, "counts": {}}
+
+
+NULL_METRICS = _NullMetrics()
@@ -0,0 +1,57 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_metrics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+
+from absl.testing import absltest
+
+from open_spiel.python.algorithms import felix_metrics
+
+
+class MetricsTest(absltest.TestCase):
+
+  def test_records_are_streamed_per_iteration(self):
+    path = os.path.join(self.create_tempdir().full_path, "metrics.jsonl")
+    metrics = felix_metrics.Metrics(jsonl_path=path)
+    metrics.add_rate("nodes_per_second", "nodes_visited", "traversal")
+    for iteration in range(2):
+      with metrics.phase("traversal"):
+        metrics.increment("nodes_visited", 10)
+      metrics.gauge("fill", 0.5)
+      metrics.end_iteration(iteration)
+    with open(path) as f:
+      records = [json.loads(line) for line in f]
+    self.assertEqual(records, metrics.records)
+    self.assertEqual([record["iteration"] for record in records], [0, 1])
+    self.assertEqual(records[1]["counts"], {"nodes_visited": 10})
+    self.assertEqual(records[1]["gauges"], {"fill": 0.5})
+    self.assertIn("nodes_per_second", records[1]["rates"])
+    self.assertEqual(metrics.totals()["counts"], {"nodes_visited": 20})
+
+  def test_null_metrics_record_nothing(self):
+    with felix_metrics.NULL_METRICS.phase("traversal"):
+      felix_metrics.NULL_METRICS.increment("nodes_visited")
+    self.assertIsNone(felix_metrics.NULL_METRICS.end_iteration(0))
+    self.assertEmpty(felix_metrics.NULL_METRICS.records)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,417 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""MCCFR run by several pyspiel solvers in parallel, merged periodically.
+
+`ParallelMCCFRSolver` runs one pyspiel external or outcome sampling MCCFR
+solver per worker process, each from its own seed. Iterations are run in
+rounds: in each round every worker runs up to `merge_every` iterations from
+the merged tables of the previous round, then the parent merges the regret
+and average policy tables of the workers, adding up what each worker added to
+them in the round, and sends the merged tables back to the workers.
+
+The tables are read from the text written by the solvers' `Serialize()` (their
+pickled state), whose values table section is
+`<info state><~><legal actions>;<regrets>;<average policy>;<policy>` entries
+separated by `<~>`, with comma separated hexadecimal floats. Workers parse
+their tables into flat arrays, which the parent merges with a few vectorized
+operations, and write the merged arrays back into their own serialized state,
+which keeps their random number generator, before deserializing it.
+
+A solver restored from a checkpoint restarts its workers from seeds drawn
+from both its seed and the number of iterations restored, so that a resumed
+run does not replay the random numbers of the iterations already run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import multiprocessing
+
+import numpy as np
+
+import pyspiel
+
+_VALUES_TABLE = "[SolverValuesTable]\n"
+_SEPARATOR = "<~>"
+
+# Value of the regrets and average policy of an information state the solvers
+# first visit, `kInitialTableValues` of open_spiel/algorithms/cfr.h.
+_INITIAL_TABLE_VALUE = 0.000001
+
+# Default iterations per worker between merges, per sampling: an external
+# sampling iteration walks a whole tree of the traversing player, while an
+# outcome sampling iteration samples a single history. Workers play against
+# the policies of the last merge, so longer rounds make the merged solver
+# converge slower per iteration, while shorter rounds spend more time merging.
+_MERGE_EVERY = {"external": 10, "outcome": 10000}
+
+
+
+class _ValuesTable(collections.namedtuple("_ValuesTable", [
+    "keys", "legal_actions", "policies", "lengths", "cumulative_regrets",
+    "cumulative_policy"
+])):
+  """Values table of a solver, with the values of all information states flat.
+
+  Attributes:
+    keys: (list[str]) Information states, in the order of the table.
+    legal_actions: (list[str]) Serialized legal actions of each of `keys`.
+    policies: (list[str]) Serialized current policy of each of `keys`.
+    lengths: (np.ndarray) Number of legal actions of each of `keys`.
+    cumulative_regrets: (np.ndarray) Regrets of all information states,
+      concatenated in the order of `keys`.
+    cumulative_policy: (np.ndarray) Average policy sums, concatenated
+      likewise.
+  """
+
+  @property
+  def offsets(self):
+    """Index of the first value of each of `keys` in the flat arrays."""
+    return np.cumsum(self.lengths) - self.lengths
+
+
+def _new_solver(game, sampling, seed):
+  if sampling == "external":
+    return pyspiel.ExternalSamplingMCCFRSolver(
+        game, seed=seed, avg_type=pyspiel.MCCFRAverageType.FULL)
+  if sampling == "outcome":
+    return pyspiel.OutcomeSamplingMCCFRSolver(game, seed=seed)
+  raise ValueError("Unknown MCCFR sampling: {}".format(sampling))
+
+
+def _worker_seeds(seed, num_workers, iterations):
+  """Returns the seeds of the workers after `iterations` iterations."""
+  entropy = seed if iterations == 0 else [seed, iterations]
+  # The solvers take their seed as a C `int`.
+  return [
+      int(worker_seed) for worker_seed in np.random.SeedSequence(
+          entropy).generate_state(num_workers) % np.iinfo(np.int32).max
+  ]
+
+
+def _deserialize(solver_type, state):
+  solver = solver_type.__new__(solver_type)
+  solver.__setstate__(state)
+  return solver
+
+
+def _split_state(state):
+  """Returns the serialized `state` before its values table, and the table."""
+  start = state.index(_VALUES_TABLE) + len(_VALUES_TABLE)
+  return state[:start], state[start:]
+
+
+def _parse_floats(values):
+  """Returns the concatenated floats of serialized float lists."""
+  return np.array([
+      float.fromhex(value) for value in ",".join(values).split(",")])
+
+
+def _parse_values_table(table):
+  """Returns the `_ValuesTable` of a serialized values table."""
+  table = table.rstrip("\n")
+  items = table.split(_SEPARATOR) if table else []
+  keys = items[0::2]
+  fields = [value.split(";") for value in items[1::2]]
+  legal_actions = [field[0] for field in fields]
+  regrets = [field[1] for field in fields]
+  return _ValuesTable(
+      keys=keys,
+      legal_actions=legal_actions,
+      policies=[field[3] for field in fields],
+      lengths=np.array([value.count(",") + 1 for value in regrets],
+                       dtype=np.int64),
+      cumulative_regrets=_parse_floats(regrets) if fields else np.zeros(0),
+      cumulative_policy=(_parse_floats([field[2] for field in fields])
+                         if fields else np.zeros(0)))
+
+
+def _format_floats(values, offsets, lengths):
+  values = [float.hex(value) for value in values.tolist()]
+  return [",".join(values[offset:offset + length])
+          for offset, length in zip(offsets.tolist(), lengths.tolist())]
+
+
+def _format_values_table(table):
+  """Returns `table` serialized as a solver values table."""
+  offsets = table.offsets
+  regrets = _format_floats(table.cumulative_regrets, offsets, table.lengths)
+  average = _format_floats(table.cumulative_policy, offsets, table.lengths)
+  return _SEPARATOR.join(
+      "{}{}{};{};{};{}".format(key, _SEPARATOR, *fields)
+      for key, fields in zip(table.keys, zip(table.legal_actions, regrets,
+                                               average, table.policies)))
+
+
+def _merge_values_tables(base, tables):
+  """Returns `base` plus what each of `tables` added to it.
+
+  Args:
+    base: (_ValuesTable) Table the workers started the round from.
+    tables: (list[_ValuesTable]) Table of each worker after the round.
+
+  Returns:
+    The merged `_ValuesTable`, whose keys are those of `base` followed by
+    the information states first visited in the round, which start from
+    `_INITIAL_TABLE_VALUE`.
+  """
+  keys = list(base.keys)
+  legal_actions = list(base.legal_actions)
+  policies = list(base.policies)
+  lengths = list(base.lengths.tolist())
+  lookup = {key: slot for slot, key in enumerate(keys)}
+  table_slots = []
+  for table in tables:
+    slots = []
+    for key, actions, policy, length in zip(table.keys, table.legal_actions,
+                                            table.policies,
+                                            table.lengths.tolist()):
+      slot = lookup.get(key)
+      if slot is None:
+        slot = lookup[key] = len(keys)
+        keys.append(key)
+        legal_actions.append(actions)
+        policies.append(None)
+        lengths.append(length)
+      policies[slot] = policy
+      slots.append(slot)
+    table_slots.append(np.array(slots, dtype=np.int64))
+
+  lengths = np.array(lengths, dtype=np.int64)
+  offsets = np.cumsum(lengths) - lengths
+  size = int(lengths.sum())
+  start_regrets = np.full(size, _INITIAL_TABLE_VALUE)
+  start_regrets[:base.cumulative_regrets.size] = base.cumulative_regrets
+  start_policy = np.full(size, _INITIAL_TABLE_VALUE)
+  start_policy[:base.cumulative_policy.size] = base.cumulative_policy
+  regrets = start_regrets.copy()
+  policy = start_policy.copy()
+  for table, slots in zip(tables, table_slots):
+    # Position in the merged arrays of each value of `table`.
+    positions = (np.repeat(offsets[slots] - table.offsets, table.lengths) +
+                 np.arange(table.cumulative_regrets.size))
+    regrets[positions] += (table.cumulative_regrets -
+                           start_regrets[positions])
+    policy[positions] += table.cumulative_policy - start_policy[positions]
+  return _ValuesTable(keys, legal_actions, policies, lengths, regrets, policy)
+
+
+def _worker(game, sampling, seed, connection):
+  """Runs iterations on request, from the merged tables sent with them.
+
+  Requests are `(num_iterations, values, seed)` tuples, where `values` is the
+  merged `_ValuesTable` or None to continue from the current one, and `seed`
+  is None or a seed from which to restart the solver. They are answered
+  with the serialized state of the solver before its values table, and the
+  `_ValuesTable` of the solver. Tables are formatted and parsed here rather
+  than by the parent, so that the workers do it in parallel. `None` stops the
+  worker.
+  """
+  solver = None
+  while True:
+    request = connection.recv()
+    if request is None:
+      return
+    num_iterations, values, new_seed = request
+    try:
+      if new_seed is not None:
+        seed = new_seed
+        solver = None
+      if solver is None:
+        solver = _new_solver(game, sampling, seed)
+      if values is not None:
+        prefix, _ = _split_state(solver.__getstate__())
+        solver = _deserialize(type(solver),
+                              prefix + _format_values_table(values))
+      for _ in range(num_iterations):
+        solver.run_iteration()
+      prefix, table = _split_state(solver.__getstate__())
+      connection.send((prefix, _parse_values_table(table)))
+    except Exception as e:  # pylint: disable=broad-except
+      connection.send(e)
+      return
+
+
+class ParallelMCCFRSolver(object):
+  """Pyspiel MCCFR solvers run in parallel processes and merged periodically.
+
+  Usage:
+
+    with ParallelMCCFRSolver(game, num_workers=4) as solver:
+      solver.run_iterations(10000)
+      evaluation = felix_exploitability.evaluate(
+          game, solver.average_policy_array(game_index), game_index)
+  """
+
+  def __init__(self,
+               game,
+               num_workers,
+               sampling="external",
+               seed=0,
+               merge_every=None):
+    """Starts the worker processes.
+
+    Args:
+      game: OpenSpiel game.
+      num_workers: (int) Number of solvers run in parallel.
+      sampling: (str) "external" or "outcome" sampling.
+      seed: (int) Seed from which the distinct seeds of the workers are drawn.
+      merge_every: (int or None) Maximum number of iterations each worker runs
+        between merges. Defaults to `_MERGE_EVERY[sampling]`.
+    """
+    if sampling not in _MERGE_EVERY:
+      raise ValueError("Unknown MCCFR sampling: {}".format(sampling))
+    self._game = game
+    self._sampling = sampling
+    self._seed = seed
+    self._merge_every = merge_every or _MERGE_EVERY[sampling]
+    self._iterations = 0
+    self._values = _parse_values_table("")
+    self._merged = False
+    # Whether the workers restart from `_worker_seeds` in the next round.
+    self._reseed = False
+    self._prefix, _ = _split_state(
+        _new_solver(game, sampling, seed).__getstate__())
+    context = multiprocessing.get_context("fork")
+    self._connections = []
+    self._processes = []
+    self._worker_seeds = _worker_seeds(seed, num_workers, 0)
+    for worker_seed in self._worker_seeds:
+      connection, worker_connection = context.Pipe()
+      process = context.Process(
+          target=_worker,
+          args=(game, sampling, worker_seed, worker_connection),
+          daemon=True)
+      process.start()
+      self._connections.append(connection)
+      self._processes.append(process)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    self.close()
+
+  @property
+  def num_workers(self):
+    return len(self._processes)
+
+  @property
+  def round_iterations(self):
+    """(int) Number of iterations of all the workers between two merges."""
+    return self._merge_every * self.num_workers
+
+  @property
+  def iterations(self):
+    """(int) Number of iterations run by all the workers."""
+    return self._iterations
+
+  def run_iterations(self, num_iterations):
+    """Runs `num_iterations` iterations, split between the workers.
+
+    The iterations are run in rounds of at most `merge_every` iterations per
+    worker, and the tables of the workers are merged after each round.
+    """
+    remaining = num_iterations
+    while remaining > 0:
+      round_iterations = min(remaining, self.round_iterations)
+      quotient, remainder = divmod(round_iterations, self.num_workers)
+      for worker, connection in enumerate(self._connections):
+        connection.send((quotient + (worker < remainder),
+                         self._values if self._merged else None,
+                         self._worker_seeds[worker] if self._reseed else None))
+      replies = []
+      for connection in self._connections:
+        reply = connection.recv()
+        if isinstance(reply, Exception):
+          raise reply
+        replies.append(reply)
+      self._prefix = replies[0][0]
+      self._values = _merge_values_tables(
+          self._values, [values for _, values in replies])
+      self._merged = True
+      self._reseed = False
+      self._iterations += round_iterations
+      remaining -= round_iterations
+
+  def restore(self, state, iterations):
+    """Continues from the tables of a serialized pyspiel solver.
+
+    The workers restart from new seeds, drawn from the seed of this solver
+    and `iterations`.
+
+    Args:
+      state: (str) State of a solver of the same game and sampling, such as
+        returned by `serialize`.
+      iterations: (int) Number of iterations run to reach `state`.
+    """
+    self._prefix, table = _split_state(state)
+    self._values = _parse_values_table(table)
+    self._merged = True
+    self._iterations = iterations
+    self._worker_seeds = _worker_seeds(self._seed, self.num_workers,
+                                       iterations)
+    self._reseed = True
+
+  def serialize(self):
+    """Returns the state of a pyspiel solver holding the merged tables."""
+    return self._prefix + _format_values_table(self._values)
+
+  def solver(self):
+    """Returns a new pyspiel solver holding the merged tables.
+
+    Its policies read its tables, so the solver must outlive them.
+    """
+    return _deserialize(type(_new_solver(self._game, self._sampling, 0)),
+                        self.serialize())
+
+  def average_policy_array(self, game_index):
+    """Returns the merged average policy indexed by the rows of `game_index`.
+
+    Information states never visited have a uniform policy.
+    """
+    mask = game_index.legal_actions_mask
+    probs = mask / mask.sum(axis=1, keepdims=True)
+    values = self._values
+    if not values.keys:
+      return probs
+    rows = np.array([game_index.state_lookup[key] for key in values.keys])
+    totals = np.add.reduceat(values.cumulative_policy, values.offsets)
+    # The values of an information state are ordered by legal action, as
+    # the columns of `np.nonzero` within each row.
+    index, columns = np.nonzero(mask[rows])
+    visited = np.repeat(totals > 0, values.lengths)
+    probs[rows[totals > 0]] = 0
+    probs[rows[index[visited]], columns[visited]] = (
+        values.cumulative_policy[visited] /
+        np.repeat(totals, values.lengths)[visited])
+    return probs
+
+  def close(self):
+    """Stops the worker processes."""
+    for connection, process in zip(self._connections, self._processes):
+      if process.is_alive():
+        try:
+          connection.send(None)
+        except (BrokenPipeError, OSError):
+          pass
+      process.join(timeout=1)
+      if process.is_alive():
+        process.terminate()
+        process.join()
+    self._connections = []
+    self._processes = []
@@ -0,0 +1,113 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for open_spiel.python.algorithms.felix_parallel_mccfr."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import numpy as np
+
+from open_spiel.python.algorithms import felix_exploitability
+from open_spiel.python.algorithms import felix_game_index
+from open_spiel.python.algorithms import felix_parallel_mccfr
+import pyspiel
+
+
+class MergeTest(absltest.TestCase):
+
+  def test_merge_adds_what_each_table_added(self):
+    base = felix_parallel_mccfr._parse_values_table(
+        "a<~>0,1;0x1p+0,0x1p+1;0x1p+2,0x0p+0;0x1p-1,0x1p-1")
+    first = felix_parallel_mccfr._parse_values_table(
+        "a<~>0,1;0x1p+1,0x1p+1;0x1p+2,0x1p+0;0x1p-1,0x1p-1<~>"
+        "b<~>0,1,2;0x1p+0,0x0p+0,0x0p+0;0x0p+0,0x0p+0,0x0p+0;"
+        "0x1p-2,0x1p-2,0x1p-1")
+    second = felix_parallel_mccfr._parse_values_table(
+        "a<~>0,1;0x1p+0,0x1p+2;0x1p+2,0x0p+0;0x1p-1,0x1p-1")
+    merged = felix_parallel_mccfr._merge_values_tables(base, [first, second])
+    self.assertEqual(merged.keys, ["a", "b"])
+    np.testing.assert_allclose(merged.cumulative_regrets, [2., 4., 1., 0., 0.])
+    np.testing.assert_allclose(merged.cumulative_policy, [4., 1., 0., 0., 0.],
+                               atol=1e-5)
+    self.assertEqual(
+        felix_parallel_mccfr._parse_values_table(
+            felix_parallel_mccfr._format_values_table(merged)).keys,
+        ["a", "b"])
+
+
+class ParallelMCCFRSolverTest(parameterized.TestCase):
+
+  @parameterized.parameters(("external", 20, 5), ("outcome", 2000, 300))
+  def test_single_worker_matches_solver(self, sampling, iterations,
+                                        merge_every):
+    game = pyspiel.load_game("kuhn_poker")
+    game_index = felix_game_index.get_game_index(game)
+    with felix_parallel_mccfr.ParallelMCCFRSolver(
+        game, num_workers=1, sampling=sampling,
+        merge_every=merge_every) as solver:
+      solver.run_iterations(iterations)
+      expected = felix_parallel_mccfr._new_solver(
+          game, sampling, solver._worker_seeds[0])
+      for _ in range(iterations):
+        expected.run_iteration()
+      expected_policy = game_index.action_probability_array(
+          expected.average_policy())
+      np.testing.assert_allclose(
+          solver.average_policy_array(game_index), expected_policy,
+          atol=1e-12)
+      merged_solver = solver.solver()
+      np.testing.assert_allclose(
+          game_index.action_probability_array(merged_solver.average_policy()),
+          expected_policy, atol=1e-12)
+
+  def test_restored_workers_draw_new_seeds(self):
+    game = pyspiel.load_game("kuhn_poker")
+    with felix_parallel_mccfr.ParallelMCCFRSolver(
+        game, num_workers=2, merge_every=2) as solver:
+      solver.run_iterations(8)
+      state = solver.serialize()
+      seeds = solver._worker_seeds
+    tables = []
+    for _ in range(2):
+      with felix_parallel_mccfr.ParallelMCCFRSolver(
+          game, num_workers=2, merge_every=2) as solver:
+        solver.restore(state, 8)
+        self.assertNotEqual(solver._worker_seeds, seeds)
+        solver.run_iterations(8)
+        self.assertEqual(solver.iterations, 16)
+        tables.append(solver._values)
+    # Resumed runs are reproducible.
+    self.assertEqual(tables[0].keys, tables[1].keys)
+    np.testing.assert_array_equal(tables[0].cumulative_regrets,
+                                  tables[1].cumulative_regrets)
+
+  def test_merged_workers_converge(self):
+    game = pyspiel.load_game("kuhn_poker")
+    game_index = felix_game_index.get_game_index(game)
+    with felix_parallel_mccfr.ParallelMCCFRSolver(
+        game, num_workers=3, merge_every=2) as solver:
+      solver.run_iterations(3000)
+      self.assertEqual(solver.iterations, 3000)
+      evaluation = felix_exploitability.evaluate(
+          game, solver.average_policy_array(game_index),
+          game_index=game_index)
+    self.assertLess(evaluation.nash_conv, 0.05)
+
+
+if __name__ == "__main__":
+  absltest.main()
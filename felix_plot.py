@@ -0,0 +1,120 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Plots the exploitability and NashConv of runs from results files.
+
+Reads the npz (or JSONL) results written by `felix_experiments.run_sweep`, as
+done by the example drivers and `felix_sweep.py`. Only the series of the runs
+selected by `--runs` are read. Runs differing only in their seed are drawn as
+their mean, with their range shaded.
+
+Example:
+  python felix_plot.py --results=/tmp/cfr_results.npz --output=/tmp/cfr.png
+  python felix_plot.py --results=/tmp/sweep_results.npz --runs=leduc_poker \\
+      --x=time --log_scale
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import re
+
+from absl import app
+from absl import flags
+import numpy as np
+
+from open_spiel.python.algorithms import felix_experiments
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_list("results", None, "Results files to plot")
+flags.DEFINE_list("runs", [],
+                  "Substrings of the names of the runs to plot; all if empty")
+flags.DEFINE_list("metrics", ["exploitability", "nash_conv"],
+                  "Series to plot: exploitability and/or nash_conv")
+flags.DEFINE_enum("x", "iteration", ["iteration", "time"],
+                  "Series of the x axis")
+flags.DEFINE_boolean("log_scale", False, "Whether to use log-log axes")
+flags.DEFINE_string("title", None, "Title of the plot")
+flags.DEFINE_string(
+    "output", None,
+    "Image file to which the plot is saved, without a display; the plot is "
+    "shown if unset")
+flags.mark_flag_as_required("results")
+
+_LABELS = {"exploitability": "Exploitability", "nash_conv": "NashConv"}
+_LINESTYLES = ("solid", "dashed", "dotted")
+
+
+def _select(metadata):
+  return not FLAGS.runs or any(run in metadata["run"] for run in FLAGS.runs)
+
+
+def _group_seeds(runs):
+  """Returns the runs grouped by their name without its seed."""
+  groups = collections.OrderedDict()
+  for name, run in runs.items():
+    if "iteration" in run:
+      groups.setdefault(re.sub(r"/seed=[^/]*$", "", name), []).append(run)
+  return groups
+
+
+def main(unused_argv):
+  # Imported here so that the results can be read, and the flags listed,
+  # without matplotlib, and so that the backend is chosen before the import
+  # of pyplot.
+  import matplotlib  # pylint: disable=g-import-not-at-top
+  if FLAGS.output:
+    matplotlib.use("Agg")
+  from matplotlib import pyplot as plt  # pylint: disable=g-import-not-at-top
+
+  fig = plt.figure()
+  ax = fig.add_subplot(111)
+  for path in FLAGS.results:
+    runs = felix_experiments.load_results(path, select=_select)
+    for name, group in _group_seeds(runs).items():
+      for metric, linestyle in zip(FLAGS.metrics, _LINESTYLES):
+        label = "{} {}".format(_LABELS.get(metric, metric), name)
+        if all(np.array_equal(run["iteration"], group[0]["iteration"])
+               for run in group):
+          x = np.mean([run[FLAGS.x] for run in group], axis=0)
+          values = np.array([run[metric] for run in group])
+          line, = ax.plot(x, values.mean(axis=0), label=label,
+                          linestyle=linestyle)
+          if len(group) > 1:
+            ax.fill_between(x, values.min(axis=0), values.max(axis=0),
+                            color=line.get_color(), alpha=0.2)
+        else:
+          for run in group:
+            ax.plot(run[FLAGS.x], run[metric], label=label,
+                    linestyle=linestyle)
+  ax.set_xlabel("Iteration" if FLAGS.x == "iteration" else "Time (s)")
+  ax.set_ylabel(" / ".join(_LABELS.get(metric, metric)
+                           for metric in FLAGS.metrics))
+  if FLAGS.log_scale:
+    ax.set_xscale("symlog" if FLAGS.x == "iteration" else "log")
+    ax.set_yscale("log")
+  if FLAGS.title:
+    ax.set_title(FLAGS.title)
+  ax.legend(loc="best")
+  if FLAGS.output:
+    fig.savefig(FLAGS.output)
+  else:
+    plt.show()
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -0,0 +1,79 @@
+# Copyright 2019 DeepMind Technologies Ltd. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs a sweep of solver runs in parallel.
+
+The sweep is read from a JSON file holding a sweep or a list of sweeps, as
+described in `felix_experiments`, e.g.
+
+  [{"algorithm": "cfr", "game": ["kuhn_poker", "leduc_poker"],
+    "iterations": 1000, "eval_schedule": "log:1.2"},
+   {"algorithm": "mccfr", "game": ["kuhn_poker", "leduc_poker"],
+    "seed": [0, 1, 2], "iterations": 100000, "eval_schedule": "log:1.2",
+    "params": [{"sampling": "external"}, {"sampling": "outcome"}]}]
+
+Every record of every run is appended to the JSONL `--results` store. The
+program exits with status 1 if any run fails.
+
+Example:
+  python felix_sweep.py --sweep=sweep.json --results=/tmp/results.jsonl
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import sys
+
+from absl import app
+from absl import flags
+from absl import logging
+
+from open_spiel.python.algorithms import felix_experiments
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("sweep", None, "JSON file of the sweep")
+flags.DEFINE_string("results", "/tmp/sweep_results.jsonl",
+                    "JSONL file to which the records of the runs are written")
+flags.DEFINE_integer("num_workers", None,
+                     "Number of concurrent runs; one per core if unset")
+flags.DEFINE_string("game_index_dir", "/tmp/game_index",
+                    "Directory in which the game indices are cached, unless "
+                    "set by the sweep")
+flags.mark_flag_as_required("sweep")
+
+
+def main(unused_argv):
+  with open(FLAGS.sweep) as f:
+    specs = felix_experiments.expand_sweep(json.load(f))
+  for spec in specs:
+    spec.setdefault("game_index_dir", FLAGS.game_index_dir)
+  logging.info("Running %d runs", len(specs))
+
+  def log(record):
+    logging.info("%s iteration %d: exploitability %g, NashConv %g",
+                 record["run"], record["iteration"], record["exploitability"],
+                 record["nash_conv"])
+
+  failures = felix_experiments.run_sweep(
+      specs, FLAGS.results, num_workers=FLAGS.num_workers, callback=log)
+  if failures:
+    print("Failed runs: {}".format(", ".join(sorted(failures))))
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  app.run(main)